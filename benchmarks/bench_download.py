@@ -0,0 +1,193 @@
+"""
+Benchmark de extremo a extremo del descargador contra el catálogo simulado de standin.py.
+Ejecuta create_csv_file -> create_file_tests -> download_photo y mide imágenes/s, MB/s,
+memoria máxima (RSS) y CPU del proceso. El servidor corre en un proceso aparte para que su
+CPU no se mezcle con la del descargador.
+
+Por defecto se desactiva el limitador de peticiones (html_rate e image_rate a 0) para medir
+el motor y no el presupuesto configurado; --keep-rate-limit lo conserva.
+
+Uso:
+    python benchmarks/bench_download.py [--engine threads|async] [--archive zip|tar] [--inflight-mb MB] [--runs N]
+        [--albums N] [--images N] [--latency MS] [--error-rate P] [--json] ...
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import signal
+import argparse
+import statistics
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, os.pardir, "src"))
+
+from standin import add_options  # noqa: E402
+from yupoo_downloader.metrics import peak_rss_bytes  # noqa: E402
+
+
+def start_server(args, cert_dir):
+    """
+    Arranca standin.py en un proceso hijo con las opciones del catálogo simulado.
+    Returns:
+        tuple: (proceso, URL del catálogo, ruta del certificado)
+    """
+    command = [sys.executable, os.path.join(BENCH_DIR, "standin.py"), "--cert-dir", cert_dir]
+    for option in ("albums", "images", "image_size", "size_spread", "latency", "jitter", "error_rate", "max_rps", "bandwidth", "seed"):
+        command += [f"--{option.replace('_', '-')}", str(getattr(args, option))]
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    line = server.stdout.readline()
+    if not line:
+        raise SystemExit(f"No se pudo arrancar el servidor simulado:\n{server.stderr.read()}")
+    info = json.loads(line)
+    return server, info["url"], info["cert"]
+
+
+def stop_server(server):
+    """
+    Detiene el servidor y devuelve sus estadísticas.
+    """
+    server.send_signal(signal.SIGINT)
+    try:
+        _, err = server.communicate(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        return {}
+    lines = err.strip().splitlines()
+    try:
+        return json.loads(lines[-1]) if lines else {}
+    except ValueError:
+        return {}
+
+
+def peak_rss_mb():
+    peak = peak_rss_bytes()
+    return peak / (1024 * 1024) if peak is not None else None
+
+
+def run_once(url, config):
+    """
+    Descarga el catálogo completo en una carpeta temporal nueva.
+    Returns:
+        dict: Resultados de la ejecución.
+    """
+    from yupoo_downloader.downloader import YupooDownloader
+
+    folder = tempfile.mkdtemp(prefix="yupoo-bench-")
+    # Cada ejecución parte de una caché HTML vacía para que todas midan lo mismo
+    config = dict(config, html_cache_dir=os.path.join(folder, ".html_cache"))
+    failed = 0
+    cpu_start = os.times()
+    start = time.perf_counter()
+    try:
+        with YupooDownloader(url, folder, config=config) as downloader:
+            titles = downloader.create_csv_file()
+            for number, title in enumerate(titles):
+                downloader.create_file_tests(number)
+                failed += len(downloader.download_photo(number, title))
+            elapsed = time.perf_counter() - start
+            cpu_end = os.times()
+            metrics = downloader.metrics
+            snapshot = metrics.snapshot()
+            images = metrics.counter("images_total", result="downloaded")
+            received = metrics.counter("bytes_total", kind="images")
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+    cpu = (cpu_end.user - cpu_start.user) + (cpu_end.system - cpu_start.system)
+    return {
+        "albums": len(titles),
+        "images": images,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(images / elapsed, 2),
+        "mb_per_second": round(received / elapsed / 1e6, 2),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_percent": round(cpu / elapsed * 100, 1),
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": {stage: {"p50": summary["p50"], "p95": summary["p95"]} for stage, summary in snapshot["stages"].items()},
+    }
+
+
+def print_run(number, result):
+    rss = f"{result['peak_rss_mb']:.0f} MB" if result["peak_rss_mb"] is not None else "n/d"
+    print(
+        f"Ejecución {number}: {result['images']} imágenes en {result['seconds']:.2f} s  "
+        f"{result['images_per_second']:.1f} img/s  {result['mb_per_second']:.1f} MB/s  "
+        f"CPU {result['cpu_seconds']:.2f} s ({result['cpu_percent']:.0f} %)  RSS máx. {rss}  fallidas {result['failed']}"
+    )
+
+
+def print_stages(result):
+    print("Etapas (p50 / p95 en ms):")
+    for stage, summary in sorted(result["stages"].items()):
+        print(f"    {stage:<16} {summary['p50'] * 1000:8.1f} {summary['p95'] * 1000:8.1f}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark de descarga contra un catálogo simulado.")
+    parser.add_argument("--engine", choices=("threads", "async"), help="Motor de descarga (por defecto, el de la configuración).")
+    parser.add_argument("--config", help="Archivo de configuración base (por defecto YUPOO_CONFIG o config.json).")
+    parser.add_argument("--max-workers", type=int, help="Descargas simultáneas iniciales.")
+    parser.add_argument("--archive", choices=("zip", "tar"), help="Guardar cada álbum en un archivo ZIP o TAR en lugar de en una carpeta.")
+    parser.add_argument("--inflight-mb", type=float, help="Presupuesto de MB de imágenes en memoria (inflight_max_mb).")
+    parser.add_argument("--runs", type=int, default=3, help="Ejecuciones, cada una en una carpeta vacía.")
+    parser.add_argument("--keep-rate-limit", action="store_true", help="Conservar los límites de peticiones de la configuración.")
+    parser.add_argument("--json", action="store_true", help="Escribir los resultados en JSON.")
+    add_options(parser)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cert_dir = tempfile.mkdtemp(prefix="yupoo-standin-")
+    server, url, cert = start_server(args, cert_dir)
+    # El cliente debe aceptar el certificado autofirmado del servidor (requests y aiohttp)
+    os.environ["REQUESTS_CA_BUNDLE"] = cert
+    os.environ["SSL_CERT_FILE"] = cert
+
+    from yupoo_downloader.downloader import load_config
+    import logging
+    logging.getLogger().setLevel(logging.WARNING)
+    config = load_config(args.config)
+    config["metrics"] = False
+    if not args.keep_rate_limit:
+        config["html_rate"] = config["image_rate"] = 0
+    for key, value in (("engine", args.engine), ("max_workers", args.max_workers), ("archive", args.archive), ("inflight_max_mb", args.inflight_mb)):
+        if value is not None:
+            config[key] = value
+
+    results = []
+    try:
+        for number in range(1, args.runs + 1):
+            result = run_once(url, config)
+            results.append(result)
+            if not args.json:
+                print_run(number, result)
+    finally:
+        server_stats = stop_server(server)
+        shutil.rmtree(cert_dir, ignore_errors=True)
+
+    summary = {
+        "engine": config.get("engine", "threads"),
+        "images_per_second": statistics.median(result["images_per_second"] for result in results),
+        "mb_per_second": statistics.median(result["mb_per_second"] for result in results),
+        "cpu_percent": statistics.median(result["cpu_percent"] for result in results),
+        "peak_rss_mb": results[-1]["peak_rss_mb"],
+        "server": server_stats,
+    }
+    if args.json:
+        print(json.dumps({"summary": summary, "runs": results}, indent=2))
+        return
+    print_stages(results[-1])
+    print(
+        f"Mediana ({summary['engine']}): {summary['images_per_second']:.1f} img/s, {summary['mb_per_second']:.1f} MB/s, "
+        f"CPU {summary['cpu_percent']:.0f} %"
+    )
+    print(f"Servidor: {server_stats}")
+
+
+if __name__ == "__main__":
+    main()
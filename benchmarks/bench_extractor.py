@@ -0,0 +1,80 @@
+"""
+Micro-benchmark de la extracción de HTML sobre las páginas guardadas en fixtures/.
+Compara el extractor lxml de src/yupoo_downloader/extractor.py con el método anterior basado en
+BeautifulSoup y comprueba que ambos devuelven los mismos resultados.
+
+Uso:
+    python benchmarks/bench_extractor.py [--number N]
+"""
+import os
+import re
+import sys
+import timeit
+import argparse
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, os.pardir, "src"))
+
+from yupoo_downloader.extractor import extract_listing, extract_image_urls  # noqa: E402
+
+
+def bs4_listing(content):
+    """
+    Extracción del listado tal y como se hacía con BeautifulSoup.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, features="lxml")
+    links = [link.get("href") for link in soup.find_all("a", class_="album__main")]
+    titles = [link.get("title") for link in soup.find_all("a", class_="album__main")]
+    pages = []
+    for element in soup.select('[class*="pagination"] a[href], [class*="pagination"] input[max]'):
+        match = re.search(r'[?&]pag(?:e)?=(\d+)', element.get("href", ""))
+        if match:
+            pages.append(int(match.group(1)))
+        if element.get("max", "").isdigit():
+            pages.append(int(element["max"]))
+    return list(zip(links, titles)), (max(pages) if pages else None)
+
+
+def bs4_image_urls(content):
+    """
+    Extracción de las imágenes del álbum tal y como se hacía con BeautifulSoup.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(content, "lxml")
+    return ["https:" + x["data-src"] for image_class in [".image__landscape", ".image__portrait"] for x in soup.select(image_class)]
+
+
+def read_fixture(name):
+    with open(os.path.join(BENCH_DIR, "fixtures", name), "rb") as f:
+        return f.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la extracción de HTML.")
+    parser.add_argument("--number", type=int, default=50, help="Repeticiones por medición.")
+    args = parser.parse_args()
+
+    cases = [
+        ("listado", read_fixture("listing.html"), extract_listing, bs4_listing),
+        ("álbum", read_fixture("album.html"), extract_image_urls, bs4_image_urls),
+    ]
+    try:
+        import bs4  # noqa: F401
+    except ImportError:
+        print("beautifulsoup4 no está instalado: solo se mide el extractor lxml.")
+        cases = [(name, content, fast, None) for name, content, fast, _ in cases]
+
+    for name, content, fast, reference in cases:
+        fast_ms = min(timeit.repeat(lambda: fast(content), number=args.number, repeat=3)) / args.number * 1000
+        line = f"{name:<8} lxml: {fast_ms:7.2f} ms/página"
+        if reference is not None:
+            if fast(content) != reference(content):
+                raise SystemExit(f"El extractor no coincide con BeautifulSoup en la página de {name}")
+            slow_ms = min(timeit.repeat(lambda: reference(content), number=args.number, repeat=3)) / args.number * 1000
+            line += f"   BeautifulSoup: {slow_ms:7.2f} ms/página   ({slow_ms / fast_ms:.1f}x)"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Mide el tiempo de importación de los módulos de arranque con `python -X importtime`.
+
+Uso:
+    python benchmarks/import_time.py [--runs N] [--top N]
+"""
+import os
+import re
+import sys
+import argparse
+import statistics
+import subprocess
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+
+# Cada escenario es un fragmento de código que se ejecuta en un intérprete nuevo
+SCENARIOS = {
+    "gui (primera ventana)": "import yupoo_downloader.gui",
+    "downloader (primera petición)": (
+        "import tempfile; from yupoo_downloader.downloader import YupooDownloader; "
+        "YupooDownloader('https://x.yupoo.com/albums?pag=1', tempfile.mkdtemp(), config={}).close()"
+    ),
+}
+
+LINE_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+
+
+def run_scenario(code, ignore=()):
+    """
+    Ejecuta un escenario y devuelve el tiempo total y el tiempo acumulado de cada módulo
+    importado directamente por los módulos de primer nivel (en µs), sin contar los módulos
+    de `ignore` (los que carga el propio intérprete al arrancar).
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    )
+    total = 0
+    modules = {}
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match or match.group(4) in ignore:
+            continue
+        # La sangría indica la profundidad: 1 espacio para el primer nivel, 3 para el segundo
+        depth = (len(match.group(3)) - 1) // 2
+        if depth == 0:
+            total += int(match.group(2))
+        elif depth == 1:
+            modules[match.group(4)] = int(match.group(2))
+    return total, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de importación.")
+    parser.add_argument("--runs", type=int, default=5, help="Repeticiones por escenario.")
+    parser.add_argument("--top", type=int, default=8, help="Módulos más costosos a mostrar.")
+    args = parser.parse_args()
+
+    startup = set(run_scenario("pass")[1]) | {"site", "encodings"}
+    for name, code in SCENARIOS.items():
+        totals = []
+        last = {}
+        for _ in range(args.runs):
+            total, last = run_scenario(code, ignore=startup)
+            totals.append(total)
+        print(f"{name}: mediana {statistics.median(totals) / 1000:.1f} ms ({args.runs} ejecuciones)")
+        for module, micros in sorted(last.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+            print(f"    {module:<30} {micros / 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""
+Servidor local que imita a Yupoo para medir el descargador sin tocar el sitio real.
+Sirve páginas de listado (enlaces `album__main` y paginación), páginas de álbum
+(`image__landscape`/`image__portrait` con `data-src`) e imágenes sintéticas, con latencia,
+variación, tamaños, tasa de errores y limitación configurables. Responde con ETag y 304,
+y acepta peticiones Range para las reanudaciones.
+
+El extractor convierte los `data-src` en URLs https, así que el servidor usa TLS con un
+certificado autofirmado que se genera al arrancar con el comando `openssl`. Los clientes
+deben confiar en él con REQUESTS_CA_BUNDLE y SSL_CERT_FILE.
+
+Uso:
+    python benchmarks/standin.py [--albums N] [--images N] [--latency MS] [--error-rate P] ...
+
+Al arrancar escribe en la salida estándar una línea JSON con la URL del catálogo y la ruta
+del certificado.
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.server
+import ssl
+
+# Como en las páginas reales, la codificación se declara en el propio HTML
+HEAD = '<meta charset="utf-8">'
+
+# Bloque de bytes aleatorios del que se recortan las imágenes: se comprimen mal, como un JPEG
+PAYLOAD_BLOCK = random.Random(0).getrandbits(8 * 1024 * 1024).to_bytes(1024 * 1024, "little")
+
+
+class StandinOptions:
+    """
+    Parámetros del servidor simulado.
+    """
+
+    def __init__(self, albums=20, images=30, pages=1, image_size=150_000, size_spread=0.5, latency=20.0, jitter=10.0,
+                 error_rate=0.0, max_rps=0.0, bandwidth=0.0, seed=0):
+        """
+        Args:
+            albums (int): Álbumes por página del listado.
+            images (int): Imágenes por álbum.
+            pages (int): Páginas del listado.
+            image_size (int): Tamaño medio de las imágenes en bytes.
+            size_spread (float): Dispersión logarítmica de los tamaños (0 para tamaño fijo).
+            latency (float): Latencia media de cada respuesta en milisegundos.
+            jitter (float): Variación máxima de la latencia en milisegundos, hacia arriba o abajo.
+            error_rate (float): Probabilidad de responder 503 a una petición de imagen.
+            max_rps (float): Peticiones por segundo a partir de las que se responde 429 (0 sin límite).
+            bandwidth (float): Bytes por segundo de cada respuesta de imagen (0 sin límite).
+            seed (int): Semilla de los tamaños, para que sean iguales entre ejecuciones.
+        """
+        self.albums = albums
+        self.images = images
+        self.pages = pages
+        self.image_size = image_size
+        self.size_spread = size_spread
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_rps = max_rps
+        self.bandwidth = bandwidth
+        self.seed = seed
+
+
+class StandinHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        server = self.server
+        server.count("requests")
+        self._delay()
+        path = self.path.split("?")[0]
+        match = re.search(r"/img/(\d+)/(\d+)\.jpg$", path)
+        if match:
+            return self._image(int(match.group(1)), int(match.group(2)))
+        match = re.search(r"/albums/(\d+)$", path)
+        if match:
+            return self._html(server.album_page(int(match.group(1)), self.headers["Host"]))
+        match = re.search(r"[?&]pag=(\d+)", self.path)
+        return self._html(server.listing_page(int(match.group(1)) if match else 1))
+
+    def _delay(self):
+        options = self.server.options
+        delay = options.latency + random.uniform(-options.jitter, options.jitter)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _html(self, body):
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            self.server.count("not_modified")
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _image(self, album, position):
+        server = self.server
+        options = server.options
+        if not server.admit():
+            server.count("throttled")
+            return self._error(429)
+        if options.error_rate and random.random() < options.error_rate:
+            server.count("errors")
+            return self._error(503)
+
+        body = server.image(album, position)
+        start = 0
+        match = re.match(r"bytes=(\d+)-", self.headers.get("Range", ""))
+        if match and int(match.group(1)) < len(body):
+            start = int(match.group(1))
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "image/jpeg")
+        self.send_header("ETag", '"%s"' % hashlib.md5(body).hexdigest())
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        if self.command == "HEAD":
+            return
+        server.count("images")
+        server.count("bytes", len(body) - start)
+        self._send_body(memoryview(body)[start:])
+
+    def _send_body(self, body):
+        bandwidth = self.server.options.bandwidth
+        if not bandwidth:
+            self.wfile.write(body)
+            return
+        # Se envía por trozos de 1/20 de segundo para simular un enlace lento
+        step = max(int(bandwidth / 20), 1024)
+        for offset in range(0, len(body), step):
+            self.wfile.write(body[offset:offset + step])
+            time.sleep(step / bandwidth)
+
+    def _error(self, status):
+        self.send_response(status)
+        self.send_header("Retry-After", "1")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+class StandinServer(http.server.ThreadingHTTPServer):
+    """
+    Servidor HTTPS multihilo con el catálogo simulado.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, options, cert_dir, host="127.0.0.1", port=0):
+        super().__init__((host, port), StandinHandler)
+        self.options = options
+        self.cert_file = generate_certificate(cert_dir, host)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file, os.path.join(cert_dir, "key.pem"))
+        # El saludo TLS se hace en el hilo de cada conexión, no en el bucle que las acepta
+        self.socket = context.wrap_socket(self.socket, server_side=True, do_handshake_on_connect=False)
+        self.stats = {}
+        self._lock = threading.Lock()
+        self._window = (0, 0)
+
+    @property
+    def catalog_url(self):
+        # _album_url construye las URLs de los álbumes a partir de 'x.yupoo.com' en la URL del catálogo
+        host, port = self.server_address[:2]
+        return f"https://{host}:{port}/x.yupoo.com/albums?tab=gallery&pag=1"
+
+    def handle_error(self, request, client_address):
+        # Los clientes cortan conexiones al detener o reintentar una descarga: no es un fallo del servidor
+        if not isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            super().handle_error(request, client_address)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.stats[name] = self.stats.get(name, 0) + value
+
+    def admit(self):
+        """
+        Aplica el límite de peticiones por segundo con una ventana fija de un segundo.
+        """
+        if not self.options.max_rps:
+            return True
+        with self._lock:
+            second = int(time.monotonic())
+            start, used = self._window
+            if start != second:
+                start, used = second, 0
+            self._window = (start, used + 1)
+            return used < self.options.max_rps
+
+    def listing_page(self, page):
+        options = self.options
+        first = (page - 1) * options.albums
+        links = "".join(
+            f'<a class="album__main" href="/albums/{album}?uid=1" title="Álbum {album}"></a>'
+            for album in range(first, first + options.albums)
+        )
+        pagination = "".join(f'<a href="?tab=gallery&pag={n}">{n}</a>' for n in range(1, options.pages + 1))
+        return f'<html><head>{HEAD}</head><body>{links}<div class="pagination__main">{pagination}</div></body></html>'.encode("utf-8")
+
+    def album_page(self, album, host):
+        images = "".join(
+            f'<div class="image__{"landscape" if position % 2 else "portrait"}" data-src="//{host}/img/{album}/{position}.jpg"></div>'
+            for position in range(self.options.images)
+        )
+        return f"<html><head>{HEAD}</head><body>{images}</body></html>".encode("utf-8")
+
+    def image(self, album, position):
+        """
+        Devuelve el contenido de una imagen. El tamaño sigue una distribución lognormal y depende
+        solo de la imagen; la cabecera la hace única para que el almacén no la deduplique.
+        """
+        options = self.options
+        rng = random.Random(f"{options.seed}/{album}/{position}")
+        size = int(options.image_size * rng.lognormvariate(0, options.size_spread)) if options.size_spread else options.image_size
+        header = f"\xff\xd8{album}/{position}/".encode("latin-1")
+        size = max(size, len(header))
+        offset = rng.randrange(len(PAYLOAD_BLOCK))
+        filler = (PAYLOAD_BLOCK[offset:] + PAYLOAD_BLOCK) * (size // len(PAYLOAD_BLOCK) + 1)
+        return header + filler[:size - len(header)]
+
+
+def generate_certificate(cert_dir, host):
+    """
+    Genera un certificado autofirmado para `host` con el comando openssl, si no existe ya.
+    Returns:
+        str: Ruta del certificado, que los clientes deben aceptar como CA.
+    """
+    cert_file = os.path.join(cert_dir, "cert.pem")
+    if not os.path.exists(cert_file):
+        # openssl no crea la carpeta de --cert-dir si todavía no existe
+        os.makedirs(cert_dir, exist_ok=True)
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-keyout", os.path.join(cert_dir, "key.pem"), "-out", cert_file,
+             "-subj", f"/CN={host}", "-addext", f"subjectAltName=IP:{host}"],
+            check=True, capture_output=True,
+        )
+    return cert_file
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Servidor local que imita un catálogo de Yupoo.")
+    parser.add_argument("--port", type=int, default=0, help="Puerto (0 para uno libre).")
+    parser.add_argument("--cert-dir", help="Carpeta del certificado TLS (por defecto, una temporal).")
+    parser.add_argument("--pages", type=int, default=1, help="Páginas del listado.")
+    add_options(parser)
+    return parser
+
+
+def add_options(parser):
+    """
+    Añade las opciones del catálogo simulado a un parser; las comparte el benchmark.
+    """
+    defaults = StandinOptions()
+    parser.add_argument("--albums", type=int, default=defaults.albums, help="Álbumes por página del listado.")
+    parser.add_argument("--images", type=int, default=defaults.images, help="Imágenes por álbum.")
+    parser.add_argument("--image-size", type=int, default=defaults.image_size, help="Tamaño medio de las imágenes en bytes.")
+    parser.add_argument("--size-spread", type=float, default=defaults.size_spread, help="Dispersión lognormal de los tamaños.")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Latencia media por respuesta en ms.")
+    parser.add_argument("--jitter", type=float, default=defaults.jitter, help="Variación de la latencia en ms.")
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="Probabilidad de 503 por imagen.")
+    parser.add_argument("--max-rps", type=float, default=defaults.max_rps, help="Peticiones por segundo antes de responder 429.")
+    parser.add_argument("--bandwidth", type=float, default=defaults.bandwidth, help="Bytes/s por respuesta de imagen.")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="Semilla de los tamaños de imagen.")
+
+
+def options_from_args(args):
+    return StandinOptions(
+        albums=args.albums, images=args.images, pages=getattr(args, "pages", 1), image_size=args.image_size,
+        size_spread=args.size_spread, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        max_rps=args.max_rps, bandwidth=args.bandwidth, seed=args.seed,
+    )
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cert_dir = args.cert_dir or tempfile.mkdtemp(prefix="yupoo-standin-")
+    server = StandinServer(options_from_args(args), cert_dir, port=args.port)
+    print(json.dumps({"url": server.catalog_url, "cert": server.cert_file}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Las estadísticas se escriben en la salida de error para no mezclarlas con la línea inicial
+        print(json.dumps(server.stats), file=sys.stderr, flush=True)
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,23 @@ from setuptools import setup, find_packages
 setup(
     name='yupoo-downloader',
     version='1.0.0',
-    packages=find_packages(where="src"),
+    # Los módulos viven en el paquete src/yupoo_downloader y se importan con su nombre completo
+    packages=find_packages('src'),
     package_dir={"": "src"},
     install_requires=[
         'requests',
-        'beautifulsoup4',
-        'pandas',
-        'lxml'
+        'lxml',
+        'Pillow',
     ],
+    extras_require={
+        'async': ['aiohttp'],
+    },
     python_requires='>=3.7',
     entry_points={
         'console_scripts': [
+            'yupoo-downloader-cli=yupoo_downloader.cli:main',
+        ],
+        'gui_scripts': [
             'yupoo-downloader=yupoo_downloader.gui:main',
         ],
     },
@@ -0,0 +1,439 @@
+import io
+import os
+import json
+import time
+import zlib
+import struct
+import logging
+import tarfile
+import zipfile
+import threading
+
+ARCHIVE_FORMATS = ("zip", "tar")
+INDEX_SUFFIX = ".index.json"
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+
+
+class AlbumArchives:
+    """
+    Salida de las descargas en archivos ZIP o TAR en lugar de carpetas con un JPEG por imagen.
+    Las imágenes se siguen identificando por su ruta de siempre (page{n}/{álbum}/{álbum}_1.jpg),
+    que se traduce a un archivo y un miembro: un archivo por álbum (page{n}/{álbum}.zip, miembro
+    {álbum}_1.jpg) o uno por página (page{n}.zip, miembro {álbum}/{álbum}_1.jpg).
+
+    Cada archivo mantiene un índice de sus miembros para leer cualquier imagen sin recorrerlo:
+    el directorio central en ZIP y un índice JSON junto al archivo en TAR. El índice se guarda
+    cada `checkpoint` imágenes y al cerrar el álbum; si la ejecución se corta, lo añadido después
+    del último punto de control se descarta y se vuelve a descargar.
+    """
+
+    def __init__(self, download_folder, fmt="zip", per="album", checkpoint=16):
+        """
+        Args:
+            download_folder (str): Carpeta de descargas.
+            fmt (str): 'zip' o 'tar'.
+            per (str): 'album' para un archivo por álbum o 'page' para uno por página del listado.
+            checkpoint (int): Imágenes añadidas entre dos escrituras del índice.
+        """
+        if fmt not in ARCHIVE_FORMATS:
+            raise ValueError(f"Formato de archivo no válido: {fmt!r} (se admite {', '.join(ARCHIVE_FORMATS)})")
+        if per not in ("album", "page"):
+            raise ValueError(f"archive_per debe ser 'album' o 'page', no {per!r}")
+        self.download_folder = download_folder
+        self.fmt = fmt
+        self.per = per
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._archives = {}
+
+    def locate(self, path):
+        """
+        Traduce la ruta de una imagen (o de cualquier archivo del álbum) a su archivo y miembro.
+        Returns:
+            tuple: (ruta del archivo, nombre del miembro)
+        """
+        folder, name = os.path.split(path)
+        archive_path, prefix = self._locate_folder(folder)
+        return archive_path, prefix + name
+
+    def _locate_folder(self, folder):
+        folder = os.path.normpath(folder)
+        if self.per == "page":
+            return f"{os.path.dirname(folder)}.{self.fmt}", os.path.basename(folder) + "/"
+        return f"{folder}.{self.fmt}", ""
+
+    def _archive(self, archive_path):
+        with self._lock:
+            archive = self._archives.get(archive_path)
+            if archive is None:
+                archive_class = ZipArchive if self.fmt == "zip" else TarArchive
+                archive = self._archives[archive_path] = archive_class(archive_path, self.checkpoint)
+            return archive
+
+    def members(self, folder):
+        """
+        Devuelve los archivos de un álbum guardados en su archivo, en el orden en que se añadieron.
+        Args:
+            folder (str): Carpeta del álbum (page{n}/{álbum}).
+        Returns:
+            list: Nombres de los archivos del álbum (sin la carpeta).
+        """
+        archive_path, prefix = self._locate_folder(folder)
+        if not os.path.exists(archive_path) and archive_path not in self._archives:
+            return []
+        names = self._archive(archive_path).names()
+        return [name[len(prefix):] for name in names if name.startswith(prefix) and "/" not in name[len(prefix):]]
+
+    def exists(self, path):
+        return self.size(path) is not None
+
+    def size(self, path):
+        """
+        Returns:
+            int: Tamaño de la imagen dentro de su archivo, o None si no está.
+        """
+        entry = self._entry(path)
+        return entry[1] if entry else None
+
+    def version(self, path):
+        """
+        Devuelve un identificador que cambia si el contenido del miembro cambia (p. ej. para la
+        caché de miniaturas), o None si no está.
+        """
+        entry = self._entry(path)
+        return f"{entry[0]}-{entry[1]}" if entry else None
+
+    def _entry(self, path):
+        archive_path, member = self.locate(path)
+        if not os.path.exists(archive_path) and archive_path not in self._archives:
+            return None
+        return self._archive(archive_path).entry(member)
+
+    def open(self, path):
+        """
+        Abre un miembro para leerlo sin extraer el archivo.
+        Returns:
+            BytesIO: Contenido del miembro.
+        Raises:
+            KeyError: Si el miembro no está en el archivo.
+        """
+        archive_path, member = self.locate(path)
+        if not os.path.exists(archive_path) and archive_path not in self._archives:
+            raise KeyError(member)
+        return io.BytesIO(self._archive(archive_path).read(member))
+
+    def add(self, path, data):
+        """
+        Añade (o sustituye) un archivo del álbum. Es seguro llamarlo desde varios hilos. Si ya
+        existe con el mismo contenido no se hace nada; con otro contenido el archivo se reescribe
+        sin la copia anterior, de modo que nunca hay dos miembros con el mismo nombre.
+        Args:
+            path (str): Ruta de la imagen, como si se guardara en la carpeta del álbum.
+            data (bytes): Contenido.
+        Returns:
+            int: Bytes escritos.
+        """
+        archive_path, member = self.locate(path)
+        self._archive(archive_path).add(member, data)
+        return len(data)
+
+    def close_album(self, folder):
+        """
+        Guarda el índice al terminar un álbum. Con un archivo por álbum, además lo cierra.
+        """
+        archive_path, _ = self._locate_folder(folder)
+        with self._lock:
+            archive = self._archives.get(archive_path)
+            if archive is not None and self.per == "album":
+                del self._archives[archive_path]
+        if archive is None:
+            return
+        if self.per == "album":
+            archive.close()
+        else:
+            archive.flush()
+
+    def close(self):
+        with self._lock:
+            archives = list(self._archives.values())
+            self._archives.clear()
+        for archive in archives:
+            archive.close()
+
+
+class ZipArchive:
+    """
+    Archivo ZIP sin compresión (los JPEG no se reducen y así cada miembro se lee directamente).
+    El directorio central hace de índice; se reescribe en cada punto de control cerrando el
+    archivo, que vuelve a abrirse en modo 'a' con la siguiente imagen.
+    """
+
+    def __init__(self, path, checkpoint=16):
+        self.path = path
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._zip = None
+        self._pending = 0
+        self._index = self._load() if os.path.exists(path) else {}
+
+    def _load(self):
+        try:
+            with zipfile.ZipFile(self.path) as zf:
+                return {info.filename: info for info in zf.infolist()}
+        except zipfile.BadZipFile:
+            # Ejecución cortada antes de escribir el directorio central: se recuperan los miembros completos
+            if not salvage_zip(self.path):
+                return {}
+            with zipfile.ZipFile(self.path) as zf:
+                return {info.filename: info for info in zf.infolist()}
+
+    def names(self):
+        with self._lock:
+            return list(self._index)
+
+    def entry(self, name):
+        with self._lock:
+            info = self._index.get(name)
+        return (f"{info.CRC:08x}", info.file_size) if info else None
+
+    def read(self, name):
+        with self._lock:
+            return self._read(name)
+
+    def _read(self, name):
+        if self._zip is not None:
+            return self._zip.read(name)
+        with zipfile.ZipFile(self.path) as zf:
+            return zf.read(name)
+
+    def add(self, name, data):
+        with self._lock:
+            if name in self._index:
+                if self._read(name) == data:
+                    return
+                self._remove(name)
+            if self._zip is None:
+                self._zip = zipfile.ZipFile(self.path, "a", compression=zipfile.ZIP_STORED)
+            info = zipfile.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = zipfile.ZIP_STORED
+            self._zip.writestr(info, data)
+            self._index[name] = info
+            self._pending += 1
+            if self._pending >= self.checkpoint:
+                self._close()
+
+    def _remove(self, name):
+        # ZIP no permite borrar un miembro: se copia el resto a un archivo nuevo
+        self._close()
+        tmp = f"{self.path}.rewrite"
+        with zipfile.ZipFile(self.path) as src, zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as out:
+            for info in src.infolist():
+                if info.filename != name:
+                    out.writestr(info, src.read(info))
+        os.replace(tmp, self.path)
+        del self._index[name]
+
+    def flush(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+
+
+class TarArchive:
+    """
+    Archivo TAR sin comprimir con un índice JSON al lado ({archivo}.index.json) que guarda la
+    posición y el tamaño de cada miembro, y el final de los datos ya confirmados. Al reabrirlo se
+    trunca en ese punto, así que una imagen a medio escribir nunca queda dentro del archivo.
+    """
+
+    def __init__(self, path, checkpoint=16):
+        self.path = path
+        self.index_path = path + INDEX_SUFFIX
+        self.checkpoint = checkpoint
+        self._lock = threading.Lock()
+        self._tar = None
+        self._pending = 0
+        self._end, self._index = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return 0, {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if os.path.getsize(self.path) >= index["end"]:
+                return index["end"], {name: tuple(entry) for name, entry in index["members"].items()}
+        except (OSError, ValueError, KeyError):
+            pass
+        # Sin índice válido (p. ej. un TAR copiado a mano) se reconstruye leyendo las cabeceras
+        members = {}
+        end = 0
+        try:
+            with tarfile.open(self.path, "r") as tar:
+                for info in tar:
+                    if info.isfile():
+                        members[info.name] = (info.offset_data, info.size)
+                    end = info.offset_data + _tar_blocks(info.size)
+        except (tarfile.TarError, OSError) as e:
+            quarantine(self.path, e)
+            return 0, {}
+        return end, members
+
+    def names(self):
+        with self._lock:
+            return list(self._index)
+
+    def entry(self, name):
+        with self._lock:
+            return self._index.get(name)
+
+    def read(self, name):
+        with self._lock:
+            return self._read(name)
+
+    def _read(self, name):
+        offset, size = self._index[name]
+        if self._tar is not None:
+            self._tar.fileobj.flush()
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return f.read(size)
+
+    def add(self, name, data):
+        with self._lock:
+            if name in self._index:
+                if self._read(name) == data:
+                    return
+                self._remove(name)
+            if self._tar is None:
+                f = open(self.path, "r+b" if os.path.exists(self.path) else "w+b")
+                f.truncate(self._end)
+                f.seek(self._end)
+                self._tar = tarfile.open(fileobj=f, mode="w", format=tarfile.PAX_FORMAT)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = time.time()
+            self._tar.addfile(info, io.BytesIO(data))
+            # addfile deja offset al final del miembro, ya rellenado a bloques de 512 bytes
+            self._end = self._tar.offset
+            self._index[name] = (self._end - _tar_blocks(info.size), info.size)
+            self._tar.members.clear()
+            self._pending += 1
+            if self._pending >= self.checkpoint:
+                self._write_index()
+
+    def _write_index(self):
+        if self._tar is not None:
+            self._tar.fileobj.flush()
+            os.fsync(self._tar.fileobj.fileno())
+        tmp = f"{self.index_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"end": self._end, "members": self._index}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self._pending = 0
+
+    def _remove(self, name):
+        # Se copia el resto de miembros a un TAR nuevo. El índice viejo se borra antes de
+        # sustituir el archivo: si la ejecución se corta en medio, se reconstruye leyendo el TAR
+        self._close_tar()
+        tmp = f"{self.path}.rewrite"
+        index = {}
+        with open(self.path, "rb") as src, open(tmp, "w+b") as f:
+            tar = tarfile.open(fileobj=f, mode="w", format=tarfile.PAX_FORMAT)
+            for member, (offset, size) in self._index.items():
+                if member == name:
+                    continue
+                src.seek(offset)
+                info = tarfile.TarInfo(member)
+                info.size = size
+                info.mtime = time.time()
+                tar.addfile(info, io.BytesIO(src.read(size)))
+                index[member] = (tar.offset - _tar_blocks(size), size)
+                tar.members.clear()
+            end = tar.offset
+            tar.close()
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(self.index_path):
+            os.remove(self.index_path)
+        os.replace(tmp, self.path)
+        self._end, self._index = end, index
+        self._write_index()
+
+    def flush(self):
+        with self._lock:
+            if self._pending:
+                self._write_index()
+
+    def close(self):
+        with self._lock:
+            if self._pending:
+                self._write_index()
+            self._close_tar()
+
+    def _close_tar(self):
+        if self._tar is not None:
+            # Escribe el final del TAR; la siguiente apertura lo trunca y sigue añadiendo
+            fileobj = self._tar.fileobj
+            self._tar.close()
+            fileobj.close()
+            self._tar = None
+
+
+def _tar_blocks(size):
+    return (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+
+
+def salvage_zip(path):
+    """
+    Recupera un ZIP sin directorio central válido (ejecución interrumpida) recorriendo las
+    cabeceras locales y copiando a un ZIP nuevo los miembros completos sin compresión.
+    Returns:
+        int: Miembros recuperados.
+    """
+    tmp = f"{path}.salvage"
+    recovered = 0
+    with open(path, "rb") as f, zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED) as out:
+        while True:
+            header = f.read(_ZIP_LOCAL_HEADER.size)
+            if len(header) < _ZIP_LOCAL_HEADER.size:
+                break
+            signature, _, flags, method, mtime, mdate, crc, compressed, size, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack(header)
+            # Un miembro a medio escribir conserva la cabecera provisional con tamaño 0
+            if signature != b"PK\x03\x04" or method != zipfile.ZIP_STORED or flags & 0x08 or compressed != size:
+                break
+            name = f.read(name_length).decode("utf-8" if flags & 0x800 else "cp437")
+            f.seek(extra_length, os.SEEK_CUR)
+            data = f.read(size)
+            if len(data) < size or zlib.crc32(data) != crc:
+                break
+            info = zipfile.ZipInfo(name, ((mdate >> 9) + 1980, (mdate >> 5) & 0xF, mdate & 0x1F, mtime >> 11, (mtime >> 5) & 0x3F, (mtime & 0x1F) * 2))
+            out.writestr(info, data)
+            recovered += 1
+    if not recovered:
+        os.remove(tmp)
+        quarantine(path, "no es un ZIP válido")
+        return 0
+    os.replace(tmp, path)
+    logging.warning(f"Archivo {path} recuperado tras una interrupción: {recovered} miembros completos")
+    return recovered
+
+
+def quarantine(path, error):
+    """
+    Aparta un archivo ilegible para empezar uno nuevo en su lugar.
+    """
+    broken = f"{path}.{int(time.time())}.broken"
+    os.replace(path, broken)
+    if os.path.exists(path + INDEX_SUFFIX):
+        os.remove(path + INDEX_SUFFIX)
+    logging.error(f"No se pudo leer {path} ({error}); se ha movido a {broken}")
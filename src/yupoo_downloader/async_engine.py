@@ -0,0 +1,278 @@
+import os
+import time
+import asyncio
+import logging
+import contextlib
+import threading
+from yupoo_downloader.http_client import DEFAULT_HEADERS
+from urllib.parse import urlsplit
+from yupoo_downloader.concurrency import is_overload_status
+from yupoo_downloader.retry_policy import parse_retry_after
+from yupoo_downloader.metrics import error_class
+from yupoo_downloader.disk_writer import write_file
+
+
+class AsyncEngine:
+    """
+    Motor de descarga asíncrono alternativo al ThreadPoolExecutor.
+    Ejecuta un único bucle de eventos en un hilo propio y limita las descargas
+    simultáneas con el controlador adaptativo del descargador, reutilizando la misma sesión
+    HTTP entre álbumes.
+    """
+
+    def __init__(self, downloader, concurrency=100, stop_event=None, pause_event=None):
+        """
+        Args:
+            downloader (YupooDownloader): Descargador que guarda las imágenes en disco.
+            concurrency (int): Número máximo de conexiones simultáneas.
+            stop_event (Event): Evento que cancela las descargas pendientes al activarse.
+            pause_event (Event): Evento que, mientras está desactivado, pausa las descargas.
+        """
+        try:
+            import aiohttp
+        except ImportError as e:
+            raise ImportError("El motor 'async' requiere aiohttp. Instálalo con: pip install aiohttp") from e
+        self._aiohttp = aiohttp
+        self.downloader = downloader
+        self.concurrency = concurrency
+        self.stop_event = stop_event
+        self.pause_event = pause_event
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="yupoo-async-engine", daemon=True)
+        self._thread.start()
+        self._session = None
+        self._window = None
+        self._pending_writes = set()
+        asyncio.run_coroutine_threadsafe(self._open(), self._loop).result()
+
+    async def _open(self):
+        aiohttp = self._aiohttp
+        headers = {k: v for k, v in DEFAULT_HEADERS.items() if k != "Connection"}
+        connector = aiohttp.TCPConnector(limit=self.concurrency, limit_per_host=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.downloader.timeout)
+        self._session = aiohttp.ClientSession(headers=headers, connector=connector, timeout=timeout)
+        self._window = asyncio.Semaphore(self.downloader.submit_window)
+
+    def download(self, images):
+        """
+        Descarga todas las imágenes de un álbum y bloquea hasta que terminan.
+        Args:
+            images (list): Pares (URL, ruta de la imagen) a descargar.
+        Returns:
+            list: URLs de las imágenes que no se pudieron guardar.
+        """
+        return self.submit(images).result()
+
+    def submit(self, images):
+        """
+        Programa la descarga de un álbum en el bucle de eventos sin bloquear.
+        Varios álbumes programados a la vez comparten el mismo límite de concurrencia.
+        Returns:
+            concurrent.futures.Future: Futuro que se completa cuando termina el álbum.
+        """
+        return asyncio.run_coroutine_threadsafe(self._download_all(images), self._loop)
+
+    async def _download_all(self, images):
+        # Las tareas se crean a medida que terminan otras, con submit_window como máximo entre todos
+        # los álbumes en curso, para no tener una corrutina por cada imagen de un álbum enorme
+        window = self._window
+        tasks = []
+        watcher = asyncio.ensure_future(self._watch_stop(tasks))
+        try:
+            for url, image_name in images:
+                await window.acquire()
+                if self.stop_event is not None and self.stop_event.is_set():
+                    window.release()
+                    break
+                task = asyncio.ensure_future(self._download_and_save(url, image_name))
+                task.add_done_callback(lambda _: window.release())
+                tasks.append(task)
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            watcher.cancel()
+        failed = []
+        # Al detener la descarga las imágenes que no llegaron a programarse quedan pendientes
+        results = list(results) + [None] * (len(images) - len(results))
+        for (url, image_name), result in zip(images, results):
+            if isinstance(result, Exception):
+                logging.error(f"Error al descargar {url}: {result}")
+                self.downloader.failed_images.append(url)
+                self.downloader.metrics.inc("images_total", result="failed")
+                self.downloader._emit("image_failed", url=url, error=str(result))
+            if not self.downloader._image_saved(image_name):
+                failed.append(url)
+        return failed
+
+    async def _watch_stop(self, tasks):
+        while self.stop_event is not None:
+            if self.stop_event.is_set():
+                for task in tasks:
+                    task.cancel()
+                return
+            await asyncio.sleep(0.2)
+
+    async def _wait_if_paused(self):
+        while self.pause_event is not None and not self.pause_event.is_set():
+            await asyncio.sleep(0.2)
+
+    async def _download_and_save(self, url, image_name):
+        await self._wait_if_paused()
+        loop = asyncio.get_running_loop()
+        while True:
+            claim = await loop.run_in_executor(None, self.downloader._claim_image, url, image_name)
+            if claim is True:
+                return
+            if claim is False:
+                break
+            # Otra copia de la misma URL se está descargando: se espera sin bloquear el bucle
+            while not claim.is_set():
+                await asyncio.sleep(0.05)
+        try:
+            # Sin conexión la imagen queda pendiente
+            if self.downloader.offline:
+                self.downloader._image_pending(url)
+                return
+            await self._fetch_with_retries(url, image_name)
+        finally:
+            self.downloader._release_image(url)
+
+    async def _fetch_with_retries(self, url, image_name):
+        """
+        Aplica la política de reintentos y el cortacircuitos del descargador. Las esperas se hacen
+        con asyncio.sleep y fuera del límite de concurrencia.
+        """
+        aiohttp = self._aiohttp
+        downloader = self.downloader
+        host = urlsplit(url).hostname
+        attempt = 0
+        while True:
+            wait = downloader.breaker.wait_time(host)
+            while wait:
+                await asyncio.sleep(min(wait, 1.0))
+                wait = downloader.breaker.wait_time(host)
+            wait = await downloader.rate_limiter.acquire_async(host, "images")
+            if wait:
+                downloader.metrics.observe("rate_limit_wait", wait)
+            try:
+                # Los bytes del cuerpo cuentan en el presupuesto global hasta que la imagen está escrita
+                with downloader.byte_budget.reservation() as reservation:
+                    await self._fetch(url, image_name, reservation)
+            except (asyncio.TimeoutError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, aiohttp.ClientResponseError) as e:
+                status = getattr(e, "status", None)
+                headers = getattr(e, "headers", None) or {}
+                downloader.metrics.inc("errors_total", kind="images", error=error_class(e, status))
+                delay = downloader._retry_delay(host, attempt, status, parse_retry_after(headers.get("Retry-After")))
+                if delay is None:
+                    raise
+                downloader.metrics.inc("retries_total", kind="images")
+                logging.warning(f"Reintento {attempt + 1}/{downloader.retry_policy.retries} de {url} en {delay:.1f} s: {e!r}")
+                await asyncio.sleep(delay)
+                attempt += 1
+            except BaseException:
+                # Errores ajenos a la red o cancelación: la petición de prueba no puede quedar ocupada
+                downloader.breaker.release_probe(host)
+                raise
+            else:
+                downloader.breaker.record_success(host)
+                return
+
+    async def _fetch(self, url, image_name, reservation):
+        part_path = self.downloader._part_path(os.path.dirname(image_name), url)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        limiter = self.downloader.concurrency
+        metrics = self.downloader.metrics
+        await limiter.acquire_async()
+        metrics.inc("requests_total", kind="images")
+        start = time.monotonic()
+        received = 0
+        # Escritura en curso del último trozo: se espera a ella antes de entregar el siguiente para
+        # que lleguen al .part en orden y en memoria no haya más de dos
+        pending = None
+        append = False
+        try:
+            async with self._session.get(url, headers=headers) as res:
+                first_byte = time.monotonic()
+                metrics.observe("image_ttfb", first_byte - start)
+                if offset and (res.status == 416 or not self.downloader._range_matches(res.status, res.headers.get("Content-Range"), offset)):
+                    restart = True
+                else:
+                    restart = False
+                    res.raise_for_status()
+                    append = res.status == 206
+                    wait = await reservation.reserve_async(self.downloader._body_window(res.headers.get("Content-Length")))
+                    if wait:
+                        metrics.observe("budget_wait", wait)
+                    async for chunk in res.content.iter_chunked(self.downloader.chunk_size):
+                        if pending is not None:
+                            await asyncio.shield(pending)
+                        pending = asyncio.ensure_future(self._write(write_file, part_path, chunk, append))
+                        append = True
+                        received += len(chunk)
+                    if pending is None and not append:
+                        # Cuerpo vacío: el .part debe existir igualmente para confirmarlo
+                        pending = asyncio.ensure_future(self._write(write_file, part_path, b"", False))
+                    await self._finish_part(pending)
+                    metrics.observe("image_transfer", time.monotonic() - first_byte)
+                    headers = res.headers
+        except asyncio.CancelledError:
+            # Al detener la descarga lo recibido ya está en el .part o en camino: la última escritura
+            # sigue fuera del bucle y se completa antes de cerrar el motor
+            if pending is not None and not pending.done():
+                self._pending_writes.add(pending)
+                pending.add_done_callback(self._pending_writes.discard)
+            raise
+        except (asyncio.TimeoutError, self._aiohttp.ClientConnectionError):
+            limiter.record(time.monotonic() - start, received, overloaded=True)
+            await self._finish_part(pending)
+            raise
+        except self._aiohttp.ClientResponseError as e:
+            limiter.record(time.monotonic() - start, received, overloaded=is_overload_status(e.status))
+            raise
+        except self._aiohttp.ClientPayloadError:
+            await self._finish_part(pending)
+            raise
+        finally:
+            limiter.release()
+            metrics.inc("bytes_total", received, kind="images")
+        latency = time.monotonic() - start
+        if restart:
+            # El servidor no acepta la reanudación: se descarta el parcial y se empieza de cero
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(part_path)
+            await self.downloader.rate_limiter.acquire_async(urlsplit(url).hostname, "images")
+            return await self._fetch(url, image_name, reservation)
+        limiter.record(latency, received)
+        await self._write(self.downloader._commit_image, url, part_path, image_name, headers)
+        self.downloader._emit("image_done", url=url, path=image_name, bytes=received, latency=latency)
+
+    @staticmethod
+    async def _finish_part(pending):
+        # Se espera a la última escritura: el siguiente intento calcula el Range con el tamaño del .part
+        if pending is not None:
+            await asyncio.shield(pending)
+
+    async def _write(self, fn, *args):
+        """
+        Entrega una escritura a los hilos de escritura del descargador y espera a que termine.
+        El envío bloquea si la cola está llena, así que se hace fuera del bucle de eventos.
+        """
+        loop = asyncio.get_running_loop()
+        future = await loop.run_in_executor(None, self.downloader.writer.submit, fn, *args)
+        return await asyncio.wrap_future(future)
+
+    async def _close(self):
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        await self._session.close()
+
+    def close(self):
+        """
+        Cierra la sesión HTTP y detiene el bucle de eventos tras guardar los parciales pendientes.
+        """
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
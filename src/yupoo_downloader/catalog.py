@@ -0,0 +1,130 @@
+import os
+import json
+import logging
+import threading
+
+
+class Album:
+    """
+    Álbum del catálogo: posición en el catálogo, enlace, título, página del listado en la que
+    apareció y URLs de sus imágenes.
+    """
+    __slots__ = ("index", "url", "href", "title", "page", "image_urls")
+
+    def __init__(self, index, url, href, title, page=None, image_urls=None):
+        self.index = index
+        self.url = url
+        self.href = href
+        self.title = title
+        self.page = page
+        self.image_urls = image_urls
+
+
+class AlbumCatalog:
+    """
+    Índice en memoria de los álbumes del catálogo y de las imágenes de cada uno.
+    Opcionalmente registra cada cambio en un diario JSONL de solo escritura al final, útil para
+    depurar y para reanudar una descarga en otro proceso.
+    """
+
+    def __init__(self, journal_path=None):
+        """
+        Args:
+            journal_path (str): Ruta del diario JSONL. Si es None, el catálogo solo vive en memoria.
+        """
+        self.journal_path = journal_path
+        self._albums = []
+        self._by_url = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, journal_path):
+        """
+        Reconstruye un catálogo reproduciendo su diario JSONL.
+        Args:
+            journal_path (str): Ruta del diario JSONL.
+        Returns:
+            AlbumCatalog: Catálogo con el estado guardado, o vacío si el diario no existe.
+        """
+        catalog = cls(journal_path)
+        if not os.path.exists(journal_path):
+            return catalog
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Una línea truncada al final indica que el proceso murió mientras escribía
+                    logging.warning(f"Línea inválida en el diario del catálogo {journal_path}")
+                    continue
+                if record["type"] == "albums":
+                    catalog._albums = [Album(i, *album) for i, album in enumerate(record["albums"])]
+                elif record["type"] == "album":
+                    catalog._albums.append(Album(len(catalog._albums), *record["album"]))
+                elif record["type"] == "images" and record["index"] < len(catalog._albums):
+                    catalog._albums[record["index"]].image_urls = record["urls"]
+        catalog._by_url = {album.url: album.index for album in catalog._albums}
+        return catalog
+
+    def set_albums(self, albums):
+        """
+        Reemplaza la lista de álbumes. Inicia un diario nuevo, ya que empieza otra ejecución.
+        Args:
+            albums (list): Tuplas (URL del álbum, href, título, página) en el orden del catálogo.
+        """
+        with self._lock:
+            self._albums = [Album(i, *album) for i, album in enumerate(albums)]
+            self._by_url = {album.url: album.index for album in self._albums}
+            self._write({"type": "albums", "albums": [list(album) for album in albums]}, mode="w")
+
+    def add_album(self, url, href, title, page=None):
+        """
+        Añade un álbum al final del catálogo si todavía no está.
+        Args:
+            url (str): URL del álbum.
+            href (str): Enlace relativo del álbum.
+            title (str): Título del álbum.
+            page (int): Página del listado en la que apareció.
+        Returns:
+            int: Posición del álbum en el catálogo.
+        """
+        with self._lock:
+            index = self._by_url.get(url)
+            if index is None:
+                index = len(self._albums)
+                self._albums.append(Album(index, url, href, title, page))
+                self._by_url[url] = index
+                self._write({"type": "album", "album": [url, href, title, page]})
+            return index
+
+    def set_images(self, index, image_urls):
+        """
+        Guarda las URLs de las imágenes de un álbum.
+        Args:
+            index (int): Posición del álbum en el catálogo.
+            image_urls (list): URLs de las imágenes en el orden del álbum.
+        """
+        with self._lock:
+            self._albums[index].image_urls = list(image_urls)
+            self._write({"type": "images", "index": index, "urls": list(image_urls)})
+
+    def album(self, index):
+        """
+        Devuelve el álbum en la posición indicada.
+        """
+        return self._albums[index]
+
+    def titles(self):
+        """
+        Devuelve los títulos de los álbumes en orden.
+        """
+        return [album.title for album in self._albums]
+
+    def __len__(self):
+        return len(self._albums)
+
+    def _write(self, record, mode="a"):
+        if not self.journal_path:
+            return
+        with open(self.journal_path, mode, encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
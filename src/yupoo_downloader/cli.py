@@ -0,0 +1,376 @@
+"""
+Modo por lotes sin interfaz gráfica: descarga uno o varios catálogos, cada uno en su propio
+proceso, y escribe el progreso en la salida estándar como líneas JSON. Con --watch se queda en
+marcha y sondea periódicamente cada catálogo para descargar solo los álbumes nuevos.
+
+Uso:
+    python -m yupoo_downloader.cli URL [URL ...] -o DESCARGAS [--file catalogos.txt] [--pages todas] [--processes 4]
+    python -m yupoo_downloader.cli -f catalogos.txt -o DESCARGAS --watch [--interval 15m] [--jitter 0.1]
+"""
+import os
+import re
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+import multiprocessing
+import concurrent.futures
+from urllib.parse import urlsplit
+
+# Códigos de salida (argparse termina con 2 si los argumentos no son válidos)
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_PARTIAL = 3
+EXIT_INTERRUPTED = 130
+
+
+def read_catalog_file(path):
+    """
+    Lee una lista de catálogos: una URL por línea, seguida opcionalmente del intervalo de sondeo
+    del modo vigilancia ('https://... 15m'); se ignoran las líneas vacías y las que empiezan
+    por '#'.
+    Args:
+        path (str): Ruta del archivo, o '-' para la entrada estándar.
+    Returns:
+        list: Pares (URL del catálogo, intervalo en segundos o None).
+    Raises:
+        ValueError: Si algún intervalo no es válido.
+    """
+    from yupoo_downloader.watch import parse_interval
+
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        lines = [line.split() for line in f if line.strip() and not line.strip().startswith("#")]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+    return [(parts[0], parse_interval(parts[1]) if len(parts) > 1 else None) for parts in lines]
+
+
+def catalog_folder(output, url):
+    """
+    Devuelve la carpeta de un catálogo dentro de la carpeta de salida. Se usa el nombre del
+    proveedor (el subdominio delante de .x.yupoo.com) o, si no lo hay, el host completo.
+    """
+    host = urlsplit(url).hostname or "catalogo"
+    supplier = host[:-len(".x.yupoo.com")] if host.endswith(".x.yupoo.com") else host
+    return os.path.join(output, re.sub(r'[<>:"/\\|?*]', '-', supplier))
+
+
+def emit(events, event, **fields):
+    events.put(dict(fields, event=event, ts=round(time.time(), 3)))
+
+
+def run_catalog(url, output, pages, config, events, queue=None):
+    """
+    Descarga un catálogo completo. Se ejecuta en un proceso del pool, con su propio descargador.
+    Args:
+        url (str): URL del catálogo, con el parámetro 'pag=n'.
+        output (str): Carpeta de descargas del catálogo.
+        pages (list): Páginas a recorrer, None para todas o False para solo la de la URL.
+        config (dict): Configuración del descargador.
+        events (Queue): Cola donde se publican los eventos de progreso.
+        queue (dict): Opciones de la cola de trabajos compartida (path, worker_id, lease,
+            image_jobs), o None para descargar el catálogo completo en este nodo.
+    Returns:
+        dict: Resumen con los álbumes y las imágenes que fallaron.
+    """
+    # Las importaciones pesadas se hacen en el proceso hijo
+    from yupoo_downloader.downloader import YupooDownloader
+    from yupoo_downloader.pipeline import CatalogPipeline
+
+    started = time.time()
+    os.makedirs(output, exist_ok=True)
+    with YupooDownloader(url, output, config=config) as downloader, downloader.profiling():
+        discover = None
+        if pages is not False:
+            from yupoo_downloader.crawler import CatalogCrawler
+            discover = CatalogCrawler(downloader, pages=pages).crawl
+        downloader.warm_up()
+        if queue is not None:
+            return _run_queue_worker(downloader, discover, config, events, queue, started)
+        pipeline = CatalogPipeline(
+            downloader,
+            discover=discover,
+            parse_workers=config.get("parse_workers", 2),
+            queue_size=config.get("pipeline_queue_size", 4),
+            on_catalog=lambda titles: emit(events, "catalog", catalog=url, albums=len(titles)),
+            on_album_done=lambda index, title: emit(events, "album_done", catalog=url, index=index, title=title),
+        )
+        titles = pipeline.run()
+        return {
+            "albums": len(titles),
+            "failed_albums": list(pipeline.failed_albums),
+            "failed_images": len(downloader.failed_images),
+            "pending_images": len(downloader.pending_images),
+            "elapsed": round(time.time() - started, 3),
+        }
+
+
+def watch_catalog(url, output, config, events):
+    """
+    Hace un sondeo del modo vigilancia: recorre las primeras páginas del listado hasta llegar a
+    álbumes conocidos y descarga solo los nuevos. Se ejecuta en un proceso del pool.
+    Args:
+        url (str): URL del catálogo, con el parámetro 'pag=n'.
+        output (str): Carpeta de descargas del catálogo.
+        config (dict): Configuración del descargador.
+        events (Queue): Cola donde se publican los eventos de progreso.
+    Returns:
+        dict: Resumen del sondeo.
+    """
+    from yupoo_downloader.downloader import YupooDownloader
+    from yupoo_downloader.pipeline import CatalogPipeline
+    from yupoo_downloader.watch import CatalogWatcher
+
+    started = time.time()
+    os.makedirs(output, exist_ok=True)
+    with YupooDownloader(url, output, config=config) as downloader, downloader.profiling():
+        watcher = CatalogWatcher(downloader, max_pages=config.get("watch_max_pages", 0))
+        pipeline = CatalogPipeline(
+            downloader,
+            discover=watcher.discover,
+            parse_workers=config.get("parse_workers", 2),
+            queue_size=config.get("pipeline_queue_size", 4),
+            on_album_done=lambda index, title: emit(events, "album_done", catalog=url, index=index, title=title),
+        )
+        pipeline.run()
+        return {
+            "pages": watcher.pages_fetched,
+            "new_albums": watcher.new_albums,
+            "retried_albums": watcher.retried_albums,
+            "failed_albums": list(pipeline.failed_albums),
+            "failed_images": len(downloader.failed_images),
+            "pending_images": len(downloader.pending_images),
+            "elapsed": round(time.time() - started, 3),
+        }
+
+
+def _watch_catalogs(executor, folders, intervals, jitter, config, events):
+    """
+    Bucle del modo vigilancia: lanza el sondeo de cada catálogo cuando le toca (nunca dos a la
+    vez del mismo catálogo) y lo vuelve a programar al terminar. Solo termina al interrumpirlo.
+    """
+    from yupoo_downloader.watch import PollSchedule
+
+    schedule = PollSchedule(jitter)
+    for url in folders:
+        schedule.add(url, intervals[url])
+    running = {}
+    while True:
+        for url in schedule.pop_due():
+            emit(events, "poll_start", catalog=url)
+            running[executor.submit(watch_catalog, url, folders[url], config, events)] = url
+        done, _ = concurrent.futures.wait(running, timeout=schedule.time_to_next(), return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            url = running.pop(future)
+            wait = schedule.reschedule(url)
+            try:
+                summary = future.result()
+            except Exception as e:
+                emit(events, "poll_error", catalog=url, error=str(e), next_poll=round(wait, 1))
+                continue
+            emit(events, "poll_done", catalog=url, next_poll=round(wait, 1), **summary)
+
+
+def _run_queue_worker(downloader, discover, config, events, options, started):
+    from yupoo_downloader.jobqueue import JobQueue, QueueWorker
+
+    url = downloader.main_url
+    queue = JobQueue(options["path"], worker_id=options["worker_id"], lease=options["lease"])
+    try:
+        worker = QueueWorker(
+            downloader,
+            queue,
+            discover=discover,
+            workers=config.get("parse_workers", 2),
+            image_jobs=options["image_jobs"],
+            on_job_done=lambda job, ok: emit(events, "job_done", catalog=url, kind=job.kind, key=job.key, ok=ok, worker=queue.worker_id),
+        )
+        counts = worker.run()
+    finally:
+        queue.close()
+    return {
+        "albums": len(downloader.catalog),
+        "failed_albums": [],
+        "failed_images": len(downloader.failed_images),
+        "pending_images": len(downloader.pending_images),
+        "failed_jobs": counts["failed"],
+        "jobs": counts,
+        "elapsed": round(time.time() - started, 3),
+    }
+
+
+def _peak_rss_mb():
+    """
+    Memoria residente máxima de la ejecución: la mayor entre este proceso y los del pool, que ya
+    han terminado al cerrar el ejecutor.
+    """
+    from yupoo_downloader.metrics import peak_rss_bytes
+
+    peaks = [peak for peak in (peak_rss_bytes(), peak_rss_bytes(children=True)) if peak is not None]
+    return round(max(peaks) / (1024 * 1024), 1) if peaks else None
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="yupoo-downloader-cli",
+        description="Descarga catálogos de Yupoo sin interfaz gráfica. El progreso se escribe como líneas JSON.",
+    )
+    parser.add_argument("urls", nargs="*", metavar="URL", help="URL del catálogo con el parámetro 'pag=n'.")
+    parser.add_argument("-f", "--file", help="Archivo con una URL por línea ('-' para la entrada estándar).")
+    parser.add_argument("-o", "--output", required=True, help="Carpeta raíz de descargas; cada catálogo va a su subcarpeta.")
+    parser.add_argument("--pages", help="Páginas del listado: '3', '1-5', '1,3,7-9' o 'todas'. Por defecto, solo la de la URL.")
+    parser.add_argument("-p", "--processes", type=int, default=os.cpu_count() or 1, help="Catálogos descargados en paralelo.")
+    parser.add_argument("--config", help="Archivo de configuración (por defecto YUPOO_CONFIG o config.json).")
+    parser.add_argument("--max-workers", type=int, help="Descargas simultáneas iniciales por catálogo.")
+    parser.add_argument("--concurrency-max", type=int, help="Límite superior de descargas simultáneas por catálogo.")
+    parser.add_argument("--async-concurrency-max", type=int, help="Límite superior de descargas simultáneas por catálogo con el motor async.")
+    parser.add_argument("--engine", choices=("threads", "async"), help="Motor de descarga.")
+    parser.add_argument("--queue", help="Cola de trabajos compartida (archivo SQLite o carpeta en almacenamiento común) para repartir los catálogos entre varias máquinas.")
+    parser.add_argument("--worker-id", help="Identificador de este nodo en la cola de trabajos.")
+    parser.add_argument("--lease", type=float, default=60.0, help="Segundos de validez de cada arrendamiento de la cola.")
+    parser.add_argument("--image-jobs", action="store_true", help="Repartir también las imágenes de cada álbum como trabajos independientes.")
+    parser.add_argument("--watch", action="store_true", help="Quedarse en marcha y sondear periódicamente cada catálogo para descargar solo los álbumes nuevos.")
+    parser.add_argument("--interval", help="Intervalo de sondeo por defecto del modo vigilancia: segundos o con unidad (90s, 15m, 2h).")
+    parser.add_argument("--jitter", type=float, help="Variación aleatoria de cada intervalo de sondeo, como fracción (0.1 = ±10 %%).")
+    parser.add_argument("--archive", choices=("zip", "tar"), help="Guardar las imágenes en un archivo ZIP o TAR por álbum (o por página) en lugar de en carpetas.")
+    parser.add_argument("--archive-per", choices=("album", "page"), help="Un archivo por álbum (por defecto) o por página del listado.")
+    parser.add_argument("--offline", action="store_true", help="Reconstruir los catálogos solo desde la caché HTML, sin hacer peticiones.")
+    parser.add_argument("--metrics-dir", help="Carpeta de los informes de métricas (JSON y Prometheus); por defecto, la de cada catálogo.")
+    parser.add_argument("--profile", action="store_true", help="Perfilar cada catálogo con cProfile y guardar las estadísticas junto a las métricas.")
+    parser.add_argument("--log-level", default="WARNING", help="Nivel del registro en la salida de error.")
+    return parser
+
+
+def main(argv=None):
+    """
+    Punto de entrada de la consola.
+    Returns:
+        int: 0 si todo se descargó, 1 si algún catálogo falló, 2 si los argumentos no son
+            válidos, 3 si algún álbum o imagen falló y 130 si se interrumpió.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    entries = [(url, None) for url in args.urls]
+    if args.file:
+        try:
+            entries += read_catalog_file(args.file)
+        except (OSError, ValueError) as e:
+            parser.error(f"No se pudo leer {args.file}: {e}")
+    urls = list(dict.fromkeys(url for url, _ in entries))
+    if not urls:
+        parser.error("Indica al menos una URL de catálogo o un archivo con --file.")
+    for url in urls:
+        if "pag=" not in url:
+            parser.error(f"La URL no contiene el parámetro 'pag=n': {url}")
+
+    pages = False
+    if args.pages:
+        from yupoo_downloader.crawler import parse_page_range
+        try:
+            pages = parse_page_range(args.pages)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.watch and (args.pages or args.queue):
+        parser.error("--watch recorre el listado hasta encontrar álbumes conocidos: no se combina con --pages ni con --queue.")
+
+    from yupoo_downloader.downloader import load_config
+    logging.getLogger().setLevel(args.log_level.upper())
+    config = load_config(args.config)
+    intervals = {}
+    if args.watch:
+        from yupoo_downloader.watch import parse_interval
+        try:
+            default_interval = parse_interval(args.interval or config.get("watch_interval", 900))
+        except ValueError as e:
+            parser.error(str(e))
+        # El intervalo de la línea del archivo de catálogos tiene prioridad sobre el general
+        intervals = {url: default_interval for url in urls}
+        intervals.update((url, interval) for url, interval in entries if interval is not None)
+    for key, value in (("max_workers", args.max_workers), ("concurrency_max", args.concurrency_max), ("engine", args.engine),
+                       ("async_concurrency_max", args.async_concurrency_max),
+                       ("metrics_dir", args.metrics_dir), ("archive", args.archive), ("archive_per", args.archive_per)):
+        if value is not None:
+            config[key] = value
+    if args.profile:
+        config["profile"] = True
+    if args.offline:
+        config["offline"] = True
+    queue = None
+    if args.queue:
+        # Un archivo ZIP/TAR solo puede escribirlo un nodo: cada álbum debe ir entero a un único nodo
+        if config.get("archive") and (args.image_jobs or config.get("archive_per", "album") == "page"):
+            parser.error("Con --queue, el modo archivo requiere un archivo por álbum y no admite --image-jobs.")
+        queue = {"path": args.queue, "worker_id": args.worker_id, "lease": args.lease, "image_jobs": args.image_jobs}
+        # Varias máquinas escriben en el mismo manifiesto a través del sistema de archivos de red
+        config["manifest_wal"] = False
+
+    manager = multiprocessing.Manager()
+    events = manager.Queue()
+    printer = threading.Thread(target=_print_events, args=(events,), daemon=True)
+    printer.start()
+
+    exit_code = EXIT_OK
+    pending_images = 0
+    futures = {}
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=max(1, min(args.processes, len(urls))))
+    try:
+        folders = {}
+        for url in urls:
+            folder = base = catalog_folder(args.output, url)
+            # Dos catálogos del mismo proveedor no deben compartir carpeta ni manifiesto
+            suffix = 2
+            while folder in folders.values():
+                folder = f"{base}-{suffix}"
+                suffix += 1
+            folders[url] = folder
+        if args.watch:
+            jitter = args.jitter if args.jitter is not None else config.get("watch_jitter", 0.1)
+            _watch_catalogs(executor, folders, intervals, jitter, config, events)
+        for url, folder in folders.items():
+            emit(events, "catalog_start", catalog=url, folder=folder)
+            future = executor.submit(run_catalog, url, folder, pages, config, events, queue)
+            futures[future] = url
+        for future in concurrent.futures.as_completed(futures):
+            url = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                emit(events, "catalog_error", catalog=url, error=str(e))
+                exit_code = EXIT_FAILED
+                continue
+            emit(events, "catalog_done", catalog=url, **summary)
+            pending_images += summary["pending_images"]
+            # Lo que queda pendiente sin conexión tampoco es una descarga completa
+            if (summary["failed_albums"] or summary["failed_images"] or summary["pending_images"] or summary.get("failed_jobs")) and exit_code == EXIT_OK:
+                exit_code = EXIT_PARTIAL
+    except KeyboardInterrupt:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+        exit_code = EXIT_INTERRUPTED
+    else:
+        executor.shutdown()
+    emit(events, "finished", exit_code=exit_code, pending_images=pending_images, peak_rss_mb=_peak_rss_mb())
+    events.put(None)
+    printer.join()
+    manager.shutdown()
+    return exit_code
+
+
+def _print_events(events):
+    while True:
+        event = events.get()
+        if event is None:
+            return
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,401 @@
+import time
+import logging
+import threading
+import collections
+from contextlib import contextmanager
+
+
+def is_overload_status(status):
+    """
+    Indica si un código HTTP señala que el servidor está saturado (429 o 5xx).
+    """
+    return status == 429 or status >= 500
+
+
+class _AsyncWaiter:
+    """
+    Corrutina en espera de un recurso protegido por un threading.Condition. El hilo que libera
+    el recurso la despierta con call_soon_threadsafe, así que esperar no ocupa el bucle.
+    """
+    __slots__ = ("_loop", "future")
+
+    def __init__(self):
+        import asyncio
+
+        self._loop = asyncio.get_running_loop()
+        self.future = None
+
+    def arm(self):
+        # Se llama desde la corrutina, con el candado del recurso tomado
+        self.future = self._loop.create_future()
+        return self.future
+
+    def wake(self):
+        # Puede llamarse desde cualquier hilo
+        future = self.future
+        if future is None or future.done():
+            return
+        try:
+            self._loop.call_soon_threadsafe(_resolve, future)
+        except RuntimeError:
+            # Bucle ya cerrado: no queda nadie esperando
+            pass
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class AdaptiveConcurrency:
+    """
+    Controlador AIMD del número de descargas simultáneas. Funciona como un semáforo cuyo
+    límite sube de uno en uno mientras el caudal crece y la latencia se mantiene estable, y se
+    reduce a la mitad ante timeouts, respuestas 429/5xx o conexiones reiniciadas.
+    """
+
+    def __init__(self, initial, floor=1, ceiling=64, window=2.0, increase=1, decrease=0.5, on_change=None):
+        """
+        Args:
+            initial (int): Límite inicial.
+            floor (int): Límite mínimo.
+            ceiling (int): Límite máximo.
+            window (float): Segundos de cada ventana de medición.
+            increase (int): Incremento aditivo por ventana favorable.
+            decrease (float): Factor multiplicativo al detectar saturación.
+            on_change (callable): Se llama con el nuevo límite cada vez que cambia.
+        """
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.window = window
+        self.increase = increase
+        self.decrease = decrease
+        self.on_change = on_change
+        self._limit = min(max(initial, self.floor), self.ceiling)
+        self._in_use = 0
+        self._cond = threading.Condition()
+        # Corrutinas esperando un hueco, por orden de llegada
+        self._async_waiters = collections.deque()
+        self._window_start = time.monotonic()
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_count = 0
+        self._last_throughput = 0.0
+        self._base_latency = None
+        self._backoff_until = 0.0
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def acquire(self):
+        """
+        Espera a que haya hueco bajo el límite actual y lo ocupa.
+        """
+        with self._cond:
+            while self._in_use >= self._limit:
+                self._cond.wait()
+            self._in_use += 1
+
+    def try_acquire(self):
+        """
+        Ocupa un hueco si lo hay, sin esperar.
+        Returns:
+            bool: True si se obtuvo el hueco.
+        """
+        with self._cond:
+            if self._in_use >= self._limit:
+                return False
+            self._in_use += 1
+            return True
+
+    async def acquire_async(self):
+        """
+        Equivalente de acquire para el motor asíncrono, sin bloquear el bucle de eventos. La
+        corrutina se duerme hasta que release la despierta en lugar de sondear el límite.
+        """
+        waiter = None
+        try:
+            while True:
+                with self._cond:
+                    if self._in_use < self._limit:
+                        self._in_use += 1
+                        return
+                    if waiter is None:
+                        waiter = _AsyncWaiter()
+                    self._async_waiters.append(waiter)
+                    future = waiter.arm()
+                await future
+        except BaseException:
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+                elif waiter is not None:
+                    # Se canceló justo después de despertarla: el hueco pasa a la siguiente
+                    self._wake_async(1)
+            raise
+
+    def release(self):
+        with self._cond:
+            self._in_use -= 1
+            self._cond.notify()
+            self._wake_async(1)
+
+    def _wake_async(self, count):
+        while self._async_waiters and count:
+            self._async_waiters.popleft().wake()
+            count -= 1
+
+    @contextmanager
+    def slot(self):
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def record(self, latency, nbytes, overloaded=False):
+        """
+        Registra el resultado de una petición y ajusta el límite si corresponde.
+        Args:
+            latency (float): Segundos hasta recibir la respuesta completa.
+            nbytes (int): Bytes recibidos.
+            overloaded (bool): True si hubo timeout, 429/5xx o conexión reiniciada.
+        """
+        with self._cond:
+            now = time.monotonic()
+            if overloaded:
+                # Se reduce como mucho una vez por ventana para no colapsar ante una ráfaga de errores
+                if now >= self._backoff_until:
+                    self._set_limit(int(self._limit * self.decrease))
+                    self._backoff_until = now + self.window
+                    self._reset_window(now)
+                return
+
+            self._window_bytes += nbytes
+            self._window_latency += latency
+            self._window_count += 1
+            elapsed = now - self._window_start
+            if elapsed < self.window or self._window_count == 0:
+                return
+
+            throughput = self._window_bytes / elapsed
+            mean_latency = self._window_latency / self._window_count
+            if self._base_latency is None or mean_latency < self._base_latency:
+                self._base_latency = mean_latency
+            latency_flat = mean_latency <= self._base_latency * 1.5
+            if throughput > self._last_throughput * 1.05 and latency_flat and self._in_use >= self._limit - 1:
+                self._set_limit(self._limit + self.increase)
+            elif mean_latency > self._base_latency * 2:
+                self._set_limit(self._limit - 1)
+            self._last_throughput = throughput
+            self._reset_window(now)
+
+    def snapshot(self):
+        """
+        Devuelve el estado actual del controlador.
+        """
+        with self._cond:
+            return {
+                "limit": self._limit,
+                "in_use": self._in_use,
+                "floor": self.floor,
+                "ceiling": self.ceiling,
+                "throughput": self._last_throughput,
+            }
+
+    def _reset_window(self, now):
+        self._window_start = now
+        self._window_bytes = 0
+        self._window_latency = 0.0
+        self._window_count = 0
+
+    def _set_limit(self, limit):
+        limit = min(max(limit, self.floor), self.ceiling)
+        if limit == self._limit:
+            return
+        logging.info(f"Concurrencia ajustada: {self._limit} -> {limit}")
+        self._limit = limit
+        self._cond.notify_all()
+        self._wake_async(len(self._async_waiters))
+        if self.on_change:
+            self.on_change(limit)
+
+
+class ByteBudget:
+    """
+    Presupuesto global de bytes de imágenes en memoria, compartido por todos los álbumes que se
+    descargan a la vez. Cada descarga reserva lo que tendrá en memoria antes de leer el cuerpo y
+    lo libera cuando su último trozo ya está escrito; si no cabe, espera a que otras terminen. Las esperas
+    se atienden por orden de llegada para que una imagen grande no quede relegada por las
+    pequeñas, y una reserva mayor que el presupuesto entero se admite cuando no hay nada más en
+    memoria. Con límite 0 no se espera nunca, pero se sigue midiendo el máximo alcanzado.
+    """
+
+    def __init__(self, limit):
+        """
+        Args:
+            limit (int): Bytes en memoria como máximo (0 = sin límite).
+        """
+        self.limit = max(0, limit)
+        self._in_flight = 0
+        self._peak = 0
+        self._waiters = collections.deque()
+        self._cond = threading.Condition()
+        self.waits = 0
+        self.waited = 0.0
+
+    def _fits(self, nbytes, waiter):
+        if self._waiters and self._waiters[0] is not waiter:
+            return False
+        return not self.limit or not self._in_flight or self._in_flight + nbytes <= self.limit
+
+    def _take(self, nbytes):
+        self._in_flight += nbytes
+        self._peak = max(self._peak, self._in_flight)
+
+    def acquire(self, nbytes, stop_event=None):
+        """
+        Reserva `nbytes`, esperando a que quepan en el presupuesto.
+        Args:
+            nbytes (int): Bytes que se van a tener en memoria.
+            stop_event (Event): Si se activa, la reserva se concede sin esperar más.
+        Returns:
+            float: Segundos de espera.
+        """
+        with self._cond:
+            if self._fits(nbytes, None):
+                self._take(nbytes)
+                return 0.0
+            waiter = object()
+            self._waiters.append(waiter)
+            start = time.monotonic()
+            try:
+                while not self._fits(nbytes, waiter) and not (stop_event is not None and stop_event.is_set()):
+                    self._cond.wait(0.2 if stop_event is not None else None)
+                self._take(nbytes)
+            finally:
+                self._waiters.remove(waiter)
+                self._notify()
+            return self._record_wait(start)
+
+    async def acquire_async(self, nbytes):
+        """
+        Equivalente de acquire para el motor asíncrono, sin bloquear el bucle de eventos. Solo
+        puede avanzar la primera espera de la cola, así que cada liberación despierta solo a esa.
+        """
+        with self._cond:
+            if self._fits(nbytes, None):
+                self._take(nbytes)
+                return 0.0
+            waiter = _AsyncWaiter()
+            self._waiters.append(waiter)
+        start = time.monotonic()
+        try:
+            while True:
+                with self._cond:
+                    if self._fits(nbytes, waiter):
+                        self._take(nbytes)
+                        return self._record_wait(start)
+                    future = waiter.arm()
+                await future
+        finally:
+            with self._cond:
+                self._waiters.remove(waiter)
+                self._notify()
+
+    def add(self, nbytes):
+        """
+        Suma bytes sin esperar: para cuerpos que crecen más allá de lo reservado (sin
+        Content-Length o con uno incorrecto). Esperar a mitad de lectura podría bloquear a todas
+        las descargas a la vez.
+        """
+        with self._cond:
+            self._take(nbytes)
+
+    def release(self, nbytes):
+        with self._cond:
+            self._in_flight -= nbytes
+            self._notify()
+
+    def _notify(self):
+        self._cond.notify_all()
+        if self._waiters and isinstance(self._waiters[0], _AsyncWaiter):
+            self._waiters[0].wake()
+
+    def reservation(self):
+        """
+        Devuelve una reserva vacía que acompaña a una descarga y se libera de una vez al final.
+        """
+        return BudgetReservation(self)
+
+    def snapshot(self):
+        """
+        Devuelve el estado actual del presupuesto.
+        """
+        with self._cond:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "peak": self._peak,
+                "waits": self.waits,
+                "waited": self.waited,
+            }
+
+    def _record_wait(self, start):
+        waited = time.monotonic() - start
+        self.waits += 1
+        self.waited += waited
+        return waited
+
+
+class BudgetReservation:
+    """
+    Bytes reservados por una descarga en un ByteBudget. Como contexto, se liberan al salir.
+    """
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.nbytes = 0
+
+    def reserve(self, nbytes, stop_event=None):
+        """
+        Amplía la reserva hasta `nbytes`, esperando si no caben.
+        Returns:
+            float: Segundos de espera.
+        """
+        if nbytes <= self.nbytes:
+            return 0.0
+        waited = self.budget.acquire(nbytes - self.nbytes, stop_event)
+        self.nbytes = nbytes
+        return waited
+
+    async def reserve_async(self, nbytes):
+        if nbytes <= self.nbytes:
+            return 0.0
+        waited = await self.budget.acquire_async(nbytes - self.nbytes)
+        self.nbytes = nbytes
+        return waited
+
+    def grow(self, nbytes):
+        """
+        Amplía la reserva hasta `nbytes` sin esperar.
+        """
+        if nbytes > self.nbytes:
+            self.budget.add(nbytes - self.nbytes)
+            self.nbytes = nbytes
+
+    def release(self):
+        if self.nbytes:
+            self.budget.release(self.nbytes)
+            self.nbytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
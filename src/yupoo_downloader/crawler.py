@@ -0,0 +1,85 @@
+import re
+import logging
+import concurrent.futures
+
+
+def parse_page_range(text):
+    """
+    Interpreta un rango de páginas escrito por el usuario.
+    Args:
+        text (str): '3', '1-5', '1,3,7-9' o 'todas'/'all' para todo el catálogo.
+    Returns:
+        list: Números de página ordenados, o None si se pidieron todas las páginas.
+    """
+    text = (text or "").strip().lower()
+    if text in ("todas", "all", "*"):
+        return None
+    pages = set()
+    for part in text.split(","):
+        match = re.fullmatch(r'\s*(\d+)\s*(?:-\s*(\d+)\s*)?', part)
+        if not match:
+            raise ValueError(f"Rango de páginas no válido: '{part.strip()}'")
+        first = int(match.group(1))
+        last = int(match.group(2) or first)
+        if first < 1 or last < first:
+            raise ValueError(f"Rango de páginas no válido: '{part.strip()}'")
+        pages.update(range(first, last + 1))
+    return sorted(pages)
+
+
+class CatalogCrawler:
+    """
+    Recorre varias páginas del listado de un catálogo en paralelo y carga en el catálogo del
+    descargador todos los álbumes encontrados, sin repetir los que aparecen en varias páginas.
+    """
+
+    def __init__(self, downloader, pages=None):
+        """
+        Args:
+            downloader (YupooDownloader): Descargador cuya URL principal es el punto de partida.
+            pages (list): Páginas a recorrer. Si es None, se recorren desde la página de la URL
+                principal hasta la última detectada en la paginación.
+        """
+        self.downloader = downloader
+        self.pages = pages
+
+    def crawl(self):
+        """
+        Descarga las páginas del listado y guarda los álbumes en el catálogo del descargador.
+        Returns:
+            list: Títulos de los álbumes en el orden del catálogo.
+        """
+        downloader = self.downloader
+        results = {}
+        if self.pages is None:
+            # La primera página es necesaria para descubrir cuántas hay
+            start_page = downloader._extract_page_number(downloader.main_url)
+            albums, last_page = downloader.fetch_listing(downloader.main_url)
+            results[start_page] = albums
+            pages = list(range(start_page + 1, (last_page or start_page) + 1))
+            logging.info(f"Última página detectada: {last_page or start_page}")
+        else:
+            pages = list(self.pages)
+
+        if pages:
+            with concurrent.futures.ThreadPoolExecutor(max_workers=min(downloader.max_workers, len(pages))) as executor:
+                futures = {executor.submit(downloader.fetch_listing, downloader.page_url(page)): page for page in pages}
+                for future in concurrent.futures.as_completed(futures):
+                    page = futures[future]
+                    try:
+                        results[page] = future.result()[0]
+                    except Exception as e:
+                        logging.error(f"Error al descargar la página {page} del listado: {e}")
+
+        seen = set()
+        albums = []
+        for page in sorted(results):
+            for url, href, title in results[page]:
+                if url in seen:
+                    continue
+                seen.add(url)
+                albums.append((url, href, title, page))
+        logging.info(f"{len(albums)} álbumes únicos en {len(results)} páginas")
+
+        downloader.catalog.set_albums(albums)
+        return downloader.catalog.titles()
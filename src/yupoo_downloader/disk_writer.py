@@ -0,0 +1,120 @@
+import queue
+import time
+import logging
+import threading
+import concurrent.futures
+
+_STOP = object()
+
+
+class DiskWriter:
+    """
+    Pool pequeño de hilos que hace las escrituras en disco de las descargas. Los hilos de red le
+    entregan cada trozo del cuerpo a través de una cola acotada (ver PartWriter) y, al terminar,
+    la confirmación de la imagen; liberan su hueco de concurrencia antes de confirmarla, pero
+    esperan a que termine para registrarla en el manifiesto. Si el disco no da abasto la cola se
+    llena y submit bloquea, de modo que un disco lento frena las descargas en lugar de acumular
+    trozos en memoria sin límite.
+    """
+
+    def __init__(self, workers=2, queue_size=32):
+        """
+        Args:
+            workers (int): Hilos de escritura.
+            queue_size (int): Escrituras pendientes como máximo antes de bloquear a quien envía.
+        """
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self.stats = {"jobs": 0, "blocked": 0.0}
+        self._threads = [threading.Thread(target=self._run, name=f"yupoo-writer-{i}", daemon=True) for i in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args):
+        """
+        Encola una escritura. Bloquea mientras la cola esté llena.
+        Returns:
+            concurrent.futures.Future: Resultado de `fn(*args)`.
+        """
+        future = concurrent.futures.Future()
+        start = time.monotonic()
+        self._queue.put((future, fn, args))
+        blocked = time.monotonic() - start
+        with self._lock:
+            self.stats["jobs"] += 1
+            self.stats["blocked"] += blocked
+        return future
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def close(self):
+        """
+        Espera a que terminen las escrituras pendientes y detiene los hilos.
+        """
+        for _ in self._threads:
+            self._queue.put(_STOP)
+        for thread in self._threads:
+            thread.join()
+        if self.stats["blocked"] >= 1:
+            logging.info(f"Escritura en disco: {self.stats['jobs']} escrituras, {self.stats['blocked']:.1f} s de espera por la cola llena")
+
+
+def write_file(path, data, append=False):
+    """
+    Escribe (o añade) `data` en `path`. La usan los hilos de escritura para los archivos .part.
+    """
+    with open(path, "ab" if append else "wb") as f:
+        f.write(data)
+
+
+class PartWriter:
+    """
+    Escribe el cuerpo de una descarga en su archivo .part a medida que llega, a través de los
+    hilos de un DiskWriter. Solo hay una escritura pendiente por archivo, así que los trozos
+    llegan al disco en orden y en memoria no hay más que el trozo que se escribe y el que se
+    está recibiendo.
+    """
+
+    def __init__(self, writer, path, append=False):
+        """
+        Args:
+            writer (DiskWriter): Pool de escritura.
+            path (str): Archivo .part.
+            append (bool): Continuar el .part existente (reanudación) en lugar de reemplazarlo.
+        """
+        self.writer = writer
+        self.path = path
+        self._append = append
+        self._pending = None
+
+    def write(self, chunk):
+        """
+        Entrega un trozo a los hilos de escritura, después de esperar a que termine el anterior.
+        """
+        self.wait()
+        self._pending = self.writer.submit(write_file, self.path, chunk, self._append)
+        self._append = True
+
+    def wait(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            pending.result()
+
+    def close(self):
+        """
+        Espera a la última escritura. Un cuerpo vacío deja igualmente el .part creado.
+        """
+        if not self._append:
+            self.write(b"")
+        self.wait()
@@ -0,0 +1,922 @@
+import os
+import requests
+import re
+import time
+import concurrent.futures
+import logging
+import json
+import hashlib
+import threading
+import contextlib
+import itertools
+from urllib.parse import urlsplit
+from yupoo_downloader.utils import create_directory
+from yupoo_downloader.http_client import HttpClient, IMAGE_HOST
+from yupoo_downloader.manifest import DownloadManifest
+from yupoo_downloader.catalog import AlbumCatalog
+from yupoo_downloader.extractor import extract_listing, extract_image_urls
+from yupoo_downloader.store import ContentStore
+from yupoo_downloader.concurrency import AdaptiveConcurrency, ByteBudget, is_overload_status
+from yupoo_downloader.retry_policy import RetryPolicy, CircuitBreaker, parse_retry_after
+from yupoo_downloader.rate_limiter import HostRateLimiter
+from yupoo_downloader.metrics import Metrics, error_class, profile_run, peak_rss_bytes
+from yupoo_downloader.disk_writer import DiskWriter, PartWriter
+from yupoo_downloader.http_cache import HttpCache, OfflineMiss, DEFAULT_CACHE_DIR as HTML_CACHE_DIR
+from yupoo_downloader.archive import AlbumArchives
+
+# Cargar configuraciones desde un archivo JSON
+def load_config(config_file=None):
+    """
+    Carga la configuración. La ruta se resuelve en este orden: argumento, variable de entorno
+    YUPOO_CONFIG y config.json en el directorio actual. Si el archivo no existe se usan los
+    valores por defecto.
+    Args:
+        config_file (str): Ruta del archivo de configuración.
+    Returns:
+        dict: Configuración cargada.
+    """
+    config_file = config_file or os.environ.get('YUPOO_CONFIG') or 'config.json'
+    try:
+        with open(config_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        logging.warning(f"No se encontró {config_file}; se usarán los valores por defecto.")
+        return {}
+
+PART_SUFFIX = ".part"
+# En modo archivo los .part no tienen carpeta de álbum donde vivir
+PARTS_DIR = ".parts"
+ALBUM_METADATA = "album.json"
+# Conexiones que se precalientan por host como mucho, aunque el limitador no ponga tope
+WARM_UP_CONNECTIONS = 4
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+class YupooDownloader:
+    def __init__(self, main_url, download_folder, stop_event=None, pause_event=None, config=None):
+        self.main_url = main_url
+        self.download_folder = download_folder
+        self.config = config if config is not None else load_config()
+        self.timeout = self.config.get('timeout', 10)
+        self.max_workers = self.config.get('max_workers', 20)
+        self.engine = self.config.get('engine', 'threads')
+        # El motor asíncrono tiene sus propios límites: una corrutina en espera cuesta mucho menos que un hilo
+        self.async_max_workers = self.config.get('async_max_workers', 50)
+        self.async_concurrency_max = self.config.get('async_concurrency_max', self.config.get('async_concurrency', 400))
+        self.chunk_size = self.config.get('chunk_size', 64 * 1024)
+        self.stop_event = stop_event
+        self.pause_event = pause_event
+        # Tiempos por etapa y contadores de la ejecución; se exportan al cerrar
+        self.metrics = Metrics(labels={"catalog": main_url})
+        self.concurrency = self._create_concurrency()
+        # Máximo de imágenes enviadas y sin terminar, y de bytes de imágenes en memoria entre todos los álbumes
+        self.submit_window = self.config.get('submit_window') or self.concurrency.ceiling * 2
+        self.byte_budget = ByteBudget(int(self.config.get('inflight_max_mb', 256) * 1024 * 1024))
+        self.retry_policy = RetryPolicy(
+            retries=self.config.get('retries', 4),
+            backoff=self.config.get('retry_backoff', 1.0),
+            max_delay=self.config.get('retry_max_delay', 60.0),
+        )
+        self.breaker = CircuitBreaker(
+            threshold=self.config.get('breaker_threshold', 5),
+            cooldown=self.config.get('breaker_cooldown', 30.0),
+        )
+        self.rate_limiter = HostRateLimiter({
+            "html": (self.config.get('html_rate', 4), self.config.get('html_burst', 8)),
+            "images": (self.config.get('image_rate', 40), self.config.get('image_burst', 80)),
+        })
+        self.client = HttpClient(pool_size=self.concurrency.ceiling, timeout=self.timeout)
+        self.manifest = DownloadManifest(download_folder, wal=self.config.get('manifest_wal', True))
+        self.catalog = self._load_catalog(self.config.get('catalog_journal', False))
+        # Salida en un ZIP/TAR por álbum o por página en lugar de un archivo por imagen
+        self.archives = self._create_archives()
+        # Los enlaces duros del almacén no sirven dentro de un archivo: la deduplicación solo se usa con carpetas
+        self.store = ContentStore(download_folder, self.manifest) if self.config.get('dedup', True) and self.archives is None else None
+        # Modo sin conexión: el HTML sale solo de la caché y no se descarga ninguna imagen
+        self.offline = self.config.get('offline', False)
+        self.html_cache = self._create_html_cache()
+        # Las escrituras en disco se hacen en hilos propios para no ocupar los huecos de red
+        self.writer = DiskWriter(self.config.get('writer_threads', 2), self.config.get('writer_queue_size', 32))
+        self._async_engine = None
+        # URLs de imágenes que fallaron definitivamente en esta ejecución
+        self.failed_images = []
+        # URLs de imágenes que quedaron sin descargar por el modo sin conexión
+        self.pending_images = []
+        # Recibe los eventos de progreso (dict con la clave 'event'); puede llamarse desde cualquier hilo
+        self.on_event = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def warm_up(self):
+        """
+        Precalienta en segundo plano las conexiones con el CDN de imágenes y con el host del
+        catálogo, sin retrasar la primera petición real. Cada host recibe como mucho
+        WARM_UP_CONNECTIONS conexiones y la mitad de la ráfaga de su presupuesto del limitador,
+        para no gastar las fichas que necesitan las primeras descargas.
+        Returns:
+            threading.Thread: Hilo del precalentamiento, o None en modo sin conexión.
+        """
+        if self.offline:
+            return None
+        thread = threading.Thread(target=self._warm_up, name="yupoo-warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _warm_up(self):
+        for url, budget in ((IMAGE_HOST, "images"), (self.main_url, "html")):
+            rate, burst = self.rate_limiter.budgets.get(budget, (None, None))
+            connections = min(WARM_UP_CONNECTIONS, max(1, burst // 2)) if rate else WARM_UP_CONNECTIONS
+            self.client.warm_up(
+                [url],
+                connections=connections,
+                before_request=lambda origin, budget=budget: self._throttle(origin, budget),
+            )
+
+    def close(self):
+        """
+        Cierra el cliente HTTP compartido y el manifiesto, registra las estadísticas de conexiones
+        y escribe el informe de métricas de la ejecución.
+        """
+        stats = self.client.stats()
+        logging.info(f"Conexiones abiertas: {stats['opened']}, reutilizadas: {stats['reused']}")
+        logging.info(f"Concurrencia final: {self.concurrency.limit} (rango {self.concurrency.floor}-{self.concurrency.ceiling})")
+        limits = self.rate_limiter.stats()
+        logging.info(
+            f"Espera en el limitador: HTML {limits['html']['waited']:.1f} s ({limits['html']['throttled']} peticiones), "
+            f"imágenes {limits['images']['waited']:.1f} s ({limits['images']['throttled']} peticiones)"
+        )
+        if self.store is not None:
+            saved = self.store.stats
+            logging.info(
+                f"Duplicados: {saved['requests_saved']} peticiones y {saved['bytes_saved'] / 1e6:.1f} MB de descarga evitados, "
+                f"{saved['disk_bytes_saved'] / 1e6:.1f} MB de disco ahorrados"
+            )
+        if self.html_cache is not None:
+            cached = self.html_cache.stats
+            logging.info(
+                f"Caché HTML: {cached['hits']} aciertos, {cached['revalidated']} revalidadas (304), "
+                f"{cached['misses']} descargadas, {cached['evicted']} descartadas"
+            )
+            for result, value in cached.items():
+                self.metrics.inc("html_cache_total", value, result=result)
+            self.html_cache.close()
+        self.client.close()
+        if self._async_engine is not None:
+            self._async_engine.close()
+            self._async_engine = None
+        self.writer.close()
+        if self.archives is not None:
+            self.archives.close()
+        self.manifest.close()
+        self._record_memory()
+        self.write_metrics()
+
+    def _record_memory(self):
+        """
+        Registra el máximo de bytes de imágenes en memoria, las esperas por el presupuesto y la
+        memoria residente máxima del proceso, y los añade al informe de métricas.
+        """
+        budget = self.byte_budget.snapshot()
+        limit = f"{budget['limit'] / 1e6:.1f} MB" if budget['limit'] else "sin límite"
+        logging.info(
+            f"Imágenes en memoria: máximo {budget['peak'] / 1e6:.1f} MB (presupuesto {limit}), "
+            f"{budget['waits']} esperas, {budget['waited']:.1f} s"
+        )
+        self.metrics.set_gauge("inflight_bytes_peak", budget['peak'])
+        rss = peak_rss_bytes()
+        if rss is not None:
+            logging.info(f"Memoria máxima del proceso (RSS): {rss / 1e6:.1f} MB")
+            self.metrics.set_gauge("peak_rss_bytes", rss)
+
+    def write_metrics(self):
+        """
+        Registra un resumen por etapa y escribe el informe JSON y el archivo de texto de Prometheus
+        en metrics_dir (por defecto, la carpeta de descargas). Con la opción metrics a false no
+        se escribe nada.
+        """
+        if not self.config.get('metrics', True):
+            return
+        stages = self.metrics.snapshot()["stages"]
+        for stage, summary in sorted(stages.items()):
+            logging.info(f"Etapa {stage}: {summary['count']} mediciones, media {summary['mean'] * 1000:.1f} ms, p95 {summary['p95'] * 1000:.1f} ms")
+        try:
+            self.metrics.write_json(self._metrics_path(".json"))
+            self.metrics.write_prometheus(self._metrics_path(".prom"))
+        except OSError as e:
+            logging.error(f"No se pudo escribir el informe de métricas: {e}")
+
+    def profiling(self):
+        """
+        Devuelve un contexto que perfila con cProfile el bloque y los hilos que se creen dentro
+        si la opción profile está activa. Las estadísticas se guardan junto al informe de métricas.
+        """
+        if not self.config.get('profile', False):
+            return contextlib.nullcontext()
+        path = self._metrics_path(".prof")
+        logging.info(f"Perfilando la ejecución en {path}")
+        return profile_run(path)
+
+    def _metrics_path(self, extension):
+        """
+        Devuelve la ruta de un archivo de métricas. En una carpeta compartida (metrics_dir) el
+        nombre incluye la carpeta de descargas para que cada catálogo tenga el suyo.
+        """
+        folder = self.config.get('metrics_dir')
+        if not folder:
+            return os.path.join(self.download_folder, f"yupoo_metrics{extension}")
+        create_directory(folder)
+        name = os.path.basename(os.path.normpath(self.download_folder))
+        return os.path.join(folder, f"yupoo_{name}{extension}")
+
+    def create_csv_file(self):
+        """
+        Obtiene los enlaces de los álbumes de la página principal y los guarda en el catálogo en
+        memoria. Los reintentos se hacen petición a petición en _with_retries. Conserva su nombre original
+        por compatibilidad, aunque ya no escribe ningún CSV.
+        Returns:
+            list: Títulos de los álbumes en el orden de la página.
+        """
+        page = self._extract_page_number(self.main_url)
+        create_directory(os.path.join(self.download_folder, f"page{page}"))
+
+        try:
+            albums, _ = self.fetch_listing(self.main_url)
+            self.catalog.set_albums([album + (page,) for album in albums])
+            return self.catalog.titles()
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error al obtener la lista de álbumes: {e}")
+            raise
+
+    def fetch_listing(self, page_url):
+        """
+        Descarga y analiza una página del listado del catálogo.
+        Args:
+            page_url (str): URL de la página del listado.
+        Returns:
+            tuple: (lista de tuplas (URL del álbum, href, título), última página o None si no se detecta)
+        """
+        response = self._conditional_get(page_url, "pages")
+        if response is None:
+            # Página sin cambios (304): se reutiliza la lista de álbumes del manifiesto
+            albums = [(self._album_url(href), href, title) for href, title in self.manifest.page_albums(page_url)]
+            return albums, self.manifest.page_last_page(page_url)
+
+        with self.metrics.timer("parse_listing"):
+            links, last_page = extract_listing(response.content)
+        albums = [(self._album_url(href), href, title) for href, title in links]
+        self.manifest.record_page(page_url, albums, response.headers.get("ETag"), response.headers.get("Last-Modified"), last_page)
+        return albums, last_page
+
+    def create_file_tests(self, number):
+        """
+        Obtiene los enlaces de las imágenes del álbum seleccionado y los guarda en el catálogo.
+        Args:
+            number (int): Número del álbum en la lista para descargar.
+        Returns:
+            list: URLs de las imágenes del álbum.
+        """
+        url = self._get_album_url(number)
+        response = self._conditional_get(url, "albums")
+        if response is None:
+            # Álbum sin cambios (304): se reutilizan las URLs de imágenes del manifiesto
+            image_urls = self.manifest.album_images(url)
+        else:
+            with self.metrics.timer("parse_album"):
+                image_urls = extract_image_urls(response.content)
+            self.manifest.record_album(url, image_urls, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+
+        self.catalog.set_images(number, image_urls)
+        return image_urls
+
+    def download_photo(self, number, value):
+        """
+        Descarga las imágenes del álbum especificado.
+        Args:
+            number (int): Número del álbum en la lista.
+            value (str): Título del álbum.
+        Returns:
+            list: URLs de las imágenes que no se pudieron guardar (o que quedaron pendientes al detener).
+        """
+        folder, value, images = self._prepare_album(number, value)
+
+        if self.offline:
+            if images:
+                logging.warning(f"Sin conexión: {len(images)} imágenes de '{value}' quedan pendientes")
+            return [url for url, _ in images]
+        if self.engine == "async":
+            failed = self._get_async_engine().download(images)
+            self.finish_album(number, value)
+            return failed
+
+        failed = []
+        # El ejecutor se dimensiona al máximo; el controlador de concurrencia decide cuántas descargas avanzan.
+        # Las imágenes se envían por una ventana de submit_window para no crear un futuro por cada una de golpe
+        pending = iter(images)
+        futures = {}
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency.ceiling) as executor:
+            while True:
+                for url, image_name in itertools.islice(pending, self.submit_window - len(futures)):
+                    futures[executor.submit(self._download_and_save, url, image_name)] = url
+                if not futures:
+                    break
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    url = futures.pop(future)
+                    try:
+                        saved = future.result()
+                    except Exception as e:
+                        logging.error(f"Error al descargar {url}: {e}")
+                        saved = False
+                    if not saved:
+                        failed.append(url)
+        self.finish_album(number, value)
+        return failed
+
+    def finish_album(self, number, value):
+        """
+        Escribe, una sola vez y de forma atómica, los metadatos del álbum al terminar su descarga:
+        album.json con el título, la URL de origen y las imágenes con su tamaño, y title.txt.
+        Args:
+            number (int): Número del álbum en la lista.
+            value (str): Título del álbum.
+        """
+        value = self._change_album_title(value)
+        folder = self.album_folder(number, value)
+        if self.archives is None and not os.path.isdir(folder):
+            return
+        urls = [url for url in self.catalog.album(number).image_urls or [] if url.startswith("http")]
+        images = []
+        for position, url in enumerate(urls, start=1):
+            file_name = f"{value}_{position}.jpg"
+            images.append({"file": file_name, "url": url, "size": self._image_size(os.path.join(folder, file_name))})
+        metadata = {
+            "title": value,
+            "url": self._get_album_url(number),
+            "images": images,
+            "complete": all(image["size"] is not None for image in images),
+            "updated_at": time.time(),
+        }
+        if self.archives is not None:
+            # Sustituir un miembro obliga a reescribir el archivo: si nada cambió se conserva la fecha
+            # para que el contenido sea idéntico y no se toque
+            previous = self._archived_metadata(folder)
+            if previous is not None and dict(previous, updated_at=None) == dict(metadata, updated_at=None):
+                metadata["updated_at"] = previous["updated_at"]
+        text = json.dumps(metadata, ensure_ascii=False, indent=2)
+        try:
+            if self.archives is not None:
+                self.archives.add(os.path.join(folder, ALBUM_METADATA), text.encode("utf-8"))
+                self.archives.add(os.path.join(folder, "title.txt"), value.encode("utf-8"))
+                self.archives.close_album(folder)
+            else:
+                _write_atomic(os.path.join(folder, ALBUM_METADATA), text)
+                _write_atomic(os.path.join(folder, "title.txt"), value)
+        except OSError as e:
+            logging.error(f"No se pudieron guardar los metadatos de {value}: {e}")
+
+    def _archived_metadata(self, folder):
+        """
+        Devuelve el album.json guardado en el archivo del álbum, o None si no está o no se puede leer.
+        """
+        try:
+            return json.load(self.archives.open(os.path.join(folder, ALBUM_METADATA)))
+        except (KeyError, ValueError, OSError):
+            return None
+
+    def _prepare_album(self, number, value):
+        """
+        Crea la carpeta del álbum y asigna a cada imagen su nombre definitivo según su posición
+        en el álbum. Las imágenes que ya existen en disco (o en el archivo del álbum) se omiten,
+        de modo que repetir la descarga es idempotente.
+        Args:
+            number (int): Número del álbum en la lista.
+            value (str): Título del álbum.
+        Returns:
+            tuple: (carpeta del álbum, título limpio, lista de pares (URL, ruta de la imagen) pendientes)
+        """
+        value = self._change_album_title(value)
+        folder = self.album_folder(number, value)
+        if self.archives is not None:
+            existing = set(self.archives.members(folder))
+        else:
+            create_directory(folder)
+            existing = set(os.listdir(folder))
+
+        urls = [url for url in self.catalog.album(number).image_urls or [] if url.startswith("http")]
+        paths = [os.path.join(folder, f"{value}_{position}.jpg") for position in range(1, len(urls) + 1)]
+        self.manifest.set_image_paths(self._get_album_url(number), paths)
+        images = [(url, path) for url, path in zip(urls, paths) if os.path.basename(path) not in existing]
+        self._emit("album_prepared", index=number, title=value, images=len(images))
+        return folder, value, images
+
+    def _download_and_save(self, url, image_name):
+        """
+        Descarga y guarda la imagen desde una URL.
+        Args:
+            url (str): URL de la imagen a descargar.
+            image_name (str): Ruta definitiva de la imagen.
+        Returns:
+            bool: True si la imagen quedó guardada.
+        """
+        if self.pause_event is not None:
+            self.pause_event.wait()
+        if self.stop_event is not None and self.stop_event.is_set():
+            return False
+        try:
+            while True:
+                claim = self._claim_image(url, image_name)
+                if claim is True:
+                    return True
+                if claim is False:
+                    break
+                # Otra copia de la misma URL se está descargando: se espera y se reutiliza
+                claim.wait()
+            try:
+                # Sin conexión no se pide ninguna imagen, venga de download_photo, del pipeline o de la cola:
+                # solo se reutilizan las copias del almacén y el resto queda pendiente
+                if self.offline:
+                    self._image_pending(url)
+                    return False
+                self._with_retries(url, lambda: self._fetch_image_in_slot(url, image_name), "images")
+            finally:
+                self._release_image(url)
+        except Exception as e:
+            logging.error(f"Error al guardar {url}: {e}")
+            self.failed_images.append(url)
+            self.metrics.inc("images_total", result="failed")
+            self._emit("image_failed", url=url, error=str(e))
+            return False
+        return self._image_saved(image_name)
+
+    def _image_pending(self, url):
+        # No es un fallo, pero la ejecución tampoco está completa: el resumen lo cuenta aparte
+        self.pending_images.append(url)
+        self.metrics.inc("images_total", result="pending")
+
+    def _image_saved(self, image_name):
+        if self.archives is not None:
+            return self.archives.exists(image_name)
+        return os.path.exists(image_name)
+
+    def _image_size(self, image_name):
+        if self.archives is not None:
+            return self.archives.size(image_name)
+        return os.path.getsize(image_name) if os.path.exists(image_name) else None
+
+    def _fetch_image_in_slot(self, url, image_name):
+        # La espera del limitador se hace antes de ocupar el hueco de concurrencia y la confirmación
+        # de la imagen después de liberarlo: el hueco cubre la recepción y la escritura de los trozos
+        self._throttle(url, "images")
+        # Los trozos en memoria cuentan en el presupuesto global mientras se reciben y se escriben
+        with self.byte_budget.reservation() as reservation:
+            with self.concurrency.slot():
+                fetched = self._fetch_image(url, image_name, reservation)
+        if fetched is None:
+            return
+        part_path, received, headers, latency = fetched
+        self.writer.submit(self._commit_image, url, part_path, image_name, headers).result()
+        self._emit("image_done", url=url, path=image_name, bytes=received, latency=latency)
+
+    def _with_retries(self, url, request, kind):
+        """
+        Ejecuta una petición aplicando la política de reintentos y el cortacircuitos del host.
+        Las esperas se hacen fuera del hueco de concurrencia para no bloquear a otras descargas.
+        Args:
+            url (str): URL de la petición.
+            request (callable): Función sin argumentos que hace la petición.
+            kind (str): 'html' o 'images', para las métricas de errores y reintentos.
+        Returns:
+            El resultado de `request`.
+        """
+        host = urlsplit(url).hostname
+        attempt = 0
+        while True:
+            self._wait_for_host(host)
+            try:
+                result = request()
+            except requests.exceptions.RequestException as e:
+                response = getattr(e, "response", None)
+                status = response.status_code if response is not None else None
+                retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+                self.metrics.inc("errors_total", kind=kind, error=error_class(e, status))
+                delay = self._retry_delay(host, attempt, status, retry_after)
+                if delay is None or self._stopped():
+                    raise
+                self.metrics.inc("retries_total", kind=kind)
+                logging.warning(f"Reintento {attempt + 1}/{self.retry_policy.retries} de {url} en {delay:.1f} s: {e}")
+                self._sleep(delay)
+                attempt += 1
+            except BaseException:
+                # Cualquier otra salida no dice nada del host, pero no puede dejar la prueba ocupada
+                self.breaker.release_probe(host)
+                raise
+            else:
+                self.breaker.record_success(host)
+                return result
+
+    def _retry_delay(self, host, attempt, status=None, retry_after=None):
+        """
+        Registra un fallo en el cortacircuitos y decide si se reintenta. Compartido por ambos motores.
+        Args:
+            host (str): Host de la petición.
+            attempt (int): Intentos fallidos previos.
+            status (int): Código HTTP, o None si fue un error de red o timeout.
+            retry_after (float): Segundos indicados por el servidor en Retry-After.
+        Returns:
+            float: Segundos de espera antes de reintentar, o None si el error es definitivo.
+        """
+        if not self.retry_policy.is_retryable(status):
+            # El host respondió: un 404 o un 403 no indica que esté caído
+            self.breaker.record_success(host)
+            return None
+        self.breaker.record_failure(host)
+        if attempt >= self.retry_policy.retries:
+            return None
+        return self.retry_policy.delay(attempt, retry_after)
+
+    def _wait_for_host(self, host):
+        """
+        Espera mientras el circuito del host esté abierto.
+        """
+        while not self._stopped():
+            wait = self.breaker.wait_time(host)
+            if not wait:
+                return
+            self._sleep(min(wait, 1.0))
+
+    def _throttle(self, url, budget):
+        """
+        Espera el turno del limitador de peticiones para el host de la URL.
+        Args:
+            url (str): URL (u origen) de la petición.
+            budget (str): 'html' para el catálogo o 'images' para el CDN.
+        """
+        wait = self.rate_limiter.acquire(urlsplit(url).hostname, budget, sleep=self._sleep)
+        if wait:
+            self.metrics.observe("rate_limit_wait", wait)
+
+    def _emit(self, event, **fields):
+        if self.on_event is not None:
+            self.on_event(dict(fields, event=event))
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _sleep(self, seconds):
+        # Con stop_event la espera se interrumpe en cuanto se detiene la descarga
+        if self.stop_event is not None:
+            self.stop_event.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    def _fetch_image(self, url, image_name, reservation):
+        """
+        Descarga una imagen en su archivo temporal, continuándolo si existe. Cada trozo se entrega
+        a los hilos de escritura según llega, así que lo recibido antes de un error o de detener la
+        descarga ya está en el .part para reanudarlo después. Antes de leer el cuerpo se reserva en
+        el presupuesto de bytes lo que la descarga tendrá en memoria.
+        Args:
+            url (str): URL de la imagen.
+            image_name (str): Ruta definitiva de la imagen.
+            reservation (BudgetReservation): Reserva de la descarga, que libera quien llama.
+        Returns:
+            tuple: (ruta del .part, bytes recibidos, cabeceras, latencia), o None si la descarga se
+                detuvo.
+        """
+        part_path = self._part_path(os.path.dirname(image_name), url)
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        self.metrics.inc("requests_total", kind="images")
+        start = time.monotonic()
+        received = 0
+        part = None
+        try:
+            with self.client.get(url, headers=headers, stream=True) as res:
+                # Con stream=True la llamada vuelve al recibir las cabeceras
+                first_byte = time.monotonic()
+                self.metrics.observe("image_ttfb", first_byte - start)
+                if offset and (res.status_code == 416 or not self._range_matches(res.status_code, res.headers.get("Content-Range"), offset)):
+                    # El servidor no acepta la reanudación: se descarta el parcial y se empieza de cero
+                    res.close()
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(part_path)
+                    self._throttle(url, "images")
+                    return self._fetch_image(url, image_name, reservation)
+                res.raise_for_status()
+                part = PartWriter(self.writer, part_path, append=res.status_code == 206)
+                self._reserve_body(reservation, res.headers.get("Content-Length"))
+                for chunk in res.iter_content(chunk_size=self.chunk_size):
+                    if self.stop_event is not None and self.stop_event.is_set():
+                        return None
+                    part.write(chunk)
+                    received += len(chunk)
+                self.metrics.observe("image_transfer", time.monotonic() - first_byte)
+        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+            self.concurrency.record(time.monotonic() - start, received, overloaded=True)
+            raise
+        except requests.exceptions.HTTPError as e:
+            self.concurrency.record(time.monotonic() - start, received, overloaded=is_overload_status(e.response.status_code))
+            raise
+        finally:
+            # Se espera a la última escritura: el siguiente intento calcula el Range con el tamaño del .part
+            if part is not None:
+                part.close()
+            self.metrics.inc("bytes_total", received, kind="images")
+        latency = time.monotonic() - start
+        self.concurrency.record(latency, received)
+        return part_path, received, res.headers, latency
+
+    def _reserve_body(self, reservation, content_length):
+        """
+        Reserva en el presupuesto de bytes lo que la descarga tendrá en memoria (ver _body_window)
+        y espera si no cabe. La espera se mide en la etapa budget_wait.
+        """
+        wait = reservation.reserve(self._body_window(content_length), self.stop_event)
+        if wait:
+            self.metrics.observe("budget_wait", wait)
+
+    def _body_window(self, content_length):
+        """
+        Bytes del cuerpo de una imagen en memoria a la vez: el trozo que se recibe y el que se
+        escribe en el .part, o el cuerpo entero si es menor.
+        """
+        try:
+            size = max(int(content_length), 0)
+        except (TypeError, ValueError):
+            size = self.chunk_size
+        return min(size, 2 * self.chunk_size)
+
+    def _part_path(self, folder, url):
+        """
+        Devuelve la ruta del archivo temporal donde se descarga una imagen. El nombre depende
+        solo de la URL para que una descarga interrumpida se pueda reanudar. En modo archivo
+        todos los temporales van a la carpeta .parts de la descarga.
+        """
+        if self.archives is not None:
+            folder = os.path.join(self.download_folder, PARTS_DIR)
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(folder, f".{digest}{PART_SUFFIX}")
+
+    @staticmethod
+    def _range_matches(status_code, content_range, offset):
+        """
+        Comprueba que una respuesta 206 empieza exactamente en el byte solicitado.
+        """
+        if not offset or status_code != 206:
+            return True
+        match = re.match(r'bytes (\d+)-', content_range or "")
+        return bool(match) and int(match.group(1)) == offset
+
+    def _commit_image(self, url, part_path, image_name, headers):
+        """
+        Renombra de forma atómica el archivo temporal de una imagen ya completa a su nombre
+        definitivo y la registra en el manifiesto. En modo archivo el contenido del .part se añade
+        al ZIP/TAR del álbum y el .part se borra. Se ejecuta en los hilos de escritura, después de
+        los trozos del cuerpo, y es compartido por ambos motores para que la salida en disco sea
+        idéntica.
+        Args:
+            url (str): URL de la imagen.
+            part_path (str): Archivo temporal de la imagen.
+            image_name (str): Ruta definitiva de la imagen.
+            headers (Mapping): Cabeceras de la respuesta HTTP.
+        """
+        with self.metrics.timer("disk_write"):
+            if self.archives is not None:
+                digest, size = None, self.archives.add(image_name, self._archive_data(part_path))
+            else:
+                if self.store is not None:
+                    digest, size = self.store.add(part_path)
+                    self.store.link(digest, image_name)
+                else:
+                    digest, size = None, os.path.getsize(part_path)
+                    os.replace(part_path, image_name)
+            self.manifest.record_image(url, image_name, size, headers.get("ETag"), headers.get("Last-Modified"), digest)
+        self.metrics.inc("images_total", result="downloaded")
+
+    @staticmethod
+    def _archive_data(part_path):
+        """
+        Devuelve el contenido completo de una imagen para añadirla a su archivo y borra el .part.
+        """
+        with open(part_path, "rb") as f:
+            data = f.read()
+        os.remove(part_path)
+        return data
+
+    def _claim_image(self, url, image_name):
+        """
+        Comprueba en el almacén si la URL ya se descargó antes (en este u otro álbum) y, en ese
+        caso, enlaza la imagen sin hacer ninguna petición.
+        Returns:
+            True si la imagen se reutilizó, False si el llamante debe descargarla (y después llamar
+            a _release_image), o un Event si otra descarga de la misma URL está en curso.
+        """
+        if self.store is None:
+            return False
+        digest = self.store.reuse(url, image_name)
+        if digest is not None:
+            # La copia de este álbum también queda registrada como descargada
+            self.manifest.record_image(url, image_name, os.path.getsize(image_name), sha256=digest)
+            self.metrics.inc("images_total", result="reused")
+            self._emit("image_done", url=url, path=image_name, bytes=0, latency=0.0, reused=True)
+            return True
+        event = self.store.claim(url)
+        return False if event is None else event
+
+    def _release_image(self, url):
+        if self.store is not None:
+            self.store.release(url)
+
+    def _create_concurrency(self):
+        """
+        Crea el controlador adaptativo de concurrencia. max_workers es el punto de partida y
+        concurrency_min/concurrency_max los límites; con el motor asíncrono se parte de
+        async_max_workers y el techo es async_concurrency_max. Con adaptive_concurrency a false el
+        límite queda fijo en el punto de partida.
+        """
+        if self.engine == "async":
+            initial, ceiling = self.async_max_workers, self.async_concurrency_max
+        else:
+            initial, ceiling = self.max_workers, self.config.get('concurrency_max', self.max_workers * 4)
+        if not self.config.get('adaptive_concurrency', True):
+            return AdaptiveConcurrency(initial, floor=initial, ceiling=initial)
+        return AdaptiveConcurrency(
+            initial,
+            floor=self.config.get('concurrency_min', 2),
+            ceiling=ceiling,
+            window=self.config.get('concurrency_window', 2.0),
+        )
+
+    def _create_html_cache(self):
+        """
+        Crea la caché HTML compartida según html_cache, html_cache_dir, html_cache_size (MB) y
+        html_cache_ttl (vigencia en segundos de las páginas sin Cache-Control). En modo sin
+        conexión la caché es obligatoria.
+        """
+        if not self.config.get('html_cache', True) and not self.offline:
+            return None
+        return HttpCache(
+            self.config.get('html_cache_dir') or HTML_CACHE_DIR,
+            max_bytes=self.config.get('html_cache_size', 100) * 1024 * 1024,
+            default_ttl=self.config.get('html_cache_ttl', 0),
+        )
+
+    def _create_archives(self):
+        """
+        Crea la salida en archivos si la opción archive es 'zip' o 'tar'. archive_per elige un
+        archivo por álbum ('album') o por página del listado ('page') y archive_checkpoint cada
+        cuántas imágenes se guarda el índice.
+        """
+        fmt = self.config.get('archive') or ""
+        if not fmt:
+            return None
+        create_directory(os.path.join(self.download_folder, PARTS_DIR))
+        return AlbumArchives(
+            self.download_folder,
+            fmt,
+            per=self.config.get('archive_per', 'album'),
+            checkpoint=self.config.get('archive_checkpoint', 16),
+        )
+
+    def _get_async_engine(self):
+        """
+        Crea bajo demanda el motor asíncrono, que vive mientras viva el descargador.
+        """
+        if self._async_engine is None:
+            from yupoo_downloader.async_engine import AsyncEngine
+            self._async_engine = AsyncEngine(self, concurrency=self.concurrency.ceiling, stop_event=self.stop_event, pause_event=self.pause_event)
+        return self._async_engine
+
+    def _extract_page_number(self, url):
+        """
+        Extrae el número de página de la URL proporcionada.
+        Args:
+            url (str): URL de la página.
+        Returns:
+            int: Número de página extraído de la URL.
+        """
+        match = re.search(r'[?&]pag=(\d+)', url)
+        if match:
+            if '?pag=' in url:
+                url = url.replace('?pag=', '&pag=')
+            return int(match.group(1))
+        raise ValueError("La URL no contiene el parámetro 'pag=n'. Asegúrese de proporcionarlo correctamente.")
+
+    def album_folder(self, number, value):
+        """
+        Devuelve la carpeta de un álbum: page{n}/{título}, donde n es la página del listado en la
+        que apareció el álbum.
+        Args:
+            number (int): Número del álbum en la lista.
+            value (str): Título del álbum.
+        Returns:
+            str: Ruta de la carpeta del álbum.
+        """
+        page = self.catalog.album(number).page or self._extract_page_number(self.main_url)
+        return os.path.join(self.download_folder, f"page{page}", self._change_album_title(value))
+
+    def page_url(self, page):
+        """
+        Construye la URL de otra página del listado sustituyendo el parámetro 'pag=n'.
+        Args:
+            page (int): Número de página.
+        Returns:
+            str: URL de la página solicitada.
+        """
+        self._extract_page_number(self.main_url)
+        return re.sub(r'([?&]pag=)\d+', lambda m: f"{m.group(1)}{page}", self.main_url, count=1)
+
+    def _get_album_url(self, number):
+        """
+        Obtiene la URL del álbum correspondiente al número especificado.
+        Args:
+            number (int): Número del álbum en la lista.
+        Returns:
+            str: URL completa del álbum.
+        """
+        return self.catalog.album(number).url
+
+    def _album_url(self, href):
+        """
+        Construye la URL completa de un álbum a partir de su enlace relativo.
+        """
+        head, _, tail = self.main_url.partition("x.yupoo.com")
+        return head + "x.yupoo.com" + href
+
+    def _load_catalog(self, journal):
+        """
+        Crea el catálogo en memoria. Si el diario JSONL está activado, se reanuda desde él.
+        Args:
+            journal (bool): Si se debe persistir el catálogo en page{n}/catalog.jsonl.
+        """
+        if not journal:
+            return AlbumCatalog()
+        page = self._extract_page_number(self.main_url)
+        folder = os.path.join(self.download_folder, f"page{page}")
+        create_directory(folder)
+        return AlbumCatalog.load(os.path.join(folder, "catalog.jsonl"))
+
+    def _conditional_get(self, url, table):
+        """
+        Obtiene una página HTML. Si hay una copia vigente en la caché HTML se usa sin petición; si
+        no, se revalida con los validadores de la copia o, sin copia, con los del manifiesto.
+        Args:
+            url (str): URL de la página.
+            table (str): Tabla del manifiesto con los validadores ('pages' o 'albums').
+        Returns:
+            Response: Respuesta del servidor o copia de la caché, o None si la página no cambió
+                (304) y no hay copia: el llamante reutiliza entonces los datos del manifiesto.
+        """
+        stage = "listing_fetch" if table == "pages" else "album_fetch"
+        cached = self.html_cache.get(url) if self.html_cache is not None else None
+        if cached is not None and (self.offline or cached.fresh()):
+            return self.html_cache.hit(cached)
+        if self.offline:
+            raise OfflineMiss(f"Sin conexión y sin copia en la caché HTML: {url}")
+
+        def request():
+            self._throttle(url, "html")
+            self.metrics.inc("requests_total", kind="html")
+            headers = cached.conditional_headers() if cached is not None else self.manifest.conditional_headers(table, url)
+            with self.metrics.timer(stage):
+                response = self.client.get(url, headers=headers)
+            self.metrics.inc("bytes_total", len(response.content), kind="html")
+            if response.status_code == 304:
+                self.metrics.inc("not_modified_total", kind=table)
+                return self.html_cache.revalidated(cached, response.headers) if cached is not None else None
+            response.raise_for_status()
+            if self.html_cache is not None:
+                self.html_cache.store(url, response)
+            return response
+
+        try:
+            return self._with_retries(url, request, "html")
+        except requests.exceptions.RequestException as e:
+            logging.error(f"Error al descargar HTML: {e}")
+            raise
+
+    def _change_album_title(self, title):
+        """
+        Limpia y ajusta el título del álbum para ser usado como nombre de carpeta.
+        Args:
+            title (str): Título original del álbum.
+        Returns:
+            str: Título limpio y ajustado.
+        """
+        #title = re.sub(r'^\d{1,2}\s*', '', title)
+        #title = re.sub(r'\bS-XXL\b', '', title)
+        #title = title.replace("/", "-")
+        title = re.sub(r'[<>:"/\\|?*]', '-', title)
+        return title.strip()
@@ -0,0 +1,70 @@
+import re
+
+# Coincidencia exacta de una clase CSS dentro del atributo class, como hace el selector '.clase'
+_HAS_CLASS = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+
+LISTING_XPATH = (
+    f"//a[{_HAS_CLASS.format('album__main')}]"
+    " | //*[contains(@class, 'pagination')]//a[@href]"
+    " | //*[contains(@class, 'pagination')]//input[@max]"
+)
+ALBUM_XPATH = f"//*[@data-src][{_HAS_CLASS.format('image__landscape')} or {_HAS_CLASS.format('image__portrait')}]"
+
+PAGE_PARAM_RE = re.compile(r'[?&]pag(?:e)?=(\d+)')
+
+
+def _parse(content):
+    """
+    Construye el árbol con el parser HTML de lxml. Se importa en el primer uso para no
+    penalizar el arranque.
+    """
+    from lxml import html
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return html.fromstring(content)
+
+
+def extract_listing(content):
+    """
+    Extrae en una sola pasada los álbumes y la última página de una página del listado.
+    Args:
+        content (bytes|str): HTML de la página del listado.
+    Returns:
+        tuple: (lista de tuplas (href, título) en orden, última página o None si no hay paginación)
+    """
+    albums = []
+    pages = []
+    for element in _parse(content).xpath(LISTING_XPATH):
+        if element.tag == "input":
+            max_page = element.get("max", "")
+            if max_page.isdigit():
+                pages.append(int(max_page))
+            continue
+        if "album__main" in (element.get("class") or "").split():
+            albums.append((element.get("href"), element.get("title")))
+            continue
+        match = PAGE_PARAM_RE.search(element.get("href", ""))
+        if match:
+            pages.append(int(match.group(1)))
+    return albums, (max(pages) if pages else None)
+
+
+def extract_image_urls(content):
+    """
+    Extrae las URLs de las imágenes de una página de álbum: primero las horizontales y después
+    las verticales, cada grupo en el orden del documento.
+    Args:
+        content (bytes|str): HTML de la página del álbum.
+    Returns:
+        list: URLs absolutas de las imágenes.
+    """
+    landscape = []
+    portrait = []
+    for element in _parse(content).xpath(ALBUM_XPATH):
+        classes = (element.get("class") or "").split()
+        url = "https:" + element.get("data-src")
+        if "image__landscape" in classes:
+            landscape.append(url)
+        if "image__portrait" in classes:
+            portrait.append(url)
+    return landscape + portrait
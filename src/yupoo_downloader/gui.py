@@ -1,4 +1,5 @@
 import os
+import queue
 import tkinter as tk
 from tkinter import messagebox, filedialog, colorchooser
 from tkinter import ttk
@@ -6,14 +7,14 @@ from threading import Thread, Event
 import time
 import logging
 import json
-from PIL import Image, ImageTk
-from downloader import YupooDownloader
 import sys
-import re
+from yupoo_downloader.progress import ProgressTracker, format_duration
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 CONFIG_FILE = "config.json"
+# Cadencia con la que el hilo de Tk vacía la cola de eventos y redibuja el progreso
+UI_REFRESH_MS = 100
 
 class ToolTip:
     def __init__(self, widget, text):
@@ -55,6 +56,13 @@ class YupooGUI:
         self.is_paused = False
         self.elapsed_time = 0
         self.downloaded_albums = []  # Almacena los álbumes descargados
+        # Los hilos de descarga solo publican eventos aquí; los widgets se tocan desde drain_events
+        self.events = queue.Queue()
+        self.progress = None
+        self.thumbnails = None
+        self.photo_cache = None
+        self.galleries = []
+        self.root.after(UI_REFRESH_MS, self.drain_events)
 
     def load_config(self):
         try:
@@ -117,8 +125,16 @@ class YupooGUI:
         self.modify_url_checkbox = tk.Checkbutton(config_frame, text="Modificar URL (?pag= a &pag=)", variable=self.modify_url_var, bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color, font=(None, font_size))
         self.modify_url_checkbox.grid(row=2, column=1, padx=5, pady=5, sticky='w')
 
+        self.pages_label = tk.Label(config_frame, text="Páginas (ej. 1-5 o 'todas'):", bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color, font=(None, font_size))
+        self.pages_label.grid(row=3, column=0, padx=5, pady=5, sticky='w')
+
+        self.pages_entry = tk.Entry(config_frame, width=50, font=(None, font_size))
+        self.pages_entry.grid(row=3, column=1, padx=5, pady=5)
+
         ToolTip(self.select_folder_button, "")
 
+        ToolTip(self.pages_entry, "Déjalo vacío para descargar solo la página de la URL.\n Escribe 'todas' para recorrer el catálogo hasta la última página.")
+
         ToolTip(self.modify_url_checkbox, "Si contiene el simbolo '?' puede descargar mas fotos de la cuenta por problemas dentro del Yuppo.\n Marca esta opción si solo quieres que descargue las fotos que aparecen en el albúm.")
 
 
@@ -151,6 +167,12 @@ class YupooGUI:
         self.album_label = tk.Label(progress_frame, text="Progreso del Álbum: 0 de 0", bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color, font=(None, font_size))
         self.album_label.grid(row=2, column=1, columnspan=2, pady=5, sticky='w')
 
+        self.concurrency_label = tk.Label(progress_frame, text="Concurrencia: -", bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color, font=(None, font_size))
+        self.concurrency_label.grid(row=3, column=0, columnspan=3, pady=5, sticky='w')
+
+        self.speed_label = tk.Label(progress_frame, text="Velocidad: - · Restante: -", bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color, font=(None, font_size))
+        self.speed_label.grid(row=4, column=0, columnspan=3, pady=5, sticky='w')
+
         # Panel de Productos Descargados
         products_frame = tk.LabelFrame(self.root, text="Productos Descargados", padx=10, pady=10, bg=self.config.get("bg_color", "#FFFFFF"), fg=text_color)
         products_frame.grid(row=1, column=0, columnspan=3, padx=10, pady=10, sticky='nsew')
@@ -320,8 +342,20 @@ class YupooGUI:
             messagebox.showerror("Error", "Por favor, seleccione una carpeta de descarga válida.")
             return
 
+        self.crawl_pages = False
+        pages_text = self.pages_entry.get().strip()
+        if pages_text:
+            from yupoo_downloader.crawler import parse_page_range
+            try:
+                self.crawl_pages = True
+                self.pages = parse_page_range(pages_text)
+            except ValueError as e:
+                messagebox.showerror("Error", str(e))
+                return
+
         self.url_entry.config(state=tk.DISABLED)
         self.folder_entry.config(state=tk.DISABLED)
+        self.pages_entry.config(state=tk.DISABLED)
         self.select_folder_button.config(state=tk.DISABLED)
         self.start_button.config(state=tk.DISABLED)
         self.stop_button.config(state=tk.NORMAL)
@@ -331,59 +365,135 @@ class YupooGUI:
         self.pause_event.set()
         self.is_paused = False
 
-        self.downloader = YupooDownloader(main_url=url, download_folder=download_folder)
+        # Se importa aquí para que requests y el resto del motor no retrasen la primera ventana
+        from yupoo_downloader.downloader import YupooDownloader
+        self.downloader = YupooDownloader(main_url=url, download_folder=download_folder, stop_event=self.stop_event, pause_event=self.pause_event, config=self.config)
+        self.downloader.on_event = self.events.put
+        if self.thumbnails is not None:
+            # En modo archivo las miniaturas se leen de los ZIP/TAR de esta descarga
+            self.thumbnails.source = self.downloader.archives
+        self.progress = ProgressTracker()
+        self.get_thumbnails()
+        self.start_time = time.time() - self.elapsed_time
         download_thread = Thread(target=self.run_download)
         download_thread.start()
 
-        self.start_time = time.time() - self.elapsed_time
-        self.timer_thread = Thread(target=self.update_timer)
-        self.timer_thread.daemon = True
-        self.timer_thread.start()
-
-    def update_timer(self):
-        while self.is_downloading:
-            if self.stop_event.is_set():
-                break
-            if not self.is_paused:
-                self.elapsed_time = int(time.time() - self.start_time)
-                self.timer_label.config(text=f"Tiempo Total: {self.elapsed_time} s")
-            time.sleep(1)
-
     def run_download(self):
+        # Se ejecuta en un hilo secundario: no debe tocar ningún widget
+        error = None
         try:
-            title_list = self.downloader.create_csv_file()
-            self.total_albums = len(title_list)
-            self.progressbar['maximum'] = self.total_albums
-
-            for index, value in enumerate(title_list):
-                if self.stop_event.is_set():
-                    break
-                self.pause_event.wait()
-                self.update_progress(index + 1, self.total_albums)
-                self.album_label.config(text=f"Progreso del Álbum: {index + 1} de {self.total_albums}")
-                self.log_area.insert(tk.END, f"Procesando álbum: {value}\n")
-                self.log_area.yview(tk.END)
-                
-                self.downloader.create_file_tests(index)
-                self.downloader.download_photo(index, value)
-                
-                # Añadir álbum descargado a la lista de productos
-                self.downloaded_albums.append(value)
-                self.products_listbox.insert(tk.END, value)
-                
-            if not self.stop_event.is_set():
-                messagebox.showinfo("Éxito", "Descarga completada con éxito.")
+            with self.downloader.profiling():
+                self.downloader.warm_up()
+                from yupoo_downloader.pipeline import CatalogPipeline
+                discover = None
+                if self.crawl_pages:
+                    from yupoo_downloader.crawler import CatalogCrawler
+                    discover = CatalogCrawler(self.downloader, pages=self.pages).crawl
+                pipeline = CatalogPipeline(
+                    self.downloader,
+                    discover=discover,
+                    parse_workers=self.config.get("parse_workers", 2),
+                    queue_size=self.config.get("pipeline_queue_size", 4),
+                    on_catalog=self.on_catalog,
+                    on_album_start=self.on_album_start,
+                    on_album_done=self.on_album_done,
+                )
+                pipeline.run()
         except Exception as e:
             logging.error(f"Error durante la descarga: {e}")
-            messagebox.showerror("Error", f"Error durante la descarga: {e}")
+            error = str(e)
         finally:
-            self.start_button.config(state=tk.NORMAL)
-            self.stop_button.config(state=tk.DISABLED)
-            self.resume_button.config(state=tk.DISABLED)
-            self.url_entry.config(state=tk.NORMAL)
-            self.folder_entry.config(state=tk.NORMAL)
-            self.select_folder_button.config(state=tk.NORMAL)
-            self.is_downloading = False
+            self.downloader.close()
+            self.events.put({"event": "finished", "error": error})
+
+    def on_catalog(self, title_list):
+        self.events.put({"event": "catalog", "albums": len(title_list)})
+
+    def on_album_start(self, index, value):
+        self.events.put({"event": "album_start", "title": value})
+
+    def on_album_done(self, index, value):
+        self.events.put({"event": "album_done", "title": value, "folder": self.downloader.album_folder(index, value)})
+
+    def drain_events(self):
+        """
+        Vacía la cola de eventos en el hilo de Tk y aplica todos los pendientes en un único
+        redibujado, de modo que una ráfaga de imágenes terminadas no bloquea la interfaz.
+        """
+        log_lines = []
+        new_albums = []
+        finished = None
+        thumbnails_ready = False
+        while True:
+            try:
+                event = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if self.progress is not None:
+                self.progress.update(event)
+            kind = event["event"]
+            if kind == "album_start":
+                log_lines.append(f"Procesando álbum: {event['title']}")
+            elif kind == "album_done":
+                new_albums.append((event["title"], event["folder"]))
+            elif kind == "image_done" and self.thumbnails is not None:
+                # La miniatura se genera en segundo plano nada más guardar la imagen
+                self.thumbnails.submit(event["path"])
+            elif kind == "thumbnail_ready":
+                thumbnails_ready = True
+            elif kind == "image_failed":
+                log_lines.append(f"Error al descargar {event['url']}: {event['error']}")
+            elif kind == "finished":
+                finished = event
+
+        if log_lines:
+            self.log_area.insert(tk.END, "\n".join(log_lines) + "\n")
+            self.log_area.yview(tk.END)
+        if new_albums:
+            self.downloaded_albums.extend(new_albums)
+            self.products_listbox.insert(tk.END, *[title for title, _ in new_albums])
+        if thumbnails_ready:
+            for gallery in self.galleries:
+                gallery.refresh()
+        if self.is_downloading or finished:
+            self.refresh_progress()
+        if finished:
+            self.download_finished(finished["error"])
+        self.root.after(UI_REFRESH_MS, self.drain_events)
+
+    def refresh_progress(self):
+        progress = self.progress
+        if not self.is_paused and self.is_downloading:
+            self.elapsed_time = int(time.time() - self.start_time)
+        self.timer_label.config(text=f"Tiempo Total: {self.elapsed_time} s")
+
+        total = progress.estimated_images()
+        processed = progress.images_done + progress.images_failed
+        self.progressbar['maximum'] = max(total, 1)
+        self.progressbar['value'] = processed
+        percent = int(processed / total * 100) if total else 0
+        self.label_progress.config(text=f"Progreso: {percent}% ({progress.images_done} de ~{total} imágenes)")
+        self.album_label.config(text=f"Progreso del Álbum: {progress.albums_done} de {progress.albums_total}")
+
+        eta = progress.eta()
+        remaining = format_duration(eta) if eta is not None else "-"
+        self.speed_label.config(text=f"Velocidad: {progress.bytes_per_second() / 1e6:.1f} MB/s · Restante: {remaining}")
+        state = self.downloader.concurrency.snapshot()
+        self.concurrency_label.config(text=f"Concurrencia: {state['limit']} ({state['in_use']} activas)")
+
+    def download_finished(self, error):
+        self.start_button.config(state=tk.NORMAL)
+        self.stop_button.config(state=tk.DISABLED)
+        self.resume_button.config(state=tk.DISABLED)
+        self.url_entry.config(state=tk.NORMAL)
+        self.folder_entry.config(state=tk.NORMAL)
+        self.pages_entry.config(state=tk.NORMAL)
+        self.select_folder_button.config(state=tk.NORMAL)
+        self.is_downloading = False
+        if error:
+            messagebox.showerror("Error", f"Error durante la descarga: {error}")
+        elif not self.stop_event.is_set():
+            messagebox.showinfo("Éxito", "Descarga completada con éxito.")
 
     def stop_download(self):
         self.stop_event.set()
@@ -394,6 +504,7 @@ class YupooGUI:
         self.resume_button.config(state=tk.DISABLED)
         self.url_entry.config(state=tk.NORMAL)
         self.folder_entry.config(state=tk.NORMAL)
+        self.pages_entry.config(state=tk.NORMAL)
         self.select_folder_button.config(state=tk.NORMAL)
         self.elapsed_time = int(time.time() - self.start_time)
         messagebox.showinfo("Descarga Detenida", "La descarga ha sido detenida.")
@@ -420,62 +531,139 @@ class YupooGUI:
         selection = event.widget.curselection()
         if selection:
             album_index = selection[0]
-            album_name = self.downloaded_albums[album_index]
-            album_name_normalized = re.sub(r'[\\/:*?"<>|]', '-', album_name)  # Normalizar nombre de carpeta eliminando caracteres inválidos
-            album_folder = os.path.join(os.path.normpath(self.folder_entry.get()), "page1", album_name_normalized)
-
-            print(album_name + ' ', album_name_normalized + ' ', album_folder + ' ')
+            album_name, album_folder = self.downloaded_albums[album_index]
+            archives = self.downloader.archives if self.downloader is not None else None
 
-            if os.path.exists(album_folder):
-                photos = [f for f in os.listdir(album_folder) if f.endswith(('.jpg', '.jpeg', '.png'))]
+            if archives is not None or os.path.exists(album_folder):
+                # En modo archivo se listan los miembros del índice del ZIP/TAR, sin extraerlo
+                names = archives.members(album_folder) if archives is not None else os.listdir(album_folder)
+                photos = [os.path.join(album_folder, f) for f in names if f.endswith(('.jpg', '.jpeg', '.png'))]
 
                 if photos:
-                    photo_window = tk.Toplevel(self.root)
-                    photo_window.title(f"Fotos de {album_name}")
-
-                    row = 0
-                    col = 0
-                    for photo in photos:
-                        photo_path = os.path.join(album_folder, photo)
-                        img = Image.open(photo_path)
-                        img = img.resize((200, 200))
-                        img = ImageTk.PhotoImage(img)
-
-                        img_label = tk.Label(photo_window, image=img)
-                        img_label.image = img  # Mantener una referencia para evitar el recolector de basura
-                        img_label.grid(row=row, column=col, padx=5, pady=5)
-                        img_label.bind("<Button-1>", lambda e, photo_path=photo_path: self.show_large_photo(photo_path))
-
-                        col += 1
-                        if col >= 4:
-                            col = 0
-                            row += 1
+                    self.get_thumbnails()
+                    self.galleries.append(AlbumGallery(self, album_name, photos))
                 else:
                     messagebox.showinfo("Sin Fotos", f"No se encontraron fotos en el álbum: {album_name}")
             else:
                 messagebox.showerror("Error", f"No se encontró la carpeta del álbum: {album_name}")
 
-    def update_progress(self, current, total):
-        progress = int((current / total) * 100)
-        self.progressbar['value'] = current
-        self.label_progress.config(text=f"Progreso: {progress}%")
+    def get_thumbnails(self):
+        """
+        Crea bajo demanda la caché de miniaturas en disco y la caché en memoria de PhotoImage.
+        """
+        if self.thumbnails is None:
+            from yupoo_downloader.thumbnails import ThumbnailCache, LRUCache, DEFAULT_CACHE_DIR
+            source = self.downloader.archives if self.downloader is not None else None
+            self.thumbnails = ThumbnailCache(self.config.get("thumbnail_cache") or DEFAULT_CACHE_DIR, workers=self.config.get("thumbnail_workers", 2), source=source)
+            self.photo_cache = LRUCache(self.config.get("thumbnail_memory", 256))
+        return self.thumbnails
+
+    def photo_image(self, path, size):
+        """
+        Devuelve el PhotoImage de la miniatura de una imagen si ya está en memoria o en disco.
+        Solo debe llamarse desde el hilo de Tk.
+        Returns:
+            PhotoImage: La miniatura, o None si todavía no se ha generado.
+        """
+        key = (path, size)
+        image = self.photo_cache.get(key)
+        if image is None:
+            thumb = self.thumbnails.cached(path, size)
+            if thumb is None:
+                return None
+            from PIL import Image, ImageTk
+            with Image.open(thumb) as img:
+                image = ImageTk.PhotoImage(img)
+            self.photo_cache.put(key, image)
+        return image
+
+    def thumbnail_ready(self, path, thumb):
+        # Se llama desde el pool de miniaturas: se avisa al hilo de Tk a través de la cola
+        self.events.put({"event": "thumbnail_ready", "path": path})
 
     def show_large_photo(self, photo_path):
         # Abrir una ventana para mostrar la imagen en grande
         large_photo_window = tk.Toplevel(self.root)
         large_photo_window.title("Imagen Grande")
 
-        img = Image.open(photo_path)
-        img = img.resize((400, 400))
-        img = ImageTk.PhotoImage(img)
+        from yupoo_downloader.thumbnails import LARGE_SIZE
+        img = self.photo_image(photo_path, LARGE_SIZE)
+        if img is None:
+            # Una sola imagen: se genera aquí mismo con decodificación en modo borrador
+            self.thumbnails.get(photo_path, LARGE_SIZE)
+            img = self.photo_image(photo_path, LARGE_SIZE)
 
         img_label = tk.Label(large_photo_window, image=img)
         img_label.image = img  # Mantener una referencia para evitar el recolector de basura
         img_label.pack(padx=10, pady=10)
 
+
+class AlbumGallery:
+    """
+    Galería de un álbum sobre un Canvas desplazable. Solo se crean las miniaturas de las filas
+    visibles (más una fila de margen); las que faltan se piden al pool de miniaturas y se dibujan
+    cuando llegan.
+    """
+    COLUMNS = 4
+    CELL = 210
+
+    def __init__(self, app, title, photos):
+        self.app = app
+        self.photos = photos
+        self.items = {}
+        self.window = tk.Toplevel(app.root)
+        self.window.title(f"Fotos de {title}")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        rows = (len(photos) + self.COLUMNS - 1) // self.COLUMNS
+        self.canvas = tk.Canvas(self.window, width=self.COLUMNS * self.CELL, height=min(rows, 3) * self.CELL, highlightthickness=0)
+        scrollbar = tk.Scrollbar(self.window, orient="vertical", command=self.canvas.yview)
+        # Cualquier cambio de la vista (desplazamiento o redimensión) vuelve a calcular las filas visibles
+        self.canvas.configure(scrollregion=(0, 0, self.COLUMNS * self.CELL, rows * self.CELL),
+                              yscrollcommand=lambda first, last: (scrollbar.set(first, last), self.refresh()))
+        self.canvas.grid(row=0, column=0, sticky='nsew')
+        scrollbar.grid(row=0, column=1, sticky='ns')
+        self.window.grid_rowconfigure(0, weight=1)
+        self.window.grid_columnconfigure(0, weight=1)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+    def refresh(self):
+        from yupoo_downloader.thumbnails import THUMB_SIZE
+        if not self.window.winfo_exists():
+            return
+        top = self.canvas.canvasy(0)
+        bottom = top + self.canvas.winfo_height()
+        first = max(int(top // self.CELL) - 1, 0) * self.COLUMNS
+        last = min((int(bottom // self.CELL) + 2) * self.COLUMNS, len(self.photos))
+        visible = range(first, last)
+
+        for index in [index for index in self.items if index not in visible]:
+            self.canvas.delete(self.items.pop(index)[0])
+        for index in visible:
+            if index in self.items:
+                continue
+            path = self.photos[index]
+            image = self.app.photo_image(path, THUMB_SIZE)
+            if image is None:
+                self.app.thumbnails.submit(path, THUMB_SIZE, callback=self.app.thumbnail_ready)
+                continue
+            x = (index % self.COLUMNS) * self.CELL + self.CELL // 2
+            y = (index // self.COLUMNS) * self.CELL + self.CELL // 2
+            item = self.canvas.create_image(x, y, image=image)
+            self.canvas.tag_bind(item, "<Button-1>", lambda e, path=path: self.app.show_large_photo(path))
+            # Se guarda la referencia para que la imagen siga viva aunque salga de la caché LRU
+            self.items[index] = (item, image)
+
+    def close(self):
+        self.app.galleries.remove(self)
+        self.window.destroy()
+
+def main():
+    root = tk.Tk()
+    app = YupooGUI(root)
+    root.mainloop()
+
 if __name__ == "__main__":
-    def main():
-        root = tk.Tk()
-        app = YupooGUI(root)
-        root.mainloop()
     main()
@@ -0,0 +1,245 @@
+import os
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+import requests
+from requests.structures import CaseInsensitiveDict
+from yupoo_downloader.utils import create_directory
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yupoo-downloader", "html")
+INDEX_FILE = "index.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    file TEXT,
+    size INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    content_type TEXT,
+    expires_at REAL,
+    fetched_at REAL,
+    used_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_used ON entries (used_at);
+"""
+
+
+class OfflineMiss(requests.exceptions.RequestException):
+    """
+    La página no está en la caché y el modo sin conexión impide descargarla.
+    """
+
+
+class CachedResponse:
+    """
+    Respuesta HTML servida desde la caché, con la parte de la interfaz de requests.Response que
+    usa el descargador (status_code, content y headers).
+    """
+
+    status_code = 200
+    from_cache = True
+
+    def __init__(self, url, content, etag=None, last_modified=None, content_type=None, expires_at=0.0):
+        self.url = url
+        self.content = content
+        self.expires_at = expires_at
+        self.headers = CaseInsensitiveDict()
+        for name, value in (("ETag", etag), ("Last-Modified", last_modified), ("Content-Type", content_type)):
+            if value:
+                self.headers[name] = value
+
+    def fresh(self):
+        """
+        Indica si la copia todavía es válida sin preguntar al servidor.
+        """
+        return self.expires_at > time.time()
+
+    def conditional_headers(self):
+        """
+        Construye las cabeceras If-None-Match/If-Modified-Since para revalidar la copia.
+        """
+        headers = {}
+        if self.headers.get("ETag"):
+            headers["If-None-Match"] = self.headers["ETag"]
+        if self.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = self.headers["Last-Modified"]
+        return headers
+
+
+def freshness_lifetime(headers, default_ttl=0):
+    """
+    Calcula cuántos segundos es válida una respuesta según Cache-Control y Expires.
+    Args:
+        headers (Mapping): Cabeceras de la respuesta.
+        default_ttl (float): Vigencia si el servidor no indica ninguna.
+    Returns:
+        float: Segundos de vigencia (0 obliga a revalidar siempre), o None si no debe guardarse.
+    """
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return int(directives[name])
+    expires = headers.get("Expires")
+    if expires:
+        try:
+            date = headers.get("Date")
+            now = parsedate_to_datetime(date).timestamp() if date else time.time()
+            return max(parsedate_to_datetime(expires).timestamp() - now, 0)
+        except (TypeError, ValueError, IndexError):
+            # Una fecha no válida (p. ej. 'Expires: 0') significa que ya caducó
+            return 0
+    return default_ttl
+
+
+class HttpCache:
+    """
+    Caché HTTP en disco para las páginas HTML del listado y de los álbumes. Cada respuesta se
+    guarda con sus validadores y su caducidad; mientras está vigente se sirve sin petición y,
+    cuando caduca, se revalida con una petición condicional que el servidor puede contestar con
+    un 304 sin cuerpo. El tamaño total está limitado y se descartan primero las páginas usadas
+    hace más tiempo. La caché es compartida por todas las carpetas de descargas.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=100 * 1024 * 1024, default_ttl=0):
+        """
+        Args:
+            cache_dir (str): Carpeta de la caché.
+            max_bytes (int): Tamaño máximo de las páginas guardadas.
+            default_ttl (float): Vigencia en segundos de las páginas sin Cache-Control ni Expires.
+        """
+        create_directory(cache_dir)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evicted": 0}
+        self._lock = threading.Lock()
+        # Varios procesos del modo por lotes comparten el índice: el timeout los hace esperar
+        self._conn = sqlite3.connect(os.path.join(cache_dir, INDEX_FILE), timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def get(self, url):
+        """
+        Devuelve la copia guardada de una página, vigente o no.
+        Returns:
+            CachedResponse: Copia de la página, o None si no está en la caché.
+        """
+        rows = self._execute("SELECT file, etag, last_modified, content_type, expires_at FROM entries WHERE url = ?", (url,))
+        if not rows:
+            return None
+        file, etag, last_modified, content_type, expires_at = rows[0]
+        try:
+            with open(os.path.join(self.cache_dir, file), "rb") as f:
+                content = f.read()
+        except OSError:
+            # El archivo se borró por fuera: la entrada ya no sirve
+            self._execute("DELETE FROM entries WHERE url = ?", (url,))
+            return None
+        return CachedResponse(url, content, etag, last_modified, content_type, expires_at or 0.0)
+
+    def hit(self, cached):
+        """
+        Registra que una copia vigente se sirvió sin petición.
+        """
+        self._execute("UPDATE entries SET used_at = ? WHERE url = ?", (time.time(), cached.url))
+        self._count("hits")
+        return cached
+
+    def revalidated(self, cached, headers):
+        """
+        Renueva la vigencia de una copia después de que el servidor respondiera 304.
+        Args:
+            cached (CachedResponse): Copia revalidada.
+            headers (Mapping): Cabeceras de la respuesta 304.
+        Returns:
+            CachedResponse: La misma copia, con la nueva caducidad.
+        """
+        now = time.time()
+        lifetime = freshness_lifetime(headers, self.default_ttl) or 0
+        cached.expires_at = now + lifetime
+        # Un 304 puede traer validadores nuevos; si no, se conservan los guardados
+        etag = headers.get("ETag") or cached.headers.get("ETag")
+        last_modified = headers.get("Last-Modified") or cached.headers.get("Last-Modified")
+        self._execute(
+            "UPDATE entries SET etag = ?, last_modified = ?, expires_at = ?, used_at = ? WHERE url = ?",
+            (etag, last_modified, cached.expires_at, now, cached.url),
+        )
+        self._count("revalidated")
+        return cached
+
+    def store(self, url, response):
+        """
+        Guarda una respuesta 200 descargada, si sus cabeceras lo permiten, y descarta las páginas
+        menos usadas si se supera el tamaño máximo.
+        Args:
+            url (str): URL de la página.
+            response (Response): Respuesta del servidor.
+        """
+        self._count("misses")
+        lifetime = freshness_lifetime(response.headers, self.default_ttl)
+        if lifetime is None:
+            return
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        file = os.path.join(digest[:2], f"{digest}.html")
+        path = os.path.join(self.cache_dir, file)
+        create_directory(os.path.dirname(path))
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(response.content)
+        os.replace(tmp, path)
+        now = time.time()
+        self._execute(
+            "INSERT OR REPLACE INTO entries (url, file, size, etag, last_modified, content_type, expires_at, fetched_at, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, file, len(response.content), response.headers.get("ETag"), response.headers.get("Last-Modified"),
+             response.headers.get("Content-Type"), now + lifetime, now, now),
+        )
+        self._evict()
+
+    def _evict(self):
+        """
+        Si la caché supera su tamaño máximo, borra las páginas usadas hace más tiempo hasta
+        quedar en el 90 % del límite, para no tener que desalojar en cada escritura.
+        """
+        total = self._execute("SELECT COALESCE(SUM(size), 0) FROM entries")[0][0]
+        if total <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        evicted = 0
+        for url, file, size in self._execute("SELECT url, file, size FROM entries ORDER BY used_at"):
+            if total <= target:
+                break
+            self._execute("DELETE FROM entries WHERE url = ?", (url,))
+            try:
+                os.remove(os.path.join(self.cache_dir, file))
+            except OSError:
+                pass
+            total -= size
+            evicted += 1
+        self._count("evicted", evicted)
+        logging.info(f"Caché HTML: {evicted} páginas descartadas para no superar {self.max_bytes / 1e6:.0f} MB")
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,113 @@
+import threading
+import logging
+import concurrent.futures
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    "referer": "https://photo.yupoo.com/",
+    "Connection": "keep-alive",
+}
+
+IMAGE_HOST = "photo.yupoo.com"
+
+
+class HttpClient:
+    """
+    Cliente HTTP de larga duración compartido por todos los hilos del descargador.
+    Mantiene un pool de conexiones keep-alive por host para reutilizar el handshake TCP+TLS.
+    """
+
+    def __init__(self, pool_size=10, timeout=10, max_hosts=10):
+        """
+        Args:
+            pool_size (int): Conexiones máximas por host (normalmente igual a max_workers).
+            timeout (int): Timeout por defecto de cada petición en segundos.
+            max_hosts (int): Número de hosts distintos cuyos pools se mantienen abiertos.
+        """
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_size, pool_block=True)
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def get(self, url, **kwargs):
+        """
+        Realiza una petición GET reutilizando las conexiones del pool.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.get(url, **kwargs)
+
+    def head(self, url, **kwargs):
+        """
+        Realiza una petición HEAD reutilizando las conexiones del pool.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.session.head(url, **kwargs)
+
+    def warm_up(self, urls, connections=None, before_request=None):
+        """
+        Abre conexiones por adelantado hacia los hosts indicados para que las primeras
+        descargas no paguen el handshake.
+        Args:
+            urls (list): URLs (o hosts) a precalentar.
+            connections (int): Conexiones a abrir por host. Por defecto, el tamaño del pool.
+            before_request (callable): Se llama con el origen antes de cada petición (p. ej. para
+                pasar por el limitador de peticiones).
+        """
+        connections = min(connections or self.pool_size, self.pool_size)
+        origins = []
+        for url in urls:
+            parsed = urlparse(url if "//" in url else f"https://{url}")
+            origin = f"{parsed.scheme or 'https'}://{parsed.netloc}/"
+            if parsed.netloc and origin not in origins:
+                origins.append(origin)
+
+        def _open(origin):
+            try:
+                if before_request is not None:
+                    before_request(origin)
+                self.head(origin, allow_redirects=False)
+                return True
+            except requests.exceptions.RequestException as e:
+                logging.warning(f"No se pudo precalentar la conexión con {origin}: {e}")
+                return False
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=connections) as executor:
+            for origin in origins:
+                # Si la primera conexión falla (sin red, DNS caído) no se insiste con el resto
+                if _open(origin) and connections > 1:
+                    list(executor.map(_open, [origin] * (connections - 1)))
+
+    def stats(self):
+        """
+        Devuelve los contadores de conexiones abiertas frente a reutilizadas.
+        Returns:
+            dict: {'opened': int, 'reused': int, 'requests': int}
+        """
+        opened = 0
+        total = 0
+        with self._lock:
+            pools = self._adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                total += pool.num_requests
+        return {"opened": opened, "reused": max(total - opened, 0), "requests": total}
+
+    def close(self):
+        """
+        Cierra todas las conexiones del pool.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.session.close()
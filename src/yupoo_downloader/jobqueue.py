@@ -0,0 +1,355 @@
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+
+JOBS_FILE = ".yupoo_jobs.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    catalog TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at REAL,
+    completed_at REAL,
+    UNIQUE (catalog, kind, key)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (catalog, state, id);
+"""
+
+
+class Job:
+    """
+    Trabajo reclamado de la cola: un álbum o una imagen de un catálogo.
+    """
+    __slots__ = ("id", "catalog", "kind", "key", "payload", "attempts")
+
+    def __init__(self, id, catalog, kind, key, payload, attempts):
+        self.id = id
+        self.catalog = catalog
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+
+
+class JobQueue:
+    """
+    Cola de trabajos compartida entre varias máquinas mediante un archivo SQLite en
+    almacenamiento común. Cada trabajo se reclama con un arrendamiento de duración limitada que
+    un hilo de latidos renueva mientras se procesa; si el nodo muere, el arrendamiento caduca y
+    otro nodo lo recupera. Solo quien tiene el arrendamiento vigente puede completar el trabajo,
+    así que cada trabajo se registra como hecho una única vez.
+
+    Los plazos usan la hora del sistema, por lo que los relojes de los nodos deben estar
+    sincronizados (NTP).
+    """
+
+    def __init__(self, path, worker_id=None, lease=60.0, max_attempts=5):
+        """
+        Args:
+            path (str): Archivo SQLite de la cola, o carpeta donde crear .yupoo_jobs.sqlite.
+            worker_id (str): Identificador de este nodo. Por defecto, host + PID + sufijo aleatorio.
+            lease (float): Segundos de validez de cada arrendamiento.
+            max_attempts (int): Intentos tras los que un trabajo se marca como fallido.
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, JOBS_FILE)
+        self.path = path
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._held = set()
+        self._heartbeat = None
+        self._closed = threading.Event()
+        # Sin WAL: no es seguro en sistemas de archivos de red. Las transacciones son cortas y el
+        # timeout absorbe los bloqueos entre nodos.
+        self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self, func):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+                self._conn.execute("COMMIT")
+                return result
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, catalog, kind, key, payload):
+        """
+        Añade un trabajo si no existía ya. Varios nodos pueden sembrar la misma cola sin duplicarlos.
+        Args:
+            catalog (str): URL del catálogo al que pertenece.
+            kind (str): 'album' o 'image'.
+            key (str): Clave única del trabajo dentro del catálogo (p. ej. la URL).
+            payload (dict): Datos necesarios para procesarlo.
+        Returns:
+            bool: True si el trabajo es nuevo.
+        """
+        return self.enqueue_many(catalog, kind, [(key, payload)]) == 1
+
+    def enqueue_many(self, catalog, kind, jobs):
+        """
+        Añade varios trabajos en una sola transacción.
+        Args:
+            jobs (list): Pares (clave, datos).
+        Returns:
+            int: Número de trabajos nuevos.
+        """
+        now = time.time()
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO jobs (catalog, kind, key, payload, created_at) VALUES (?, ?, ?, ?, ?)",
+                [(catalog, kind, key, json.dumps(payload, ensure_ascii=False), now) for key, payload in jobs],
+            )
+            return conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def claim(self, catalog, kinds=("image", "album")):
+        """
+        Reclama el siguiente trabajo pendiente o con el arrendamiento caducado.
+        Args:
+            catalog (str): URL del catálogo.
+            kinds (tuple): Tipos aceptados, en orden de preferencia.
+        Returns:
+            Job: Trabajo reclamado, o None si no hay ninguno disponible ahora.
+        """
+        now = time.time()
+
+        def take(conn):
+            for kind in kinds:
+                row = conn.execute(
+                    "SELECT id, key, payload, attempts, state FROM jobs WHERE catalog = ? AND kind = ? "
+                    "AND (state = 'pending' OR (state = 'leased' AND lease_until < ?)) ORDER BY id LIMIT 1",
+                    (catalog, kind, now),
+                ).fetchone()
+                if row is None:
+                    continue
+                job_id, key, payload, attempts, state = row
+                if state == "leased":
+                    logging.warning(f"Arrendamiento caducado recuperado: {kind} {key}")
+                conn.execute(
+                    "UPDATE jobs SET state = 'leased', owner = ?, lease_until = ?, attempts = attempts + 1 WHERE id = ?",
+                    (self.worker_id, now + self.lease, job_id),
+                )
+                return Job(job_id, catalog, kind, key, json.loads(payload), attempts + 1)
+            return None
+
+        job = self._transaction(take)
+        if job is not None:
+            with self._lock:
+                self._held.add(job.id)
+            self._start_heartbeat()
+        return job
+
+    def complete(self, job):
+        """
+        Marca un trabajo como hecho si este nodo sigue teniendo su arrendamiento.
+        Returns:
+            bool: False si el arrendamiento se perdió y otro nodo se hizo cargo del trabajo.
+        """
+        return self._finish(job, "UPDATE jobs SET state = 'done', completed_at = ?, lease_until = NULL WHERE id = ? AND owner = ? AND state = 'leased'", (time.time(),))
+
+    def fail(self, job, error):
+        """
+        Devuelve un trabajo a la cola tras un error, o lo marca como fallido si agotó los intentos.
+        """
+        state = "failed" if job.attempts >= self.max_attempts else "pending"
+        return self._finish(job, "UPDATE jobs SET state = ?, error = ?, lease_until = NULL WHERE id = ? AND owner = ? AND state = 'leased'", (state, str(error)))
+
+    def release(self, job):
+        """
+        Devuelve un trabajo a la cola sin contar el intento (p. ej. al detener la descarga).
+        """
+        return self._finish(job, "UPDATE jobs SET state = 'pending', attempts = attempts - 1, lease_until = NULL WHERE id = ? AND owner = ? AND state = 'leased'", ())
+
+    def _finish(self, job, sql, params):
+        with self._lock:
+            self._held.discard(job.id)
+            changed = self._conn.execute(sql, params + (job.id, self.worker_id)).rowcount == 1
+        if not changed:
+            logging.warning(f"Se perdió el arrendamiento de {job.kind} {job.key}; otro nodo lo ha procesado")
+        return changed
+
+    def counts(self, catalog):
+        """
+        Devuelve cuántos trabajos del catálogo hay en cada estado.
+        Returns:
+            dict: {'pending': int, 'leased': int, 'done': int, 'failed': int}
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM jobs WHERE catalog = ? GROUP BY state", (catalog,)).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def _start_heartbeat(self):
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._renew_leases, name="yupoo-job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_leases(self):
+        # Se renueva tres veces por periodo para que un retraso puntual no haga caducar el arrendamiento
+        while not self._closed.wait(self.lease / 3):
+            with self._lock:
+                held = list(self._held)
+                for job_id in held:
+                    renewed = self._conn.execute(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND state = 'leased'",
+                        (time.time() + self.lease, job_id, self.worker_id),
+                    ).rowcount
+                    if not renewed:
+                        self._held.discard(job_id)
+                        logging.warning(f"No se pudo renovar el arrendamiento del trabajo {job_id}")
+
+    def close(self):
+        """
+        Detiene los latidos y cierra la conexión. Los trabajos aún reclamados caducarán y otro
+        nodo los recuperará.
+        """
+        self._closed.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join()
+        with self._lock:
+            self._conn.close()
+
+
+class QueueWorker:
+    """
+    Procesa un catálogo como nodo de una cola de trabajos compartida. Cada nodo siembra la cola
+    con los álbumes del catálogo (sin duplicar los que otro nodo ya añadió) y reclama álbumes
+    hasta que no quedan. Con image_jobs, cada álbum se divide en un trabajo por imagen para
+    repartir también los álbumes grandes entre nodos.
+    """
+
+    def __init__(self, downloader, queue, discover=None, workers=2, image_jobs=False, poll=2.0, on_job_done=None):
+        """
+        Args:
+            downloader (YupooDownloader): Descargador de este nodo.
+            queue (JobQueue): Cola compartida.
+            discover (callable): Etapa de descubrimiento, como en CatalogPipeline.
+            workers (int): Trabajos procesados en paralelo en este nodo.
+            image_jobs (bool): Dividir cada álbum en trabajos por imagen.
+            poll (float): Segundos entre consultas mientras otros nodos terminan sus trabajos.
+            on_job_done (callable): Se llama con (trabajo, éxito) al terminar cada trabajo.
+        """
+        self.downloader = downloader
+        self.queue = queue
+        self.discover = discover or downloader.create_csv_file
+        self.workers = workers
+        self.image_jobs = image_jobs
+        self.poll = poll
+        self.on_job_done = on_job_done
+        self.catalog = downloader.main_url
+        # Álbumes que este nodo dividió en trabajos por imagen: sus metadatos se escriben al final
+        self._split_albums = []
+
+    def seed(self):
+        """
+        Descubre los álbumes del catálogo y los añade a la cola.
+        Returns:
+            int: Álbumes nuevos en la cola.
+        """
+        self.discover()
+        catalog = self.downloader.catalog
+        jobs = []
+        for index in range(len(catalog)):
+            album = catalog.album(index)
+            jobs.append((album.url, {"url": album.url, "href": album.href, "title": album.title, "page": album.page}))
+        return self.queue.enqueue_many(self.catalog, "album", jobs)
+
+    def run(self):
+        """
+        Siembra la cola y procesa trabajos hasta que todos los del catálogo han terminado.
+        Returns:
+            dict: Trabajos del catálogo por estado al terminar.
+        """
+        added = self.seed()
+        logging.info(f"{added} álbumes nuevos en la cola de trabajos")
+        threads = [threading.Thread(target=self._work, name=f"yupoo-job-worker-{i}", daemon=True) for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Las imágenes de un álbum dividido pueden descargarlas otros nodos: solo al vaciarse la
+        # cola se sabe que el álbum terminó
+        if not self._stopped():
+            for index, title in self._split_albums:
+                self.downloader.finish_album(index, title)
+        return self.queue.counts(self.catalog)
+
+    def _stopped(self):
+        stop_event = self.downloader.stop_event
+        return stop_event is not None and stop_event.is_set()
+
+    def _work(self):
+        while not self._stopped():
+            job = self.queue.claim(self.catalog)
+            if job is None:
+                counts = self.queue.counts(self.catalog)
+                if not counts["pending"] and not counts["leased"]:
+                    return
+                # Quedan trabajos reclamados por otros nodos: si alguno muere, su arrendamiento caducará
+                time.sleep(self.poll)
+                continue
+            try:
+                ok = self._process(job)
+            except Exception as e:
+                logging.error(f"Error en el trabajo {job.kind} {job.key}: {e}")
+                self.queue.fail(job, e)
+                ok = False
+            else:
+                if self._stopped():
+                    self.queue.release(job)
+                elif ok:
+                    self.queue.complete(job)
+                else:
+                    self.queue.fail(job, "imágenes pendientes")
+            if self.on_job_done:
+                self.on_job_done(job, ok)
+
+    def _process(self, job):
+        downloader = self.downloader
+        payload = job.payload
+        if job.kind == "image":
+            image_name = os.path.join(downloader.download_folder, payload["path"])
+            if downloader.archives is None:
+                os.makedirs(os.path.dirname(image_name), exist_ok=True)
+            return downloader._download_and_save(payload["url"], image_name)
+
+        index = downloader.catalog.add_album(payload["url"], payload["href"], payload["title"], payload["page"])
+        downloader.create_file_tests(index)
+        if not self.image_jobs:
+            return not downloader.download_photo(index, payload["title"])
+
+        _, _, images = downloader._prepare_album(index, payload["title"])
+        # La clave es la ruta de destino y no la URL: una imagen compartida por varios álbumes es
+        # un trabajo en cada uno de ellos
+        jobs = []
+        for url, image_name in images:
+            path = os.path.relpath(image_name, downloader.download_folder)
+            jobs.append((path, {"url": url, "path": path}))
+        self.queue.enqueue_many(self.catalog, "image", jobs)
+        self._split_albums.append((index, payload["title"]))
+        return True
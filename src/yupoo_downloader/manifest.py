@@ -0,0 +1,312 @@
+import os
+import time
+import sqlite3
+import threading
+from yupoo_downloader.utils import create_directory
+
+MANIFEST_FILE = ".yupoo_manifest.sqlite"
+
+# Una fila por posición de cada álbum: la misma imagen puede aparecer en varios álbumes
+IMAGES_TABLE = """
+CREATE TABLE IF NOT EXISTS images (
+    album_url TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    path TEXT,
+    size INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    completed INTEGER DEFAULT 0,
+    completed_at REAL,
+    sha256 TEXT,
+    PRIMARY KEY (album_url, position)
+);
+CREATE INDEX IF NOT EXISTS idx_images_url ON images (url);
+CREATE INDEX IF NOT EXISTS idx_images_path ON images (path);
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL,
+    last_page INTEGER
+);
+CREATE TABLE IF NOT EXISTS page_albums (
+    page_url TEXT,
+    position INTEGER,
+    album_url TEXT,
+    href TEXT,
+    title TEXT,
+    PRIMARY KEY (page_url, position)
+);
+CREATE TABLE IF NOT EXISTS albums (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL
+);
+""" + IMAGES_TABLE + """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class DownloadManifest:
+    """
+    Registro persistente (SQLite) de lo descargado en una carpeta de descargas: páginas del
+    catálogo, álbumes e imágenes con sus validadores HTTP (ETag/Last-Modified) y su estado.
+    Permite que una nueva sincronización del mismo catálogo solo descargue lo nuevo.
+    """
+
+    def __init__(self, download_folder, wal=True):
+        """
+        Args:
+            download_folder (str): Carpeta de descargas donde se guarda el manifiesto.
+            wal (bool): Usar el modo WAL. Debe desactivarse si la carpeta está en un sistema de
+                archivos de red compartido por varias máquinas, donde WAL no es seguro.
+        """
+        create_directory(download_folder)
+        self.path = os.path.join(download_folder, MANIFEST_FILE)
+        self._lock = threading.Lock()
+        # El timeout hace que otro proceso que escribe a la vez espere en lugar de fallar
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute(f"PRAGMA journal_mode={'WAL' if wal else 'DELETE'}")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Manifiestos creados por versiones anteriores, sin las columnas añadidas después
+        for table, column, kind in (("pages", "last_page", "INTEGER"), ("images", "sha256", "TEXT")):
+            columns = [row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {kind}")
+        self._migrate_images()
+
+    def _migrate_images(self):
+        """
+        Convierte la tabla de imágenes de las versiones que la indexaban por URL, donde una imagen
+        compartida por dos álbumes solo quedaba en el último, a una fila por posición de álbum.
+        """
+        primary_key = [row[1] for row in self._conn.execute("PRAGMA table_info(images)") if row[5]]
+        if primary_key != ["url"]:
+            return
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("ALTER TABLE images RENAME TO images_by_url")
+            # Los índices siguen a la tabla renombrada y hay que crearlos de nuevo sobre la nueva
+            for index in ("idx_images_album", "idx_images_url", "idx_images_path"):
+                self._conn.execute(f"DROP INDEX IF EXISTS {index}")
+            for statement in IMAGES_TABLE.strip().split(";"):
+                if statement.strip():
+                    self._conn.execute(statement)
+            self._conn.execute(
+                "INSERT OR IGNORE INTO images (album_url, position, url, path, size, etag, last_modified, completed, completed_at, sha256) "
+                "SELECT album_url, position, url, path, size, etag, last_modified, completed, completed_at, sha256 FROM images_by_url "
+                "WHERE album_url IS NOT NULL AND position IS NOT NULL"
+            )
+            self._conn.execute("DROP TABLE images_by_url")
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def validators(self, table, url):
+        """
+        Devuelve los validadores HTTP guardados para una página o un álbum.
+        Args:
+            table (str): 'pages' o 'albums'.
+            url (str): URL del recurso.
+        Returns:
+            tuple: (etag, last_modified), con None si no se conocen.
+        """
+        if table not in ("pages", "albums"):
+            raise ValueError(f"Tabla desconocida: {table}")
+        rows = self._execute(f"SELECT etag, last_modified FROM {table} WHERE url = ?", (url,))
+        return rows[0] if rows else (None, None)
+
+    def conditional_headers(self, table, url):
+        """
+        Construye las cabeceras If-None-Match/If-Modified-Since para revalidar un recurso.
+        """
+        etag, last_modified = self.validators(table, url)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def record_page(self, url, albums, etag=None, last_modified=None, last_page=None):
+        """
+        Guarda una página del catálogo y la lista de álbumes que contiene.
+        Args:
+            url (str): URL de la página del catálogo.
+            albums (list): Tuplas (URL del álbum, href, título) en el orden de la página.
+            etag (str): Cabecera ETag de la respuesta.
+            last_modified (str): Cabecera Last-Modified de la respuesta.
+            last_page (int): Última página del listado detectada en la paginación.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.execute("DELETE FROM page_albums WHERE page_url = ?", (url,))
+                self._conn.executemany(
+                    "INSERT INTO page_albums (page_url, position, album_url, href, title) VALUES (?, ?, ?, ?, ?)",
+                    [(url, position, album_url, href, title) for position, (album_url, href, title) in enumerate(albums)],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO pages (url, etag, last_modified, fetched_at, last_page) VALUES (?, ?, ?, ?, ?)",
+                    (url, etag, last_modified, now, last_page),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def page_albums(self, url):
+        """
+        Devuelve los álbumes conocidos de una página del catálogo.
+        Returns:
+            list: Tuplas (href, título) en el orden de la página.
+        """
+        return self._execute("SELECT href, title FROM page_albums WHERE page_url = ? ORDER BY position", (url,))
+
+    def page_last_page(self, url):
+        """
+        Devuelve la última página del listado guardada junto a una página, o None.
+        """
+        rows = self._execute("SELECT last_page FROM pages WHERE url = ?", (url,))
+        return rows[0][0] if rows else None
+
+    def record_album(self, url, image_urls, etag=None, last_modified=None):
+        """
+        Guarda la lista de imágenes de un álbum junto con los validadores de su página.
+        Args:
+            url (str): URL del álbum.
+            image_urls (list): URLs de las imágenes en el orden del álbum.
+            etag (str): Cabecera ETag de la respuesta.
+            last_modified (str): Cabecera Last-Modified de la respuesta.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                # Si en una posición cambia la imagen, la anterior deja de contar como descargada
+                self._conn.executemany(
+                    "INSERT INTO images (album_url, position, url) VALUES (?, ?, ?) "
+                    "ON CONFLICT(album_url, position) DO UPDATE SET url = excluded.url, "
+                    "completed = CASE WHEN images.url = excluded.url THEN images.completed ELSE 0 END, "
+                    "sha256 = CASE WHEN images.url = excluded.url THEN images.sha256 ELSE NULL END",
+                    [(url, position, image_url) for position, image_url in enumerate(image_urls)],
+                )
+                self._conn.execute("DELETE FROM images WHERE album_url = ? AND position >= ?", (url, len(image_urls)))
+                self._conn.execute(
+                    "INSERT INTO albums (url, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, last_modified = excluded.last_modified, "
+                    "fetched_at = excluded.fetched_at",
+                    (url, etag, last_modified, time.time()),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def album_images(self, url):
+        """
+        Devuelve las URLs de imágenes conocidas de un álbum, en orden.
+        """
+        return [row[0] for row in self._execute("SELECT url FROM images WHERE album_url = ? ORDER BY position", (url,))]
+
+    def set_image_paths(self, album_url, paths):
+        """
+        Asigna a cada posición de un álbum la ruta donde se guarda su imagen, con la que después
+        se marca como descargada.
+        Args:
+            album_url (str): URL del álbum.
+            paths (list): Rutas de las imágenes en el orden del álbum.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "UPDATE images SET path = ? WHERE album_url = ? AND position = ? AND path IS NOT ?",
+                    [(path, album_url, position, path) for position, path in enumerate(paths)],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def record_image(self, url, path, size, etag=None, last_modified=None, sha256=None):
+        """
+        Marca como descargada por completo la imagen guardada en `path`.
+        Args:
+            url (str): URL de la imagen.
+            path (str): Ruta donde se guardó, asignada con set_image_paths.
+            size (int): Tamaño en bytes.
+            etag (str): Cabecera ETag de la respuesta.
+            last_modified (str): Cabecera Last-Modified de la respuesta.
+            sha256 (str): Hash del contenido en el almacén de imágenes.
+        """
+        self._execute(
+            "UPDATE images SET size = ?, etag = ?, last_modified = ?, completed = 1, completed_at = ?, sha256 = ? "
+            "WHERE url = ? AND path = ?",
+            (size, etag, last_modified, time.time(), sha256, url, path),
+        )
+
+    def image_digest(self, url):
+        """
+        Devuelve el hash del contenido de una imagen ya descargada, o None.
+        """
+        rows = self._execute("SELECT sha256 FROM images WHERE url = ? AND completed = 1 AND sha256 IS NOT NULL LIMIT 1", (url,))
+        return rows[0][0] if rows else None
+
+    def album_completed(self, url):
+        """
+        Indica si todas las imágenes conocidas de un álbum se descargaron por completo.
+        """
+        rows = self._execute("SELECT COUNT(*), COALESCE(SUM(completed), 0) FROM images WHERE album_url = ?", (url,))
+        total, completed = rows[0]
+        return total > 0 and total == completed
+
+    def album_states(self):
+        """
+        Devuelve todos los álbumes conocidos (los que tienen su página analizada) y si están
+        completos, en una sola consulta.
+        Returns:
+            dict: {URL del álbum: True si todas sus imágenes se descargaron}
+        """
+        rows = self._execute(
+            "SELECT a.url, COUNT(i.url), COALESCE(SUM(i.completed), 0) FROM albums a "
+            "LEFT JOIN images i ON i.album_url = a.url GROUP BY a.url"
+        )
+        return {url: total > 0 and total == completed for url, total, completed in rows}
+
+    def get_state(self, key, default=None):
+        """
+        Devuelve un valor de estado guardado entre ejecuciones (p. ej. del modo vigilancia).
+        """
+        rows = self._execute("SELECT value FROM state WHERE key = ?", (key,))
+        return rows[0][0] if rows else default
+
+    def set_state(self, key, value):
+        """
+        Guarda un valor de estado; con None se borra.
+        """
+        if value is None:
+            self._execute("DELETE FROM state WHERE key = ?", (key,))
+        else:
+            self._execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def close(self):
+        """
+        Cierra la conexión con la base de datos.
+        """
+        with self._lock:
+            self._conn.close()
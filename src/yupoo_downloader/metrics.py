@@ -0,0 +1,294 @@
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows: no hay getrusage y no se informa de la memoria máxima
+    resource = None
+
+# Límites de los histogramas de latencia, en segundos
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Etapas medidas por el descargador
+STAGES = ("listing_fetch", "album_fetch", "parse_listing", "parse_album", "image_ttfb", "image_transfer", "disk_write", "rate_limit_wait", "budget_wait")
+
+
+class Histogram:
+    """
+    Histograma acumulado con límites fijos, como los de Prometheus.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """
+        Estima un cuantil interpolando dentro del intervalo que lo contiene.
+        """
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            if count and seen + count >= target:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (target - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "mean": round(self.sum / self.count, 6) if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": dict(zip([str(bound) for bound in self.buckets] + ["+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    """
+    Registro de métricas de una ejecución: un histograma de duración por etapa y contadores
+    con etiquetas (peticiones, bytes, reintentos, errores). Es seguro entre hilos.
+    """
+
+    def __init__(self, labels=None, tracer=None):
+        """
+        Args:
+            labels (dict): Etiquetas comunes a todas las métricas exportadas (p. ej. el catálogo).
+            tracer (callable): Gancho opcional de trazas; se llama con (etapa, inicio, duración)
+                por cada medición, con el inicio en segundos de time.time().
+        """
+        self.labels = labels or {}
+        self.tracer = tracer
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+
+    def observe(self, stage, seconds):
+        """
+        Registra la duración de una etapa.
+        """
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram()
+            histogram.observe(seconds)
+        if self.tracer is not None:
+            self.tracer(stage, time.time() - seconds, seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        """
+        Mide la duración del bloque como una observación de la etapa.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def inc(self, name, value=1, **labels):
+        """
+        Incrementa un contador.
+        Args:
+            name (str): Nombre del contador (p. ej. 'requests_total').
+            value (float): Incremento.
+            labels: Etiquetas del contador.
+        """
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """
+        Fija el valor de un indicador (p. ej. la memoria máxima de la ejecución).
+        """
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def counter(self, name, **labels):
+        """
+        Devuelve el valor actual de un contador.
+        """
+        with self._lock:
+            return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """
+        Devuelve todas las métricas como un diccionario serializable.
+        """
+        with self._lock:
+            stages = {stage: histogram.snapshot() for stage, histogram in self._stages.items()}
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self._counters.items())]
+            gauges = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self._gauges.items())]
+        return {
+            "labels": self.labels,
+            "started": self.started,
+            "elapsed": round(time.time() - self.started, 3),
+            "stages": stages,
+            "counters": counters,
+            "gauges": gauges,
+        }
+
+    def write_json(self, path):
+        """
+        Escribe el informe de la ejecución en JSON.
+        """
+        _atomic_write(path, json.dumps(self.snapshot(), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path, prefix="yupoo"):
+        """
+        Escribe las métricas en el formato de texto de Prometheus, listo para el textfile
+        collector de node_exporter.
+        """
+        with self._lock:
+            stages = {stage: (histogram.buckets, list(histogram.counts), histogram.sum, histogram.count) for stage, histogram in self._stages.items()}
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items())
+
+        lines = [
+            f"# HELP {prefix}_stage_seconds Duración de cada etapa de la descarga.",
+            f"# TYPE {prefix}_stage_seconds histogram",
+        ]
+        for stage, (buckets, counts, total, count) in sorted(stages.items()):
+            labels = dict(self.labels, stage=stage)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{prefix}_stage_seconds_bucket{_labels(dict(labels, le=le))} {cumulative}")
+            lines.append(f"{prefix}_stage_seconds_sum{_labels(labels)} {total}")
+            lines.append(f"{prefix}_stage_seconds_count{_labels(labels)} {count}")
+
+        declared = set()
+        for (name, labels), value in counters:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                declared.add(name)
+            lines.append(f"{prefix}_{name}{_labels(dict(self.labels, **dict(labels)))} {value}")
+        for (name, labels), value in gauges:
+            if name not in declared:
+                lines.append(f"# TYPE {prefix}_{name} gauge")
+                declared.add(name)
+            lines.append(f"{prefix}_{name}{_labels(dict(self.labels, **dict(labels)))} {value}")
+        lines.append(f"# TYPE {prefix}_run_seconds gauge")
+        lines.append(f"{prefix}_run_seconds{_labels(self.labels)} {time.time() - self.started:.3f}")
+        _atomic_write(path, "\n".join(lines) + "\n")
+
+
+def error_class(error, status=None):
+    """
+    Clasifica un error de descarga para las métricas: 'http_503' para un código HTTP o el
+    nombre de la excepción (Timeout, ConnectionError...) si el servidor no llegó a responder.
+    """
+    return f"http_{status}" if status else type(error).__name__
+
+
+def peak_rss_bytes(children=False):
+    """
+    Devuelve la memoria residente máxima (RSS) del proceso en bytes, o None si el sistema no
+    la proporciona.
+    Args:
+        children (bool): Dar en su lugar la del mayor de los procesos hijos ya terminados.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"' for key, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+def _atomic_write(path, text):
+    # El textfile collector puede leer el archivo en cualquier momento: nunca debe verlo a medias
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+@contextmanager
+def profile_run(path):
+    """
+    Perfila con cProfile el hilo actual y todos los hilos que se creen dentro del bloque, y al
+    terminar guarda las estadísticas combinadas en `path` (se abren con pstats o snakeviz).
+    """
+    import cProfile
+    import pstats
+
+    if sys.version_info >= (3, 12):
+        # Desde 3.12 cProfile usa sys.monitoring: solo puede haber un perfilador activo y ese
+        # ya registra las llamadas de todos los hilos del proceso
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            pstats.Stats(profile).dump_stats(path)
+        return
+
+    profiles = []
+    lock = threading.Lock()
+
+    def start_thread_profile(frame, event, arg):
+        # Primera llamada en un hilo nuevo: se sustituye este gancho por un perfilador propio
+        sys.setprofile(None)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Otro perfilador ocupa el intérprete: el hilo sigue sin perfilar en lugar de morir
+            return
+        with lock:
+            profiles.append(profile)
+
+    main_profile = cProfile.Profile()
+    threading.setprofile(start_thread_profile)
+    main_profile.enable()
+    try:
+        yield
+    finally:
+        main_profile.disable()
+        threading.setprofile(None)
+        with lock:
+            stats = pstats.Stats(main_profile)
+            for profile in profiles:
+                try:
+                    profile.disable()
+                    stats.add(profile)
+                except (TypeError, ValueError):
+                    # Perfil de un hilo que no llegó a registrar ninguna llamada
+                    continue
+        stats.dump_stats(path)
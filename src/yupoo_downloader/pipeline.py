@@ -0,0 +1,170 @@
+import queue
+import logging
+import threading
+import concurrent.futures
+
+_DONE = object()
+
+
+class CatalogPipeline:
+    """
+    Ejecuta un catálogo completo como una cadena de etapas conectadas por colas acotadas:
+    descubrimiento de álbumes -> análisis de la página del álbum -> descarga de imágenes.
+    Mientras se descargan las imágenes de un álbum, los siguientes ya se están analizando,
+    y todas las imágenes comparten un único presupuesto global de concurrencia.
+    """
+
+    def __init__(self, downloader, parse_workers=2, queue_size=4, discover=None, on_catalog=None, on_album_start=None, on_album_done=None):
+        """
+        Args:
+            downloader (YupooDownloader): Descargador que realiza cada etapa.
+            discover (callable): Etapa de descubrimiento; debe llenar el catálogo del descargador y
+                devolver los títulos. Por defecto, solo la página de la URL principal.
+            parse_workers (int): Hilos que descargan y analizan páginas de álbum en paralelo.
+            queue_size (int): Tamaño máximo de cada cola entre etapas.
+            on_catalog (callable): Se llama con la lista de títulos al descubrir los álbumes.
+            on_album_start (callable): Se llama con (índice, título) al empezar a descargar un álbum.
+            on_album_done (callable): Se llama con (índice, título) cuando terminan todas sus imágenes.
+        """
+        self.downloader = downloader
+        self.discover = discover or downloader.create_csv_file
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size
+        self.on_catalog = on_catalog
+        self.on_album_start = on_album_start
+        self.on_album_done = on_album_done
+        self._album_queue = queue.Queue(maxsize=queue_size)
+        self._ready_queue = queue.Queue(maxsize=queue_size)
+        # Limita las imágenes enviadas y aún no terminadas para que el análisis no se adelante sin control
+        self._image_slots = threading.BoundedSemaphore(downloader.submit_window)
+        # Con el motor asíncrono se limita además el número de álbumes entregados y sin terminar
+        self._album_slots = threading.BoundedSemaphore(max(1, queue_size))
+        self._lock = threading.Lock()
+        self._pending = {}
+        # Títulos de los álbumes cuya página no se pudo descargar o analizar
+        self.failed_albums = []
+
+    def _stopped(self):
+        stop_event = self.downloader.stop_event
+        return stop_event is not None and stop_event.is_set()
+
+    def _wait_if_paused(self):
+        pause_event = self.downloader.pause_event
+        if pause_event is not None:
+            pause_event.wait()
+
+    def run(self):
+        """
+        Ejecuta el catálogo completo y bloquea hasta que terminan todos los álbumes.
+        Returns:
+            list: Títulos de los álbumes descubiertos.
+        """
+        titles = self.discover()
+        if self.on_catalog:
+            self.on_catalog(titles)
+
+        discovery = threading.Thread(target=self._discover, args=(titles,), name="yupoo-discovery", daemon=True)
+        discovery.start()
+        parsers = [threading.Thread(target=self._parse, name=f"yupoo-parser-{i}", daemon=True) for i in range(self.parse_workers)]
+        for parser in parsers:
+            parser.start()
+
+        futures = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.downloader.concurrency.ceiling) as executor:
+            finished_parsers = 0
+            while finished_parsers < self.parse_workers:
+                item = self._ready_queue.get()
+                if item is _DONE:
+                    finished_parsers += 1
+                    continue
+                if self._stopped():
+                    continue
+                futures.extend(self._dispatch(executor, *item))
+            concurrent.futures.wait(futures)
+
+        discovery.join()
+        for parser in parsers:
+            parser.join()
+        return titles
+
+    def _discover(self, titles):
+        for index, title in enumerate(titles):
+            if self._stopped():
+                break
+            self._album_queue.put((index, title))
+        for _ in range(self.parse_workers):
+            self._album_queue.put(_DONE)
+
+    def _parse(self):
+        while True:
+            item = self._album_queue.get()
+            if item is _DONE:
+                self._ready_queue.put(_DONE)
+                return
+            if self._stopped():
+                continue
+            self._wait_if_paused()
+            index, title = item
+            try:
+                self.downloader.create_file_tests(index)
+                _, _, images = self.downloader._prepare_album(index, title)
+            except Exception as e:
+                logging.error(f"Error al analizar el álbum {title}: {e}")
+                self.failed_albums.append(title)
+                continue
+            self._ready_queue.put((index, title, images))
+
+    def _dispatch(self, executor, index, title, images):
+        if self.on_album_start:
+            self.on_album_start(index, title)
+        if not images:
+            self._album_finished(index, title)
+            return []
+
+        if self.downloader.engine == "async":
+            # El motor reparte sus propias ventanas de imágenes; aquí se limita cuántos álbumes
+            # tiene en cola para que no se le entregue el catálogo entero de golpe
+            self._album_slots.acquire()
+            try:
+                future = self.downloader._get_async_engine().submit(images)
+            except Exception:
+                self._album_slots.release()
+                raise
+            # El callback se ejecuta en el hilo del bucle de eventos: el cierre del álbum escribe en
+            # disco, así que se pasa al pool y se espera a él en lugar de al futuro del motor
+            finished = concurrent.futures.Future()
+            future.add_done_callback(lambda f: executor.submit(self._async_album_finished, index, title).add_done_callback(
+                lambda g: finished.set_result(None)))
+            return [finished]
+
+        with self._lock:
+            self._pending[index] = len(images)
+        futures = []
+        for url, image_name in images:
+            self._image_slots.acquire()
+            future = executor.submit(self.downloader._download_and_save, url, image_name)
+            future.add_done_callback(lambda f, index=index, title=title: self._image_finished(index, title))
+            futures.append(future)
+        return futures
+
+    def _async_album_finished(self, index, title):
+        self._album_slots.release()
+        self._album_finished(index, title)
+
+    def _image_finished(self, index, title):
+        self._image_slots.release()
+        with self._lock:
+            self._pending[index] -= 1
+            done = self._pending[index] == 0
+            if done:
+                del self._pending[index]
+        if done:
+            self._album_finished(index, title)
+
+    def _album_finished(self, index, title):
+        self.downloader.finish_album(index, title)
+        if self.on_album_done:
+            try:
+                self.on_album_done(index, title)
+            except Exception as e:
+                logging.error(f"Error al notificar el fin del álbum {title}: {e}")
@@ -0,0 +1,91 @@
+import time
+from collections import deque
+
+
+class ProgressTracker:
+    """
+    Acumula los eventos de progreso del descargador y calcula el avance por imagen, la
+    velocidad reciente (bytes/s e imágenes/s) y el tiempo restante estimado. No es seguro entre
+    hilos: debe alimentarlo un único consumidor, como el bucle de Tk.
+    """
+
+    def __init__(self, window=5.0):
+        """
+        Args:
+            window (float): Segundos de la ventana usada para medir la velocidad.
+        """
+        self.window = window
+        self.albums_total = 0
+        self.albums_prepared = 0
+        self.albums_done = 0
+        self.images_known = 0
+        self.images_done = 0
+        self.images_failed = 0
+        self.bytes_done = 0
+        self._samples = deque()
+
+    def update(self, event):
+        """
+        Aplica un evento de progreso.
+        Args:
+            event (dict): Evento con la clave 'event' y sus campos.
+        """
+        kind = event["event"]
+        if kind == "catalog":
+            self.albums_total = event["albums"]
+        elif kind == "album_prepared":
+            self.albums_prepared += 1
+            self.images_known += event["images"]
+        elif kind == "album_done":
+            self.albums_done += 1
+        elif kind == "image_done":
+            self.images_done += 1
+            self.bytes_done += event["bytes"]
+            self._samples.append((time.monotonic(), event["bytes"]))
+        elif kind == "image_failed":
+            self.images_failed += 1
+
+    def _trim(self):
+        limit = time.monotonic() - self.window
+        while self._samples and self._samples[0][0] < limit:
+            self._samples.popleft()
+
+    def bytes_per_second(self):
+        self._trim()
+        return sum(size for _, size in self._samples) / self.window
+
+    def images_per_second(self):
+        self._trim()
+        return len(self._samples) / self.window
+
+    def estimated_images(self):
+        """
+        Estima el total de imágenes pendientes del catálogo: las de los álbumes ya analizados más,
+        para los que faltan, la media por álbum observada hasta ahora.
+        """
+        if not self.albums_prepared:
+            return self.images_known
+        remaining_albums = max(self.albums_total - self.albums_prepared, 0)
+        return self.images_known + round(remaining_albums * self.images_known / self.albums_prepared)
+
+    def eta(self):
+        """
+        Devuelve los segundos restantes estimados, o None si todavía no hay velocidad medida.
+        """
+        rate = self.images_per_second()
+        if not rate:
+            return None
+        remaining = self.estimated_images() - self.images_done - self.images_failed
+        return max(remaining, 0) / rate
+
+
+def format_duration(seconds):
+    """
+    Formatea una duración en segundos como '1 h 02 min', '3 min 05 s' o '12 s'.
+    """
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600} h {seconds % 3600 // 60:02d} min"
+    if seconds >= 60:
+        return f"{seconds // 60} min {seconds % 60:02d} s"
+    return f"{seconds} s"
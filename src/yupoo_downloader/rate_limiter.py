@@ -0,0 +1,109 @@
+import time
+import threading
+
+
+class TokenBucket:
+    """
+    Cubo de fichas: admite `rate` peticiones por segundo con ráfagas de hasta `burst`.
+    Cada petición reserva una ficha aunque todavía no exista y recibe el tiempo que debe esperar,
+    de modo que las esperas se reparten en orden sin sondear.
+    """
+
+    def __init__(self, rate, burst):
+        """
+        Args:
+            rate (float): Fichas que se recargan por segundo.
+            burst (int): Capacidad máxima del cubo.
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """
+        Reserva una ficha.
+        Returns:
+            float: Segundos que hay que esperar antes de hacer la petición.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class HostRateLimiter:
+    """
+    Limitador de peticiones compartido por todos los hilos y por el motor asíncrono. Mantiene un
+    cubo de fichas por host y por presupuesto ('html' para las páginas del catálogo, 'images'
+    para el CDN) y acumula el tiempo esperado en cada presupuesto.
+    """
+
+    def __init__(self, budgets):
+        """
+        Args:
+            budgets (dict): {presupuesto: (peticiones por segundo, ráfaga)}. Una tasa de 0 o None
+                desactiva el límite de ese presupuesto.
+        """
+        self.budgets = budgets
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._waited = {budget: 0.0 for budget in budgets}
+        self._throttled = {budget: 0 for budget in budgets}
+
+    def reserve(self, host, budget):
+        """
+        Reserva una petición hacia `host` con cargo al presupuesto indicado.
+        Returns:
+            float: Segundos que hay que esperar antes de enviarla.
+        """
+        rate, burst = self.budgets.get(budget, (None, None))
+        if not rate:
+            return 0.0
+        key = (budget, host)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(rate, burst)
+        wait = bucket.reserve()
+        if wait:
+            with self._lock:
+                self._waited[budget] += wait
+                self._throttled[budget] += 1
+        return wait
+
+    def acquire(self, host, budget, sleep=time.sleep):
+        """
+        Espera, bloqueando el hilo, hasta que la petición pueda salir.
+        Args:
+            sleep (callable): Función de espera; permite interrumpirla con un evento de parada.
+        Returns:
+            float: Segundos esperados.
+        """
+        wait = self.reserve(host, budget)
+        if wait:
+            sleep(wait)
+        return wait
+
+    async def acquire_async(self, host, budget):
+        """
+        Equivalente de acquire para el motor asíncrono.
+        """
+        import asyncio
+
+        wait = self.reserve(host, budget)
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self):
+        """
+        Devuelve, por presupuesto, los segundos esperados y las peticiones que tuvieron que esperar.
+        Returns:
+            dict: {presupuesto: {'waited': float, 'throttled': int}}
+        """
+        with self._lock:
+            return {budget: {"waited": self._waited[budget], "throttled": self._throttled[budget]} for budget in self.budgets}
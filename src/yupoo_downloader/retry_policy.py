@@ -0,0 +1,132 @@
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+
+# Códigos que indican un fallo transitorio; el resto de errores HTTP (404, 403...) son definitivos
+RETRYABLE_STATUS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value):
+    """
+    Interpreta la cabecera Retry-After, que puede ser un número de segundos o una fecha HTTP.
+    Args:
+        value (str): Valor de la cabecera.
+    Returns:
+        float: Segundos que hay que esperar, o None si no viene o no se entiende.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RetryPolicy:
+    """
+    Política de reintentos con espera exponencial y jitter completo, que respeta Retry-After.
+    """
+
+    def __init__(self, retries=4, backoff=1.0, max_delay=60.0, retry_statuses=RETRYABLE_STATUS):
+        """
+        Args:
+            retries (int): Reintentos máximos tras el primer intento.
+            backoff (float): Espera base en segundos; se duplica en cada intento.
+            max_delay (float): Espera máxima entre intentos.
+            retry_statuses (set): Códigos HTTP que se consideran transitorios.
+        """
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.retry_statuses = retry_statuses
+
+    def is_retryable(self, status):
+        """
+        Indica si un fallo merece otro intento. status None representa un error de red o timeout.
+        """
+        return status is None or status in self.retry_statuses
+
+    def delay(self, attempt, retry_after=None):
+        """
+        Calcula la espera antes del siguiente intento.
+        Args:
+            attempt (int): Número de intentos fallidos previos (0 para el primero).
+            retry_after (float): Segundos indicados por el servidor en Retry-After.
+        Returns:
+            float: Segundos de espera.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.backoff * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+class CircuitBreaker:
+    """
+    Cortacircuitos por host: tras varios fallos transitorios seguidos deja de enviar peticiones a
+    ese host durante un tiempo. Al terminar la espera se deja pasar una única petición de prueba;
+    si tiene éxito el circuito se cierra y, si falla, vuelve a abrirse.
+    """
+
+    def __init__(self, threshold=5, cooldown=30.0, probe_wait=0.5):
+        """
+        Args:
+            threshold (int): Fallos consecutivos que abren el circuito.
+            cooldown (float): Segundos que permanece abierto.
+            probe_wait (float): Espera sugerida mientras otra petición de prueba está en curso.
+        """
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.probe_wait = probe_wait
+        self._lock = threading.Lock()
+        self._failures = {}
+        self._open_until = {}
+        self._probing = set()
+
+    def wait_time(self, host):
+        """
+        Indica cuánto hay que esperar antes de enviar una petición al host.
+        Returns:
+            float: 0 si la petición puede salir ya; en otro caso, segundos sugeridos de espera.
+        """
+        with self._lock:
+            open_until = self._open_until.get(host)
+            if open_until is None:
+                return 0
+            remaining = open_until - time.monotonic()
+            if remaining > 0:
+                return remaining
+            if host in self._probing:
+                return self.probe_wait
+            self._probing.add(host)
+            return 0
+
+    def record_success(self, host):
+        with self._lock:
+            self._failures.pop(host, None)
+            self._probing.discard(host)
+            if self._open_until.pop(host, None) is not None:
+                logging.info(f"Circuito cerrado para {host}")
+
+    def release_probe(self, host):
+        """
+        Libera la petición de prueba del host sin contarla como éxito ni como fallo, para cuando
+        termina con un error ajeno a la red (p. ej. al escribir en disco) o se cancela.
+        """
+        with self._lock:
+            self._probing.discard(host)
+
+    def record_failure(self, host):
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            probing = host in self._probing
+            self._probing.discard(host)
+            if failures >= self.threshold and (probing or host not in self._open_until):
+                self._open_until[host] = time.monotonic() + self.cooldown
+                logging.warning(f"Circuito abierto para {host} durante {self.cooldown:.0f} s tras {failures} fallos seguidos")
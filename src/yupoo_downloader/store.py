@@ -0,0 +1,132 @@
+import os
+import shutil
+import hashlib
+import logging
+import threading
+from yupoo_downloader.utils import create_directory
+
+STORE_DIR = ".store"
+
+
+class ContentStore:
+    """
+    Almacén direccionado por contenido: cada imagen se guarda una sola vez bajo el hash SHA-256
+    de sus bytes y las carpetas de los álbumes contienen enlaces duros (o simbólicos si el
+    sistema de archivos no los admite) hacia ella.
+    """
+
+    def __init__(self, download_folder, manifest):
+        """
+        Args:
+            download_folder (str): Carpeta de descargas; el almacén vive en su subcarpeta .store.
+            manifest (DownloadManifest): Manifiesto donde se indexan los hashes por URL.
+        """
+        self.root = os.path.join(download_folder, STORE_DIR)
+        self.manifest = manifest
+        self._lock = threading.Lock()
+        self.stats = {"requests_saved": 0, "bytes_saved": 0, "disk_bytes_saved": 0}
+        self._inflight = {}
+        create_directory(self.root)
+
+    def blob_path(self, digest):
+        """
+        Devuelve la ruta del archivo del almacén para un hash.
+        """
+        return os.path.join(self.root, digest[:2], f"{digest}.jpg")
+
+    def lookup_url(self, url):
+        """
+        Comprobación rápida por URL: devuelve el hash de la imagen si ya está en el almacén.
+        Args:
+            url (str): URL de la imagen.
+        Returns:
+            str: Hash SHA-256 del contenido, o None si no se conoce o el archivo ya no existe.
+        """
+        digest = self.manifest.image_digest(url)
+        if digest and os.path.exists(self.blob_path(digest)):
+            return digest
+        return None
+
+    def reuse(self, url, dest):
+        """
+        Enlaza en `dest` una imagen ya almacenada sin hacer ninguna petición.
+        Returns:
+            str: Hash de la imagen si estaba en el almacén y se enlazó, o None.
+        """
+        digest = self.lookup_url(url)
+        if digest is None:
+            return None
+        self.link(digest, dest)
+        with self._lock:
+            self.stats["requests_saved"] += 1
+            self.stats["bytes_saved"] += os.path.getsize(self.blob_path(digest))
+        return digest
+
+    def claim(self, url):
+        """
+        Reserva la descarga de una URL para que otra copia en curso no la repita.
+        Returns:
+            Event: None si la reserva es nuestra, o el evento que se activará cuando termine la
+                descarga que ya está en curso.
+        """
+        with self._lock:
+            event = self._inflight.get(url)
+            if event is None:
+                self._inflight[url] = threading.Event()
+            return event
+
+    def release(self, url):
+        """
+        Libera la reserva de una URL y despierta a quienes esperaban por ella.
+        """
+        with self._lock:
+            event = self._inflight.pop(url, None)
+        if event is not None:
+            event.set()
+
+    def add(self, part_path):
+        """
+        Mueve un archivo descargado al almacén, o lo descarta si su contenido ya estaba.
+        Args:
+            part_path (str): Archivo temporal con la imagen completa.
+        Returns:
+            tuple: (hash SHA-256, tamaño en bytes)
+        """
+        digest = _file_digest(part_path)
+        size = os.path.getsize(part_path)
+        blob = self.blob_path(digest)
+        create_directory(os.path.dirname(blob))
+        with self._lock:
+            if os.path.exists(blob):
+                os.remove(part_path)
+                self.stats["disk_bytes_saved"] += size
+            else:
+                os.replace(part_path, blob)
+        return digest, size
+
+    def link(self, digest, dest):
+        """
+        Crea en `dest` un enlace a la imagen del almacén. Se intenta un enlace duro, después uno
+        simbólico y, como último recurso, una copia.
+        """
+        blob = self.blob_path(digest)
+        tmp = f"{dest}.link"
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            try:
+                os.symlink(os.path.relpath(blob, os.path.dirname(dest)), tmp)
+            except OSError as e:
+                logging.warning(f"No se pudo enlazar {dest}, se copia la imagen: {e}")
+                shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+
+
+def _file_digest(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,145 @@
+import os
+import hashlib
+import logging
+import threading
+import concurrent.futures
+from collections import OrderedDict
+from yupoo_downloader.utils import create_directory
+
+THUMB_SIZE = (200, 200)
+LARGE_SIZE = (400, 400)
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "yupoo-downloader", "thumbs")
+
+
+class LRUCache:
+    """
+    Caché en memoria de tamaño fijo que descarta el elemento usado hace más tiempo.
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self._items = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.capacity:
+            self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class ThumbnailCache:
+    """
+    Caché en disco de miniaturas. Cada miniatura se identifica por la ruta, la fecha de
+    modificación y el tamaño pedido, así que se regenera sola si la imagen cambia. Las
+    miniaturas se generan en un pool de hilos decodificando el JPEG en modo borrador (draft),
+    que escala durante la decodificación y evita cargar la imagen completa.
+
+    Las imágenes guardadas dentro de archivos ZIP/TAR se leen a través de `source`, sin extraerlas.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, workers=2, quality=85, source=None):
+        """
+        Args:
+            cache_dir (str): Carpeta de la caché.
+            workers (int): Hilos que generan miniaturas en segundo plano.
+            quality (int): Calidad JPEG de las miniaturas.
+            source (AlbumArchives): Origen de las imágenes en modo archivo (con version y open),
+                o None si son archivos normales.
+        """
+        self.cache_dir = cache_dir
+        self.quality = quality
+        self.source = source
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yupoo-thumbs")
+        self._lock = threading.Lock()
+        self._pending = {}
+        create_directory(cache_dir)
+
+    def cache_path(self, path, size=THUMB_SIZE):
+        """
+        Devuelve la ruta de la miniatura de una imagen, exista o no todavía.
+        Returns:
+            str: Ruta en la caché, o None si la imagen original no existe.
+        """
+        try:
+            # Dentro de un archivo la fecha del ZIP/TAR cambia con cada imagen: se usa la versión del miembro
+            version = self.source.version(path) if self.source is not None else os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        if version is None:
+            return None
+        digest = hashlib.sha1(f"{os.path.abspath(path)}|{version}|{size[0]}x{size[1]}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.jpg")
+
+    def cached(self, path, size=THUMB_SIZE):
+        """
+        Devuelve la miniatura si ya está en disco, sin generarla.
+        """
+        thumb = self.cache_path(path, size)
+        return thumb if thumb and os.path.exists(thumb) else None
+
+    def get(self, path, size=THUMB_SIZE):
+        """
+        Devuelve la miniatura de una imagen, generándola en este hilo si hace falta.
+        Returns:
+            str: Ruta de la miniatura, o None si la imagen no existe.
+        """
+        thumb = self.cache_path(path, size)
+        if thumb is None:
+            return None
+        if not os.path.exists(thumb):
+            self._generate(path, thumb, size)
+        return thumb
+
+    def submit(self, path, size=THUMB_SIZE, callback=None):
+        """
+        Genera la miniatura en segundo plano. Las peticiones repetidas de la misma miniatura
+        comparten la misma tarea.
+        Args:
+            callback (callable): Se llama con (ruta de la imagen, ruta de la miniatura) desde el
+                hilo del pool cuando la miniatura está lista.
+        Returns:
+            Future: Tarea de generación.
+        """
+        key = (path, size)
+        with self._lock:
+            future = self._pending.get(key)
+            if future is None:
+                future = self._executor.submit(self.get, path, size)
+                self._pending[key] = future
+                future.add_done_callback(lambda f: self._done(key, f))
+        if callback is not None:
+            def notify(f):
+                if f.exception() is None and f.result():
+                    callback(path, f.result())
+            future.add_done_callback(notify)
+        return future
+
+    def _done(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+        if future.exception() is not None:
+            logging.warning(f"No se pudo generar la miniatura de {key[0]}: {future.exception()}")
+
+    def _generate(self, path, thumb, size):
+        from PIL import Image
+        create_directory(os.path.dirname(thumb))
+        tmp = f"{thumb}.{threading.get_ident()}.tmp"
+        with Image.open(self.source.open(path) if self.source is not None else path) as img:
+            # En JPEG, draft() elige una escala de decodificación 1/2, 1/4 o 1/8 cercana al tamaño pedido
+            img.draft("RGB", size)
+            img = img.convert("RGB")
+            img.thumbnail(size)
+            img.save(tmp, "JPEG", quality=self.quality)
+        os.replace(tmp, thumb)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
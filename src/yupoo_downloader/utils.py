@@ -0,0 +1,11 @@
+import os
+import logging
+
+def create_directory(directory):
+    """
+    Crea un directorio si no existe.
+    """
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        logging.error(f"Error al crear el directorio {directory}: {e}")
\ No newline at end of file
@@ -0,0 +1,163 @@
+import re
+import time
+import heapq
+import random
+import logging
+
+_UNITS = {"": 1, "s": 1, "m": 60, "h": 3600}
+# Clave del manifiesto con la página desde la que seguir tras un sondeo que llegó a max_pages
+BACKFILL_STATE = "watch_backfill_page"
+
+
+def parse_interval(text):
+    """
+    Interpreta un intervalo de sondeo escrito por el usuario.
+    Args:
+        text (str): Segundos ('600') o un número con unidad ('90s', '15m', '2h').
+    Returns:
+        float: Intervalo en segundos.
+    """
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', str(text).lower())
+    if not match or float(match.group(1)) <= 0:
+        raise ValueError(f"Intervalo de sondeo no válido: '{text}'")
+    return float(match.group(1)) * _UNITS[match.group(2)]
+
+
+class CatalogWatcher:
+    """
+    Etapa de descubrimiento del modo vigilancia. Recorre el listado desde la página de la URL
+    principal y se detiene en la primera página que contiene algún álbum ya conocido (con su
+    página analizada en el manifiesto): como Yupoo muestra primero los álbumes más recientes,
+    lo que queda detrás ya se descargó. Solo carga en el catálogo los álbumes nuevos y los
+    conocidos que aparecen en esas páginas sin estar completos.
+
+    Si un sondeo llega a max_pages sin encontrar álbumes conocidos, entre los nuevos y los ya
+    descargados queda un hueco: la página donde se quedó se guarda en el manifiesto y los
+    sondeos siguientes, además de la primera página, recorren desde ahí hasta el final.
+    """
+
+    def __init__(self, downloader, max_pages=0):
+        """
+        Args:
+            downloader (YupooDownloader): Descargador del catálogo vigilado.
+            max_pages (int): Páginas del listado por sondeo como máximo (0 = sin límite, hasta
+                encontrar álbumes conocidos o la última página).
+        """
+        self.downloader = downloader
+        self.max_pages = max_pages
+        self.pages_fetched = 0
+        self.new_albums = 0
+        self.retried_albums = 0
+
+    def discover(self):
+        """
+        Descarga las primeras páginas del listado y deja en el catálogo del descargador los
+        álbumes que hay que descargar.
+        Returns:
+            list: Títulos de los álbumes programados, en el orden del listado.
+        """
+        downloader = self.downloader
+        manifest = downloader.manifest
+        states = manifest.album_states()
+        albums = []
+        seen = set()
+        next_page = self._scan(downloader._extract_page_number(downloader.main_url), states, albums, seen, stop_at_known=True)
+        backfill = manifest.get_state(BACKFILL_STATE)
+        if next_page is None and backfill:
+            next_page = self._scan(int(backfill), states, albums, seen, stop_at_known=False)
+        if next_page is not None:
+            logging.warning(f"Vigilancia: máximo de {self.max_pages} páginas alcanzado; el siguiente sondeo seguirá desde la página {next_page}")
+        manifest.set_state(BACKFILL_STATE, next_page)
+
+        self.retried_albums = sum(1 for url, _, _, _ in albums if url in states)
+        self.new_albums = len(albums) - self.retried_albums
+        logging.info(f"Vigilancia: {self.new_albums} álbumes nuevos y {self.retried_albums} incompletos en {self.pages_fetched} páginas")
+        downloader.catalog.set_albums(albums)
+        return downloader.catalog.titles()
+
+    def _scan(self, page, states, albums, seen, stop_at_known):
+        """
+        Recorre páginas del listado desde `page` añadiendo a `albums` los que hay que descargar.
+        Returns:
+            int: Página desde la que seguir si se alcanzó max_pages, o None si el recorrido terminó.
+        """
+        downloader = self.downloader
+        while True:
+            if self.max_pages and self.pages_fetched >= self.max_pages:
+                return page
+            page_albums, last_page = downloader.fetch_listing(downloader.page_url(page))
+            self.pages_fetched += 1
+            reached_known = False
+            for url, href, title in page_albums:
+                if url in states:
+                    reached_known = True
+                # Un álbum conocido pero incompleto se vuelve a programar: solo se pide lo que falta
+                if url in seen or states.get(url):
+                    continue
+                seen.add(url)
+                albums.append((url, href, title, page))
+            if (stop_at_known and reached_known) or not page_albums or page >= (last_page or page):
+                return None
+            page += 1
+
+
+class PollSchedule:
+    """
+    Calendario de sondeos de varios catálogos, cada uno con su propio intervalo. Cada espera se
+    desplaza al azar hasta ±jitter (fracción del intervalo) para que los catálogos no se
+    consulten siempre a la vez ni a intervalos exactos.
+    """
+
+    def __init__(self, jitter=0.1, rng=None):
+        """
+        Args:
+            jitter (float): Variación máxima de cada espera, como fracción del intervalo.
+            rng (random.Random): Generador de números aleatorios (para pruebas reproducibles).
+        """
+        self.jitter = jitter
+        self._rng = rng or random.Random()
+        self._intervals = {}
+        self._heap = []
+
+    def add(self, key, interval, delay=0.0):
+        """
+        Programa el primer sondeo de un catálogo.
+        Args:
+            key (str): Identificador del catálogo (su URL).
+            interval (float): Segundos entre sondeos.
+            delay (float): Segundos hasta el primer sondeo.
+        """
+        self._intervals[key] = interval
+        heapq.heappush(self._heap, (time.monotonic() + delay, key))
+
+    def reschedule(self, key):
+        """
+        Programa el siguiente sondeo de un catálogo a partir de ahora.
+        Returns:
+            float: Segundos hasta el siguiente sondeo.
+        """
+        interval = self._intervals[key]
+        wait = interval * self._rng.uniform(1 - self.jitter, 1 + self.jitter)
+        heapq.heappush(self._heap, (time.monotonic() + wait, key))
+        return wait
+
+    def pop_due(self):
+        """
+        Saca del calendario los catálogos a los que ya les toca.
+        Returns:
+            list: Catálogos pendientes de sondear.
+        """
+        now = time.monotonic()
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        return due
+
+    def time_to_next(self):
+        """
+        Returns:
+            float: Segundos hasta el próximo sondeo, o None si no hay ninguno programado.
+        """
+        if not self._heap:
+            return None
+        return max(self._heap[0][0] - time.monotonic(), 0.0)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Las pruebas importan el paquete desde src/ sin necesidad de instalarlo
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src"))
@@ -0,0 +1,131 @@
+import os
+import tarfile
+import zipfile
+import tempfile
+import unittest
+
+from yupoo_downloader.archive import AlbumArchives, ZipArchive, TarArchive, INDEX_SUFFIX
+
+
+class ArchiveReplaceMixin:
+    fmt = None
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.tmp.name, "page1", "Album")
+        # El descargador crea la carpeta de la página antes de escribir en sus archivos
+        os.makedirs(os.path.dirname(self.folder))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self, per="album"):
+        archives = AlbumArchives(self.tmp.name, self.fmt, per=per, checkpoint=2)
+        self.addCleanup(archives.close)
+        return archives
+
+    def member_names(self, archive_path):
+        if self.fmt == "zip":
+            with zipfile.ZipFile(archive_path) as zf:
+                return zf.namelist()
+        with tarfile.open(archive_path) as tar:
+            return tar.getnames()
+
+    def test_replaced_member_is_not_duplicated(self):
+        archives = self.open()
+        for name in ("Album_1.jpg", "Album_2.jpg", "album.json"):
+            archives.add(os.path.join(self.folder, name), name.encode())
+        archives.add(os.path.join(self.folder, "album.json"), b'{"images": 2}')
+        archives.close_album(self.folder)
+
+        archive_path, _ = archives.locate(os.path.join(self.folder, "album.json"))
+        self.assertEqual(sorted(self.member_names(archive_path)), ["Album_1.jpg", "Album_2.jpg", "album.json"])
+
+        reopened = self.open()
+        self.assertEqual(reopened.open(os.path.join(self.folder, "album.json")).read(), b'{"images": 2}')
+        self.assertEqual(reopened.open(os.path.join(self.folder, "Album_2.jpg")).read(), b"Album_2.jpg")
+        self.assertEqual(reopened.members(self.folder), ["Album_1.jpg", "Album_2.jpg", "album.json"])
+
+    def test_same_content_is_not_rewritten(self):
+        archives = self.open()
+        path = os.path.join(self.folder, "Album_1.jpg")
+        archives.add(path, b"jpeg")
+        archives.close_album(self.folder)
+        archive_path, _ = archives.locate(path)
+        mtime = os.stat(archive_path).st_mtime_ns
+
+        reopened = self.open()
+        reopened.add(path, b"jpeg")
+        reopened.close_album(self.folder)
+        self.assertEqual(os.stat(archive_path).st_mtime_ns, mtime)
+        self.assertEqual(self.member_names(archive_path), ["Album_1.jpg"])
+
+    def test_replace_in_page_archive_keeps_other_albums(self):
+        archives = self.open(per="page")
+        other = os.path.join(self.tmp.name, "page1", "Other")
+        archives.add(os.path.join(self.folder, "album.json"), b"old")
+        archives.add(os.path.join(other, "album.json"), b"other")
+        archives.add(os.path.join(self.folder, "album.json"), b"new")
+        archives.close()
+
+        reopened = self.open(per="page")
+        self.assertEqual(reopened.open(os.path.join(self.folder, "album.json")).read(), b"new")
+        self.assertEqual(reopened.open(os.path.join(other, "album.json")).read(), b"other")
+        archive_path, _ = reopened.locate(os.path.join(self.folder, "album.json"))
+        self.assertEqual(sorted(self.member_names(archive_path)), ["Album/album.json", "Other/album.json"])
+
+
+class ZipReplaceTest(ArchiveReplaceMixin, unittest.TestCase):
+    fmt = "zip"
+
+
+class TarReplaceTest(ArchiveReplaceMixin, unittest.TestCase):
+    fmt = "tar"
+
+
+class InterruptedArchiveTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_zip_without_central_directory_is_salvaged(self):
+        path = os.path.join(self.tmp.name, "album.zip")
+        archive = ZipArchive(path, checkpoint=100)
+        archive.add("a.jpg", b"a" * 100)
+        archive.add("b.jpg", b"b" * 100)
+        archive.flush()
+        # Corte a mitad del último miembro: sin directorio central y con "b.jpg" incompleto
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 200)
+
+        salvaged = ZipArchive(path)
+        self.assertEqual(salvaged.names(), ["a.jpg"])
+        self.assertEqual(salvaged.read("a.jpg"), b"a" * 100)
+        salvaged.add("b.jpg", b"b" * 100)
+        salvaged.close()
+        with zipfile.ZipFile(path) as zf:
+            self.assertEqual(zf.namelist(), ["a.jpg", "b.jpg"])
+
+    def test_tar_drops_members_after_last_checkpoint(self):
+        path = os.path.join(self.tmp.name, "album.tar")
+        archive = TarArchive(path, checkpoint=1)
+        archive.add("a.jpg", b"a" * 100)
+        archive.checkpoint = 100
+        archive.add("b.jpg", b"b" * 100)
+        # Se pierde el proceso sin cerrar: el índice solo conoce "a.jpg"
+        archive._tar.fileobj.flush()
+
+        reopened = TarArchive(path)
+        self.assertEqual(reopened.names(), ["a.jpg"])
+        reopened.add("b.jpg", b"c" * 100)
+        reopened.close()
+        self.assertTrue(os.path.exists(path + INDEX_SUFFIX))
+        with tarfile.open(path) as tar:
+            self.assertEqual(tar.getnames(), ["a.jpg", "b.jpg"])
+            self.assertEqual(tar.extractfile("b.jpg").read(), b"c" * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import unittest
+
+from yupoo_downloader.concurrency import AdaptiveConcurrency, ByteBudget
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(asyncio.wait_for(coro, 5))
+    finally:
+        loop.close()
+
+
+class AdaptiveConcurrencyAsyncTest(unittest.TestCase):
+    def test_waiters_never_exceed_the_limit(self):
+        limiter = AdaptiveConcurrency(2, ceiling=2)
+        active = []
+        peak = []
+
+        async def worker():
+            await limiter.acquire_async()
+            active.append(1)
+            peak.append(len(active))
+            await asyncio.sleep(0.001)
+            active.pop()
+            limiter.release()
+
+        async def main():
+            await asyncio.gather(*(worker() for _ in range(200)))
+
+        run(main())
+        self.assertEqual(max(peak), 2)
+        self.assertEqual(len(peak), 200)
+        self.assertEqual(limiter.in_use, 0)
+
+    def test_release_from_another_thread_wakes_a_waiter(self):
+        limiter = AdaptiveConcurrency(1, ceiling=1)
+        limiter.acquire()
+
+        async def main():
+            threading.Timer(0.05, limiter.release).start()
+            await limiter.acquire_async()
+
+        run(main())
+        self.assertEqual(limiter.in_use, 1)
+
+    def test_cancelled_waiter_passes_the_slot_on(self):
+        limiter = AdaptiveConcurrency(1, ceiling=1)
+
+        async def main():
+            await limiter.acquire_async()
+            first = asyncio.ensure_future(limiter.acquire_async())
+            second = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0)
+            # Se libera el hueco y la primera espera se cancela antes de poder tomarlo
+            limiter.release()
+            first.cancel()
+            await second
+
+        run(main())
+        self.assertEqual(limiter.in_use, 1)
+
+
+class ByteBudgetAsyncTest(unittest.TestCase):
+    def test_waiters_are_served_in_order(self):
+        budget = ByteBudget(100)
+        order = []
+
+        async def reserve(name, nbytes):
+            await budget.acquire_async(nbytes)
+            order.append(name)
+
+        async def main():
+            budget.acquire(100)
+            tasks = [asyncio.ensure_future(reserve(name, nbytes)) for name, nbytes in (("big", 90), ("small", 10))]
+            await asyncio.sleep(0.01)
+            self.assertEqual(order, [])
+            threading.Timer(0.02, budget.release, args=(100,)).start()
+            await asyncio.gather(*tasks)
+
+        run(main())
+        self.assertEqual(order, ["big", "small"])
+        self.assertEqual(budget.snapshot()["in_flight"], 100)
+
+    def test_cancelled_head_lets_the_next_waiter_through(self):
+        budget = ByteBudget(100)
+
+        async def main():
+            budget.acquire(60)
+            head = asyncio.ensure_future(budget.acquire_async(80))
+            await asyncio.sleep(0)
+            # La segunda cabe, pero espera detrás de la primera hasta que esta se cancela
+            tail = asyncio.ensure_future(budget.acquire_async(30))
+            await asyncio.sleep(0.01)
+            self.assertFalse(tail.done())
+            head.cancel()
+            await tail
+
+        run(main())
+        self.assertEqual(budget.snapshot()["in_flight"], 90)
+
+
+if __name__ == "__main__":
+    unittest.main()
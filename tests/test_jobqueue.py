@@ -0,0 +1,82 @@
+import os
+import time
+import tempfile
+import unittest
+
+from yupoo_downloader.jobqueue import JobQueue
+
+CATALOG = "https://x.yupoo.com/albums"
+
+
+class JobQueueTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite")
+        self.queues = []
+
+    def tearDown(self):
+        for queue in self.queues:
+            queue.close()
+        self.tmp.cleanup()
+
+    def open(self, worker_id, lease=60.0):
+        queue = JobQueue(self.path, worker_id=worker_id, lease=lease)
+        self.queues.append(queue)
+        return queue
+
+    def test_enqueue_is_idempotent_across_workers(self):
+        a = self.open("a")
+        b = self.open("b")
+        self.assertEqual(a.enqueue_many(CATALOG, "album", [("1", {"index": 1}), ("2", {"index": 2})]), 2)
+        self.assertEqual(b.enqueue_many(CATALOG, "album", [("1", {"index": 1}), ("2", {"index": 2})]), 0)
+        self.assertEqual(a.counts(CATALOG)["pending"], 2)
+
+    def test_leased_job_is_not_claimed_twice(self):
+        a = self.open("a")
+        b = self.open("b")
+        a.enqueue(CATALOG, "album", "1", {"index": 1})
+        self.assertIsNotNone(a.claim(CATALOG))
+        self.assertIsNone(b.claim(CATALOG))
+
+    def test_expired_lease_is_reclaimed_by_another_worker(self):
+        a = self.open("a", lease=0.3)
+        b = self.open("b", lease=0.3)
+        a.enqueue(CATALOG, "album", "1", {"index": 1})
+        job = a.claim(CATALOG)
+        # El nodo se cae: sin latidos el arrendamiento ya no se renueva
+        a.close()
+        self.queues.remove(a)
+        self.assertIsNone(b.claim(CATALOG))
+
+        time.sleep(0.4)
+        reclaimed = b.claim(CATALOG)
+        self.assertIsNotNone(reclaimed)
+        self.assertEqual(reclaimed.key, job.key)
+        self.assertEqual(reclaimed.attempts, 2)
+
+        # El nodo original vuelve con el trabajo antiguo: ya no puede completarlo
+        stale = self.open("a")
+        self.assertFalse(stale.complete(job))
+        self.assertTrue(b.complete(reclaimed))
+        self.assertEqual(b.counts(CATALOG), {"pending": 0, "leased": 0, "done": 1, "failed": 0})
+
+    def test_heartbeat_keeps_lease_alive(self):
+        a = self.open("a", lease=0.3)
+        b = self.open("b", lease=0.3)
+        a.enqueue(CATALOG, "album", "1", {"index": 1})
+        job = a.claim(CATALOG)
+        time.sleep(0.6)
+        self.assertIsNone(b.claim(CATALOG))
+        self.assertTrue(a.complete(job))
+
+    def test_image_jobs_shared_between_albums_are_distinct(self):
+        a = self.open("a")
+        url = "https://photo.yupoo.com/x/shared/big.jpg"
+        jobs = [(path, {"url": url, "path": path}) for path in ("page1/A/A_1.jpg", "page1/B/B_3.jpg")]
+        self.assertEqual(a.enqueue_many(CATALOG, "image", jobs), 2)
+        claimed = {a.claim(CATALOG, kinds=("image",)).payload["path"] for _ in range(2)}
+        self.assertEqual(claimed, {"page1/A/A_1.jpg", "page1/B/B_3.jpg"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from yupoo_downloader.manifest import DownloadManifest, MANIFEST_FILE
+
+ALBUM_A = "https://x.yupoo.com/albums/1"
+ALBUM_B = "https://x.yupoo.com/albums/2"
+SHARED = "https://photo.yupoo.com/x/shared/big.jpg"
+
+# Tabla de imágenes de las versiones que la indexaban por URL
+URL_KEYED_IMAGES = """
+CREATE TABLE images (
+    url TEXT PRIMARY KEY,
+    album_url TEXT,
+    position INTEGER,
+    path TEXT,
+    size INTEGER,
+    etag TEXT,
+    last_modified TEXT,
+    completed INTEGER DEFAULT 0,
+    completed_at REAL
+);
+CREATE INDEX idx_images_album ON images (album_url, position);
+"""
+
+
+class DownloadManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def open(self):
+        manifest = DownloadManifest(self.folder)
+        self.addCleanup(manifest.close)
+        return manifest
+
+    def test_shared_image_stays_in_every_album(self):
+        manifest = self.open()
+        manifest.record_album(ALBUM_A, [SHARED, "https://photo.yupoo.com/x/a2/big.jpg"])
+        manifest.record_album(ALBUM_B, ["https://photo.yupoo.com/x/b1/big.jpg", SHARED])
+        manifest.set_image_paths(ALBUM_A, ["page1/A/A_1.jpg", "page1/A/A_2.jpg"])
+        manifest.set_image_paths(ALBUM_B, ["page1/B/B_1.jpg", "page1/B/B_2.jpg"])
+
+        self.assertEqual(manifest.album_images(ALBUM_A)[0], SHARED)
+        self.assertEqual(manifest.album_images(ALBUM_B)[1], SHARED)
+
+        manifest.record_image(SHARED, "page1/A/A_1.jpg", 10, sha256="abc")
+        manifest.record_image("https://photo.yupoo.com/x/a2/big.jpg", "page1/A/A_2.jpg", 10)
+        manifest.record_image("https://photo.yupoo.com/x/b1/big.jpg", "page1/B/B_1.jpg", 10)
+        # La copia de A no completa la posición de B, que tiene su propia ruta
+        self.assertTrue(manifest.album_completed(ALBUM_A))
+        self.assertFalse(manifest.album_completed(ALBUM_B))
+        self.assertEqual(manifest.image_digest(SHARED), "abc")
+
+        manifest.record_image(SHARED, "page1/B/B_2.jpg", 10, sha256="abc")
+        self.assertEqual(manifest.album_states(), {ALBUM_A: True, ALBUM_B: True})
+
+    def test_changed_image_at_a_position_is_no_longer_complete(self):
+        manifest = self.open()
+        manifest.record_album(ALBUM_A, [SHARED, "https://photo.yupoo.com/x/a2/big.jpg"])
+        manifest.set_image_paths(ALBUM_A, ["page1/A/A_1.jpg", "page1/A/A_2.jpg"])
+        manifest.record_image(SHARED, "page1/A/A_1.jpg", 10)
+        manifest.record_image("https://photo.yupoo.com/x/a2/big.jpg", "page1/A/A_2.jpg", 10)
+        self.assertTrue(manifest.album_completed(ALBUM_A))
+
+        manifest.record_album(ALBUM_A, ["https://photo.yupoo.com/x/new/big.jpg"])
+        self.assertEqual(manifest.album_images(ALBUM_A), ["https://photo.yupoo.com/x/new/big.jpg"])
+        self.assertFalse(manifest.album_completed(ALBUM_A))
+
+    def test_url_keyed_manifest_is_migrated(self):
+        conn = sqlite3.connect(os.path.join(self.folder, MANIFEST_FILE))
+        conn.executescript(URL_KEYED_IMAGES)
+        conn.executemany(
+            "INSERT INTO images (url, album_url, position, path, size, completed) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (SHARED, ALBUM_A, 0, "page1/A/A_1.jpg", 10, 1),
+                ("https://photo.yupoo.com/x/a2/big.jpg", ALBUM_A, 1, "page1/A/A_2.jpg", None, 0),
+                # Filas sin álbum de versiones aún más antiguas: no se pueden situar y se descartan
+                ("https://photo.yupoo.com/x/orphan/big.jpg", None, None, None, None, 1),
+            ],
+        )
+        conn.commit()
+        conn.close()
+
+        manifest = self.open()
+        primary_key = [row[1] for row in manifest._conn.execute("PRAGMA table_info(images)") if row[5]]
+        self.assertEqual(primary_key, ["album_url", "position"])
+        indexes = {row[1] for row in manifest._conn.execute("PRAGMA index_list(images)")}
+        self.assertTrue({"idx_images_url", "idx_images_path"} <= indexes)
+        self.assertEqual(manifest.album_images(ALBUM_A), [SHARED, "https://photo.yupoo.com/x/a2/big.jpg"])
+        self.assertFalse(manifest.album_completed(ALBUM_A))
+
+        # Tras migrar, la imagen compartida puede añadirse a otro álbum sin quitarla del primero
+        manifest.record_album(ALBUM_B, [SHARED])
+        self.assertEqual(manifest.album_images(ALBUM_A)[0], SHARED)
+        self.assertEqual(manifest.album_images(ALBUM_B), [SHARED])
+        manifest.close()
+
+        # Abrirlo de nuevo no vuelve a migrar ni pierde filas
+        reopened = self.open()
+        self.assertEqual(reopened.album_images(ALBUM_A), [SHARED, "https://photo.yupoo.com/x/a2/big.jpg"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import pstats
+import tempfile
+import threading
+import unittest
+
+from yupoo_downloader.metrics import profile_run
+
+
+def _busy_worker(results, index):
+    results[index] = sum(range(1000))
+
+
+class ProfileRunTest(unittest.TestCase):
+    def test_threads_run_and_are_profiled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.prof")
+            results = {}
+            with profile_run(path):
+                threads = [threading.Thread(target=_busy_worker, args=(results, i)) for i in range(3)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+            self.assertEqual(results, {i: sum(range(1000)) for i in range(3)})
+            functions = {name for _, _, name in pstats.Stats(path).stats}
+            self.assertIn("_busy_worker", functions)
+
+    def test_profile_is_written_when_block_raises(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "run.prof")
+            with self.assertRaises(RuntimeError):
+                with profile_run(path):
+                    raise RuntimeError("fallo")
+            self.assertTrue(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()